@@ -1,19 +1,82 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import json
+import math
+import multiprocessing
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
 
-from langchain.text_splitter import Language
+import ChunkStatistics
+import DeduplicationUtils
+import TokenizerUtils
+from DeduplicationUtils import ChunkDeduplicator, MemorySignatureStore, SQLiteSignatureStore
+from EmbeddingUtils import HUGGING_FACE, HUGGING_FACE_MODEL, OPENAI, OPENAI_MODEL, create_embedding_service
 from nifiapi.documentation import ProcessorConfiguration, multi_processor_use_case, use_case
 from nifiapi.flowfiletransform import FlowFileTransform, FlowFileTransformResult
-from nifiapi.properties import ExpressionLanguageScope, PropertyDependency, PropertyDescriptor, StandardValidators
+from nifiapi.properties import (
+    ExpressionLanguageScope,
+    PropertyDependency,
+    PropertyDescriptor,
+    StandardValidators,
+    TimeUnit,
+)
+from SemanticUtils import SEMANTIC, SemanticTextSplitter
+from SplitterUtils import (
+    CONTENT_DEFINED,
+    HTML,
+    LANGCHAIN,
+    LANGUAGE_SEPARATORS,
+    LANGUAGES,
+    MARKDOWN,
+    NATIVE,
+    PLAIN_TEXT,
+    RECURSIVELY_SPLIT_BY_CHARACTER,
+    REGULAR_EXPRESSION,
+    SPLIT_BY_CHARACTER,
+    SPLIT_BY_HEADERS,
+    SPLIT_CODE,
+    SYNTAX_TREE,
+    create_text_splitter,
+    split_text_with_offsets,
+    split_texts,
+)
+
+# Maximum number of splitters retained for Separator values that reference FlowFile attributes
+TEXT_SPLITTER_CACHE_SIZE = 16
+
+# Number of documents handed to the worker processes at a time, and the number of slices created per worker
+PARALLEL_BATCH_SIZE = 4096
+SLICES_PER_WORKER = 4
+
+# Number of documents whose sentences are embedded together by the Semantic strategy
+SEMANTIC_BATCH_SIZE = 256
 
-SPLIT_BY_CHARACTER = "Split by Character"
-SPLIT_CODE = "Split Code"
-RECURSIVELY_SPLIT_BY_CHARACTER = "Recursively Split by Character"
+# Chunk Index Scopes
+FLOWFILE_SCOPE = "FlowFile"
+SOURCE_DOCUMENT_SCOPE = "Source Document"
+
+# Position of the metadata fields of a chunk, which follow its text and offsets for splitters that produce them
+CHUNK_METADATA_POSITION = 3
 
 TEXT_KEY = "text"
 METADATA_KEY = "metadata"
 
+# Category of the elements that ParseDocument produces for headers, whose 'category_depth' is the level of the header
+TITLE_CATEGORY = "Title"
+
+
+def iter_json_lines(json_docs: list[bytes], suffix: bytes):
+    # Yields the parts of the output, so that it is joined into a single bytes object without intermediate copies
+    for i, json_doc in enumerate(json_docs):
+        if i > 0:
+            yield b"\n"
+        yield json_doc
+        yield suffix
+
 
 @use_case(
     description="Create chunks of text from a single larger chunk.",
@@ -111,12 +174,23 @@ class ChunkDocument(FlowFileTransform):
             "ai",
             "document",
         ]
-        dependencies = ["langchain"]
+        dependencies = ["langchain", "tiktoken"]
 
     CHUNK_STRATEGY = PropertyDescriptor(
         name="Chunking Strategy",
-        description="Specifies which splitter should be used to split the text",
-        allowable_values=[RECURSIVELY_SPLIT_BY_CHARACTER, SPLIT_BY_CHARACTER, SPLIT_CODE],
+        description="""Specifies which splitter should be used to split the text. Split by Headers splits Markdown or HTML text into the sections
+                    delimited by its headers and adds a 'header_path' metadata field with the titles of the headers that contain each chunk. Content-Defined places chunk boundaries based on the text around them
+                    rather than on the previous boundary, so that editing part of a document only changes the chunks around the edit, and adds a
+                    'chunk_hash' metadata field with a hash of each chunk's text. Semantic requires the 'numpy' package, and the 'openai' package when
+                    using an OpenAI Model, which are not installed with this Processor.""",
+        allowable_values=[
+            RECURSIVELY_SPLIT_BY_CHARACTER,
+            SPLIT_BY_CHARACTER,
+            SPLIT_CODE,
+            SPLIT_BY_HEADERS,
+            SEMANTIC,
+            CONTENT_DEFINED,
+        ],
         required=True,
         default_value=RECURSIVELY_SPLIT_BY_CHARACTER,
     )
@@ -134,23 +208,66 @@ class ChunkDocument(FlowFileTransform):
         name="Separator Format",
         description="Specifies how to interpret the value of the <Separator> property",
         required=True,
-        default_value="Plain Text",
-        allowable_values=["Plain Text", "Regular Expression"],
+        default_value=PLAIN_TEXT,
+        allowable_values=[PLAIN_TEXT, REGULAR_EXPRESSION],
         dependencies=[PropertyDependency(CHUNK_STRATEGY, SPLIT_BY_CHARACTER, RECURSIVELY_SPLIT_BY_CHARACTER)],
     )
     CHUNK_SIZE = PropertyDescriptor(
         name="Chunk Size",
-        description="The maximum size of a chunk that should be returned",
+        description="The maximum size of a chunk that should be returned, measured in the configured Length Unit",
         required=True,
         default_value="4000",
         validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
     )
     CHUNK_OVERLAP = PropertyDescriptor(
         name="Chunk Overlap",
-        description="The number of characters that should be overlapped between each chunk of text",
+        description="""The amount of text, measured in the configured Length Unit, that should be overlapped between each chunk of text. Chunks of whole
+                    statements made with the Syntax Tree Code Boundaries do not overlap.""",
         required=True,
         default_value="200",
         validators=[StandardValidators.NON_NEGATIVE_INTEGER_VALIDATOR],
+        dependencies=[
+            PropertyDependency(
+                CHUNK_STRATEGY,
+                RECURSIVELY_SPLIT_BY_CHARACTER,
+                SPLIT_BY_CHARACTER,
+                SPLIT_CODE,
+                SPLIT_BY_HEADERS,
+                SEMANTIC,
+            )
+        ],
+    )
+    LENGTH_UNIT = PropertyDescriptor(
+        name="Length Unit",
+        description="""Specifies how the length of a chunk is measured when applying the Chunk Size and Chunk Overlap. Characters counts the number of characters in the text,
+                    while Tokens counts the number of tokens produced by the configured Tokenizer.""",
+        allowable_values=[TokenizerUtils.CHARACTERS, TokenizerUtils.TOKENS],
+        default_value=TokenizerUtils.CHARACTERS,
+        required=True,
+    )
+    TOKENIZER = PropertyDescriptor(
+        name="Tokenizer",
+        description="Specifies which tokenizer should be used to count the tokens in a chunk of text",
+        allowable_values=[TokenizerUtils.TIKTOKEN, TokenizerUtils.HUGGING_FACE_TOKENIZER],
+        default_value=TokenizerUtils.TIKTOKEN,
+        required=True,
+        dependencies=[PropertyDependency(LENGTH_UNIT, TokenizerUtils.TOKENS)],
+    )
+    TIKTOKEN_ENCODING = PropertyDescriptor(
+        name="Tiktoken Encoding",
+        description="The name of the tiktoken encoding to use, which should match the encoding of the embedding model, such as cl100k_base for text-embedding-ada-002",
+        allowable_values=["cl100k_base", "o200k_base", "p50k_base", "r50k_base"],
+        default_value="cl100k_base",
+        required=True,
+        dependencies=[PropertyDependency(TOKENIZER, TokenizerUtils.TIKTOKEN)],
+    )
+    TOKENIZER_FILE = PropertyDescriptor(
+        name="Tokenizer File",
+        description="""The path to a local Hugging Face 'tokenizer.json' file that describes the tokenizer of the embedding model. Hugging Face tokenizers
+                    require the 'tokenizers' package, which is not installed with this Processor.""",
+        validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+        required=True,
+        dependencies=[PropertyDependency(TOKENIZER, TokenizerUtils.HUGGING_FACE_TOKENIZER)],
     )
     KEEP_SEPARATOR = PropertyDescriptor(
         name="Keep Separator",
@@ -173,9 +290,197 @@ class ChunkDocument(FlowFileTransform):
         description="The language to use for the Code's syntax",
         required=True,
         default_value="python",
-        allowable_values=[e.value for e in Language],
+        allowable_values=LANGUAGES,
         dependencies=[PropertyDependency(CHUNK_STRATEGY, SPLIT_CODE)],
     )
+    CODE_BOUNDARIES = PropertyDescriptor(
+        name="Code Boundaries",
+        description="""Specifies how code is divided into chunks. Language Separators splits the code at regular expressions that match the start of
+                    declarations and statements of the Language. Syntax Tree parses the code and packs whole functions, classes and other statements into
+                    chunks of up to the Chunk Size, splitting larger declarations into their members, and only splitting at Language Separators within
+                    a single statement that is larger than the Chunk Size. Chunks of whole statements do not overlap, so the Chunk Overlap only applies
+                    where code is split at Language Separators. Python is parsed with the Python 'ast' module, and the other Languages with the grammars of
+                    the optional 'tree_sitter_languages' package, which is not installed with this Processor. Code that cannot be parsed, and code of
+                    other Languages when that package is not installed, is split at Language Separators.""",
+        required=True,
+        default_value=LANGUAGE_SEPARATORS,
+        allowable_values=[LANGUAGE_SEPARATORS, SYNTAX_TREE],
+        dependencies=[PropertyDependency(CHUNK_STRATEGY, SPLIT_CODE)],
+    )
+    HEADER_FORMAT = PropertyDescriptor(
+        name="Header Format",
+        description="""The markup language of the text, which determines how headers are recognized. Markdown recognizes '#' headers outside of fenced
+                    code blocks, while HTML recognizes h1 to h6 elements. Sections that are larger than the Chunk Size are split recursively by paragraphs,
+                    lines and words. ParseDocument removes the header markup when it parses Markdown or HTML, so its output is split along headers only
+                    when it is parsed with an Input Format of Plain Text, which keeps the markup, or with an Element Strategy of Document Per Element.
+                    In the latter case, the header path is built from the 'category' and 'category_depth' metadata fields of the Title elements that
+                    precede each document.""",
+        required=True,
+        default_value=MARKDOWN,
+        allowable_values=[MARKDOWN, HTML],
+        dependencies=[PropertyDependency(CHUNK_STRATEGY, SPLIT_BY_HEADERS)],
+    )
+    # The model descriptors of the vector store Processors depend on the Embedding Model by name, so they are shared
+    # with this Embedding Model, which only applies to the Semantic Chunking Strategy
+    EMBEDDING_MODEL = PropertyDescriptor(
+        name="Embedding Model",
+        description="Specifies which embedding model is used to compare the meaning of adjacent sentences when using the Semantic Chunking Strategy",
+        allowable_values=[HUGGING_FACE, OPENAI],
+        default_value=OPENAI,
+        required=True,
+        dependencies=[PropertyDependency(CHUNK_STRATEGY, SEMANTIC)],
+    )
+    OPENAI_API_KEY = PropertyDescriptor(
+        name="OpenAI API Key",
+        description="The API Key for interacting with OpenAI",
+        validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+        required=True,
+        sensitive=True,
+        dependencies=[PropertyDependency(EMBEDDING_MODEL, OPENAI)],
+    )
+    HUGGING_FACE_API_KEY = PropertyDescriptor(
+        name="HuggingFace API Key",
+        description="The API Key for interacting with HuggingFace",
+        validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+        required=True,
+        sensitive=True,
+        dependencies=[PropertyDependency(EMBEDDING_MODEL, HUGGING_FACE)],
+    )
+    BREAKPOINT_PERCENTILE = PropertyDescriptor(
+        name="Breakpoint Percentile",
+        description="""A new chunk is started between two sentences when the cosine distance between the sentences before and after them is greater than this
+                    percentile of all such distances in the document. Lower values produce more, smaller chunks.""",
+        required=True,
+        default_value="95",
+        validators=[StandardValidators._standard_validators.createLongValidator(0, 100, True)],
+        dependencies=[PropertyDependency(CHUNK_STRATEGY, SEMANTIC)],
+    )
+    SENTENCE_WINDOW_SIZE = PropertyDescriptor(
+        name="Sentence Window Size",
+        description="""The number of sentences on each side of a sentence boundary whose embeddings are combined when comparing the text before and after
+                    the boundary. Larger windows make the breakpoints less sensitive to individual short sentences.""",
+        required=True,
+        default_value="1",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+        dependencies=[PropertyDependency(CHUNK_STRATEGY, SEMANTIC)],
+    )
+    EMBEDDING_BATCH_SIZE = PropertyDescriptor(
+        name="Embedding Batch Size",
+        description="""The maximum number of sentences sent to the Embedding Model in a single request. The sentences of many documents are embedded
+                    together, so fewer requests are made than there are documents.""",
+        required=True,
+        default_value="64",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+        dependencies=[PropertyDependency(CHUNK_STRATEGY, SEMANTIC)],
+    )
+    DEDUPLICATION = PropertyDescriptor(
+        name="Deduplication",
+        description="""Specifies whether chunks that repeat earlier chunks, such as headers, footers and other boilerplate, are removed from the output.
+                    Exact Duplicates removes chunks whose text is identical to an earlier chunk. Exact and Near Duplicates also removes chunks whose
+                    estimated word shingle similarity to an earlier chunk is at least the Similarity Threshold, using MinHash and Locality-Sensitive Hashing.
+                    Near duplicates require the 'numpy' package, which is not installed with this Processor. The number of removed chunks is written to the 'chunk.dedup.count' attribute.""",
+        required=True,
+        default_value=DeduplicationUtils.NONE,
+        allowable_values=[
+            DeduplicationUtils.NONE,
+            DeduplicationUtils.EXACT_DUPLICATES,
+            DeduplicationUtils.NEAR_DUPLICATES,
+        ],
+    )
+    SIMILARITY_THRESHOLD = PropertyDescriptor(
+        name="Similarity Threshold",
+        description="The estimated Jaccard similarity, between 0 and 1, at or above which a chunk is considered a near duplicate of an earlier chunk",
+        required=True,
+        default_value="0.9",
+        validators=[StandardValidators._standard_validators.createNonNegativeFloatingPointValidator(1.0)],
+        dependencies=[PropertyDependency(DEDUPLICATION, DeduplicationUtils.NEAR_DUPLICATES)],
+    )
+    SIGNATURE_STORE = PropertyDescriptor(
+        name="Signature Store File",
+        description="""The path to a local SQLite database in which the hashes and signatures of chunks are kept, so that duplicates are also removed across
+                    FlowFiles. The database is created if it does not exist. If not specified, chunks are only compared with other chunks of the same FlowFile.""",
+        required=False,
+        validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+        dependencies=[
+            PropertyDependency(DEDUPLICATION, DeduplicationUtils.EXACT_DUPLICATES, DeduplicationUtils.NEAR_DUPLICATES)
+        ],
+    )
+    SIGNATURE_STORE_CAPACITY = PropertyDescriptor(
+        name="Signature Store Capacity",
+        description="""The maximum number of chunks whose hashes and signatures are kept in the Signature Store File. When it is exceeded, the chunks that were
+                    least recently seen are removed, and are no longer detected as duplicates.""",
+        required=True,
+        default_value="1000000",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+        dependencies=[
+            PropertyDependency(DEDUPLICATION, DeduplicationUtils.EXACT_DUPLICATES, DeduplicationUtils.NEAR_DUPLICATES)
+        ],
+    )
+    CHUNK_INDEX_SCOPE = PropertyDescriptor(
+        name="Chunk Index Scope",
+        description="""Specifies what the 'chunk_index' and 'chunk_count' metadata fields of each chunk refer to. FlowFile numbers the chunks of all documents
+                    in the FlowFile together, while Source Document numbers the chunks of each incoming document separately, so that the neighbors of a
+                    chunk can be found from its metadata alone.""",
+        required=True,
+        default_value=FLOWFILE_SCOPE,
+        allowable_values=[FLOWFILE_SCOPE, SOURCE_DOCUMENT_SCOPE],
+    )
+    INCLUDE_OFFSETS = PropertyDescriptor(
+        name="Include Chunk Offsets",
+        description="""Whether or not to add 'start_offset' and 'end_offset' metadata fields with the character offsets of the text that each chunk was
+                    taken from in its source document. The Native engine tracks the offsets while splitting. The LangChain engine locates each chunk by
+                    searching the source text after the previous chunk, which may match an earlier occurrence of repeated text, and the offsets are null
+                    for chunks whose splits were joined with a separator that differs from the source text.""",
+        required=True,
+        default_value="false",
+        allowable_values=["true", "false"],
+    )
+    CHUNK_STATISTICS = PropertyDescriptor(
+        name="Chunk Statistics",
+        description="""Whether or not to add attributes that describe the chunks of each FlowFile: the minimum, mean, 95th percentile and maximum
+                    length of the chunks in characters, and in tokens when the Length Unit is Tokens, the number of bytes of text that consecutive chunks
+                    of the same source document share, and the milliseconds spent loading, splitting and serializing the documents.""",
+        required=True,
+        default_value="false",
+        allowable_values=["true", "false"],
+    )
+    HISTOGRAM_LOG_INTERVAL = PropertyDescriptor(
+        name="Histogram Log Interval",
+        description="""How often to log a histogram of the lengths of the chunks of all FlowFiles processed since the previous histogram was logged.
+                    If not specified, no histogram is logged.""",
+        required=False,
+        validators=[StandardValidators.TIME_PERIOD_VALIDATOR],
+        dependencies=[PropertyDependency(CHUNK_STATISTICS, "true")],
+    )
+    SPLITTING_ENGINE = PropertyDescriptor(
+        name="Splitting Engine",
+        description="""Specifies which implementation performs the splitting. The Native engine produces the same chunks as the LangChain text splitters while
+                    tracking splits as offsets into the source text, and serializes the metadata of each source document once rather than once per chunk.
+                    Separators that are Regular Expressions containing capturing groups are always split using LangChain.""",
+        required=True,
+        default_value=NATIVE,
+        allowable_values=[NATIVE, LANGCHAIN],
+    )
+    STREAM_DOCUMENTS = PropertyDescriptor(
+        name="Stream Documents",
+        description="""Whether or not to read, split and serialize the incoming documents one line at a time. When enabled, no intermediate list of Documents
+                    is created and each chunk is serialized as soon as its document is split. The FlowFile contents are still read into memory as a whole,
+                    and the serialized chunks are held until all documents have been split, when the number of chunks is known, so memory usage peaks at
+                    about the size of the FlowFile contents plus twice the size of the output, rather than also holding every Document and every chunk
+                    object at once. The 'chunk_index' and 'chunk_count' metadata fields are written as the last fields of each chunk's metadata.""",
+        required=True,
+        default_value="false",
+        allowable_values=["true", "false"],
+    )
+    WORKER_PROCESSES = PropertyDescriptor(
+        name="Worker Processes",
+        description="""The number of Python processes to use for splitting the documents of a FlowFile. When set to 1, documents are split in the Processor's own
+                    process. When greater than 1, the documents are divided into contiguous slices that are split in parallel by a pool of worker processes,
+                    and the resulting chunks are written in their original order. The Semantic Chunking Strategy always splits in the Processor's own process.""",
+        required=True,
+        default_value="1",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+    )
 
     property_descriptors = [
         CHUNK_STRATEGY,
@@ -183,53 +488,252 @@ class ChunkDocument(FlowFileTransform):
         SEPARATOR_FORMAT,
         CHUNK_SIZE,
         CHUNK_OVERLAP,
+        LENGTH_UNIT,
+        TOKENIZER,
+        TIKTOKEN_ENCODING,
+        TOKENIZER_FILE,
         KEEP_SEPARATOR,
         STRIP_WHITESPACE,
         LANGUAGE,
+        CODE_BOUNDARIES,
+        HEADER_FORMAT,
+        EMBEDDING_MODEL,
+        OPENAI_API_KEY,
+        OPENAI_MODEL,
+        HUGGING_FACE_API_KEY,
+        HUGGING_FACE_MODEL,
+        BREAKPOINT_PERCENTILE,
+        SENTENCE_WINDOW_SIZE,
+        EMBEDDING_BATCH_SIZE,
+        DEDUPLICATION,
+        SIMILARITY_THRESHOLD,
+        SIGNATURE_STORE,
+        SIGNATURE_STORE_CAPACITY,
+        CHUNK_INDEX_SCOPE,
+        INCLUDE_OFFSETS,
+        CHUNK_STATISTICS,
+        HISTOGRAM_LOG_INTERVAL,
+        SPLITTING_ENGINE,
+        STREAM_DOCUMENTS,
+        WORKER_PROCESSES,
     ]
 
-    def __init__(self, **kwargs):
-        pass
+    length_settings = None
+    length_function = None
+    executor = None
+    worker_processes = 1
+    text_splitter = None
+    text_splitters = None
+    text_splitters_lock = None
+    include_chunk_hash = False
+    include_offsets = False
+    index_per_source = False
+    collect_statistics = False
+    histogram = None
+
+    def __init__(self, **kwargs):  # noqa: ARG002
+        self.text_splitters = OrderedDict()
+        self.text_splitters_lock = threading.Lock()
 
     def getPropertyDescriptors(self):
         return self.property_descriptors
 
-    def split_docs(self, context, flowfile, documents):
-        from langchain.text_splitter import CharacterTextSplitter, RecursiveCharacterTextSplitter
-
-        strategy = context.getProperty(self.CHUNK_STRATEGY).getValue()
-        if strategy == SPLIT_BY_CHARACTER:
-            text_splitter = CharacterTextSplitter(
-                separator=context.getProperty(self.SEPARATOR).evaluateAttributeExpressions(flowfile).getValue(),
-                keep_separator=context.getProperty(self.KEEP_SEPARATOR).asBoolean(),
-                is_separator_regex=context.getProperty(self.SEPARATOR_FORMAT).getValue() == "Regular Expression",
-                chunk_size=context.getProperty(self.CHUNK_SIZE).asInteger(),
-                chunk_overlap=context.getProperty(self.CHUNK_OVERLAP).asInteger(),
-                length_function=len,
-                strip_whitespace=context.getProperty(self.STRIP_WHITESPACE).asBoolean(),
-            )
-        elif strategy == SPLIT_CODE:
-            text_splitter = RecursiveCharacterTextSplitter.from_language(
-                language=context.getProperty(self.LANGUAGE).getValue(),
-                chunk_size=context.getProperty(self.CHUNK_SIZE).asInteger(),
-                chunk_overlap=context.getProperty(self.CHUNK_OVERLAP).asInteger(),
-            )
+    def onScheduled(self, context):
+        with self.text_splitters_lock:
+            self.text_splitters.clear()
+
+        self.include_chunk_hash = context.getProperty(self.CHUNK_STRATEGY).getValue() == CONTENT_DEFINED
+        self.include_offsets = context.getProperty(self.INCLUDE_OFFSETS).asBoolean()
+        self.index_per_source = context.getProperty(self.CHUNK_INDEX_SCOPE).getValue() == SOURCE_DOCUMENT_SCOPE
+        self.collect_statistics = context.getProperty(self.CHUNK_STATISTICS).asBoolean()
+
+        histogram_interval = context.getProperty(self.HISTOGRAM_LOG_INTERVAL).getValue()
+        if self.collect_statistics and histogram_interval is not None:
+            interval_seconds = context.getProperty(self.HISTOGRAM_LOG_INTERVAL).asTimePeriod(TimeUnit.SECONDS)
+            self.histogram = ChunkStatistics.ChunkLengthHistogram(interval_seconds)
         else:
-            separator_text = context.getProperty(self.SEPARATOR).evaluateAttributeExpressions(flowfile).getValue()
-            splits = separator_text.split(",")
-            unescaped = []
-            for split in splits:
-                unescaped.append(split.replace("\\n", "\n").replace("\\r", "\r").replace("\\t", "\t"))
-            text_splitter = RecursiveCharacterTextSplitter(
-                separators=unescaped,
-                keep_separator=context.getProperty(self.KEEP_SEPARATOR).asBoolean(),
-                is_separator_regex=context.getProperty(self.SEPARATOR_FORMAT).getValue() == "Regular Expression",
-                chunk_size=context.getProperty(self.CHUNK_SIZE).asInteger(),
-                chunk_overlap=context.getProperty(self.CHUNK_OVERLAP).asInteger(),
-                length_function=len,
-                strip_whitespace=context.getProperty(self.STRIP_WHITESPACE).asBoolean(),
+            self.histogram = None
+
+        self.length_settings = self.get_length_settings(context)
+        self.length_function = TokenizerUtils.create_length_function(**self.length_settings)
+
+        # A Separator that does not reference FlowFile attributes evaluates to the same value for every FlowFile,
+        # so the splitter can be created once instead of for each FlowFile
+        semantic = context.getProperty(self.CHUNK_STRATEGY).getValue() == SEMANTIC
+        separator = context.getProperty(self.SEPARATOR).getValue()
+        if semantic or separator is None or "${" not in separator:
+            self.text_splitter = self.create_text_splitter(context, separator)
+        else:
+            self.text_splitter = None
+
+        signature_store = context.getProperty(self.SIGNATURE_STORE).getValue()
+        if (
+            context.getProperty(self.DEDUPLICATION).getValue() != DeduplicationUtils.NONE
+            and signature_store is not None
+        ):
+            SQLiteSignatureStore.create_schema(signature_store)
+
+        # The Semantic strategy spends its time waiting for the Embedding Model, which worker processes would not speed up
+        self.worker_processes = context.getProperty(self.WORKER_PROCESSES).asInteger()
+        if self.worker_processes > 1 and not semantic:
+            # Worker processes are spawned rather than forked so that they do not inherit the state of the NiFi communication threads
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.worker_processes, mp_context=multiprocessing.get_context("spawn")
             )
 
+    def onStopped(self, context):  # noqa: ARG002
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def get_length_settings(self, context) -> dict:
+        return {
+            "length_unit": context.getProperty(self.LENGTH_UNIT).getValue(),
+            "tokenizer": context.getProperty(self.TOKENIZER).getValue(),
+            "tiktoken_encoding": context.getProperty(self.TIKTOKEN_ENCODING).getValue(),
+            "tokenizer_file": context.getProperty(self.TOKENIZER_FILE).getValue(),
+        }
+
+    def get_text_splitter(self, context, flowfile):
+        if self.text_splitter is not None:
+            return self.text_splitter
+
+        separator = context.getProperty(self.SEPARATOR).evaluateAttributeExpressions(flowfile).getValue()
+        with self.text_splitters_lock:
+            text_splitter = self.text_splitters.get(separator)
+            if text_splitter is not None:
+                self.text_splitters.move_to_end(separator)
+                return text_splitter
+
+        text_splitter = self.create_text_splitter(context, separator)
+        with self.text_splitters_lock:
+            self.text_splitters[separator] = text_splitter
+            if len(self.text_splitters) > TEXT_SPLITTER_CACHE_SIZE:
+                self.text_splitters.popitem(last=False)
+
+        return text_splitter
+
+    def get_splitter_settings(self, context, separator) -> dict:
+        return {
+            "engine": context.getProperty(self.SPLITTING_ENGINE).getValue(),
+            "strategy": context.getProperty(self.CHUNK_STRATEGY).getValue(),
+            "separator": separator,
+            "separator_format": context.getProperty(self.SEPARATOR_FORMAT).getValue(),
+            "keep_separator": context.getProperty(self.KEEP_SEPARATOR).asBoolean(),
+            "strip_whitespace": context.getProperty(self.STRIP_WHITESPACE).asBoolean(),
+            "chunk_size": context.getProperty(self.CHUNK_SIZE).asInteger(),
+            "chunk_overlap": context.getProperty(self.CHUNK_OVERLAP).asInteger(),
+            "language": context.getProperty(self.LANGUAGE).getValue(),
+            "code_boundaries": context.getProperty(self.CODE_BOUNDARIES).getValue(),
+            "header_format": context.getProperty(self.HEADER_FORMAT).getValue(),
+        }
+
+    def create_semantic_text_splitter(self, context):
+        return SemanticTextSplitter(
+            create_embedding_service(context),
+            breakpoint_percentile=context.getProperty(self.BREAKPOINT_PERCENTILE).asInteger(),
+            window_size=context.getProperty(self.SENTENCE_WINDOW_SIZE).asInteger(),
+            embedding_batch_size=context.getProperty(self.EMBEDDING_BATCH_SIZE).asInteger(),
+            chunk_size=context.getProperty(self.CHUNK_SIZE).asInteger(),
+            chunk_overlap=context.getProperty(self.CHUNK_OVERLAP).asInteger(),
+            length_function=self.length_function,
+        )
+
+    def create_text_splitter(self, context, separator):
+        if context.getProperty(self.CHUNK_STRATEGY).getValue() == SEMANTIC:
+            return self.create_semantic_text_splitter(context)
+        return create_text_splitter(self.length_function, **self.get_splitter_settings(context, separator))
+
+    def split_texts_in_parallel(self, context, flowfile, texts: list[str]) -> list[list[tuple[str, int, int]]]:
+        separator = context.getProperty(self.SEPARATOR).evaluateAttributeExpressions(flowfile).getValue()
+        splitter_settings = self.get_splitter_settings(context, separator)
+
+        # Several slices per worker keep all workers busy when the documents differ in size
+        slice_size = math.ceil(len(texts) / (self.worker_processes * SLICES_PER_WORKER))
+        slices = [texts[i : i + slice_size] for i in range(0, len(texts), slice_size)]
+
+        chunk_lists = []
+        for slice_chunk_lists in self.executor.map(
+            split_texts, repeat(splitter_settings), repeat(self.length_settings), slices
+        ):
+            chunk_lists.extend(slice_chunk_lists)
+
+        return chunk_lists
+
+    def iterate_split_docs(self, context, flowfile, documents):
+        if self.executor is None:
+            text_splitter = self.get_text_splitter(context, flowfile)
+            if isinstance(text_splitter, SemanticTextSplitter):
+                yield from self.iterate_semantic_split_docs(text_splitter, documents)
+                return
+
+            for page_content, metadata in documents:
+                yield split_text_with_offsets(text_splitter, page_content), metadata
+            return
+
+        documents = iter(documents)
+        while batch := list(islice(documents, PARALLEL_BATCH_SIZE)):
+            chunk_lists = self.split_texts_in_parallel(context, flowfile, [page_content for page_content, _ in batch])
+            for chunks, (_, metadata) in zip(chunk_lists, batch, strict=True):
+                yield chunks, metadata
+
+    def iterate_semantic_split_docs(self, text_splitter: SemanticTextSplitter, documents):
+        # The sentences of a batch of documents are embedded together so that each request to the Embedding Model is full
+        documents = iter(documents)
+        while batch := list(islice(documents, SEMANTIC_BATCH_SIZE)):
+            chunk_lists = text_splitter.split_texts_with_offsets([page_content for page_content, _ in batch])
+            for chunks, (_, metadata) in zip(chunk_lists, batch, strict=True):
+                yield chunks, metadata
+
+    def iterate_header_split_docs(self, context, flowfile, documents):
+        # Documents parsed into elements carry no header markup, so the titles of the Title elements that precede each
+        # document are prepended to the header path of its chunks. The paths are queued in document order, in which the
+        # split documents are returned.
+        element_header_paths = deque()
+
+        def iterate_element_header_paths():
+            headers = []
+            for page_content, metadata in documents:
+                if metadata.get("category") == TITLE_CATEGORY:
+                    level = metadata.get("category_depth") or 0
+                    while headers and headers[-1][0] >= level:
+                        headers.pop()
+                    headers.append((level, " ".join(page_content.split())))
+                element_header_paths.append([title for _, title in headers])
+                yield page_content, metadata
+
+        for chunks, metadata in self.iterate_split_docs(context, flowfile, iterate_element_header_paths()):
+            header_path = element_header_paths.popleft()
+            if not header_path:
+                yield chunks, metadata
+                continue
+
+            header_chunks = [
+                (
+                    *chunk[:CHUNK_METADATA_POSITION],
+                    {"header_path": header_path + chunk[CHUNK_METADATA_POSITION]["header_path"]},
+                )
+                for chunk in chunks
+            ]
+            yield header_chunks, metadata
+
+    def create_deduplicator(self, context, store) -> ChunkDeduplicator:
+        return ChunkDeduplicator(
+            store,
+            near_duplicates=context.getProperty(self.DEDUPLICATION).getValue() == DeduplicationUtils.NEAR_DUPLICATES,
+            threshold=context.getProperty(self.SIMILARITY_THRESHOLD).asFloat(),
+        )
+
+    def deduplicate_split_docs(self, split_docs, deduplicator: ChunkDeduplicator | None):
+        if deduplicator is None:
+            yield from split_docs
+            return
+
+        for chunks, metadata in split_docs:
+            yield [chunk for chunk in chunks if not deduplicator.is_duplicate(chunk[0])], metadata
+
+    def split_docs(self, context, flowfile, documents):
+        text_splitter = self.get_text_splitter(context, flowfile)
         return text_splitter.split_documents(documents)
 
     def to_json(self, docs) -> str:
@@ -244,14 +748,90 @@ class ChunkDocument(FlowFileTransform):
 
         return "\n".join(json_docs)
 
-    def load_docs(self, flowfile):
+    def remove_chunk_fields(self, metadata: dict, chunks: list) -> None:
+        # Fields that are written for every chunk replace the values that the source document carried
+        if self.include_chunk_hash:
+            metadata.pop("chunk_hash", None)
+        if self.include_offsets:
+            metadata.pop("start_offset", None)
+            metadata.pop("end_offset", None)
+        if chunks and len(chunks[0]) > CHUNK_METADATA_POSITION:
+            for key in chunks[0][CHUNK_METADATA_POSITION]:
+                metadata.pop(key, None)
+
+    def set_chunk_fields(self, metadata: dict, chunk: tuple) -> None:
+        if len(chunk) > CHUNK_METADATA_POSITION:
+            metadata.update(chunk[CHUNK_METADATA_POSITION])
+        if self.include_chunk_hash:
+            metadata["chunk_hash"] = DeduplicationUtils.hash_text(chunk[0]).hex()
+        if self.include_offsets:
+            metadata["start_offset"] = chunk[1]
+            metadata["end_offset"] = chunk[2]
+
+    def serialize_chunk_fields(self, chunk: tuple) -> str:
+        fields = ""
+        if len(chunk) > CHUNK_METADATA_POSITION:
+            for key, value in chunk[CHUNK_METADATA_POSITION].items():
+                fields += f"{json.dumps(key)}: {json.dumps(value)}, "
+        if self.include_chunk_hash:
+            fields += f'"chunk_hash": "{DeduplicationUtils.hash_text(chunk[0]).hex()}", '
+        if self.include_offsets:
+            fields += f'"start_offset": {json.dumps(chunk[1])}, "end_offset": {json.dumps(chunk[2])}, '
+        return fields
+
+    def serialize_metadata_prefix(self, metadata: dict) -> str:
+        # The metadata shared by the chunks of a source document is serialized once, without its closing brace, so that
+        # the chunk fields can be appended for each chunk
+        metadata.pop("chunk_index", None)
+        metadata.pop("chunk_count", None)
+        if len(metadata) == 0:
+            return "{"
+        return json.dumps(metadata)[:-1] + ", "
+
+    def has_trailing_chunk_fields(self, metadata: dict) -> bool:
+        keys = [key for key in metadata if key in ("chunk_index", "chunk_count")]
+        trailing_keys = list(metadata)[len(metadata) - len(keys) :]
+        return keys == ["chunk_index", "chunk_count"][: len(keys)] and trailing_keys == keys
+
+    def split_docs_to_json(self, split_docs) -> tuple[str, int]:
+        chunk_count = sum(len(chunks) for chunks, _ in split_docs)
+        json_docs = []
+
+        for chunks, metadata in split_docs:
+            self.remove_chunk_fields(metadata, chunks)
+            first_index = 0 if self.index_per_source else len(json_docs)
+            count = len(chunks) if self.index_per_source else chunk_count
+
+            # Chunk fields that precede other metadata fields keep their position, so each chunk's metadata is serialized
+            if not self.has_trailing_chunk_fields(metadata):
+                for i, chunk in enumerate(chunks, first_index):
+                    self.set_chunk_fields(metadata, chunk)
+                    metadata["chunk_index"] = i
+                    metadata["chunk_count"] = count
+
+                    json_doc = json.dumps({TEXT_KEY: chunk[0], METADATA_KEY: metadata})
+                    json_docs.append(json_doc)
+                continue
+
+            metadata_prefix = self.serialize_metadata_prefix(metadata)
+            for i, chunk in enumerate(chunks, first_index):
+                json_doc = (
+                    f'{{"{TEXT_KEY}": {json.dumps(chunk[0])}, "{METADATA_KEY}": {metadata_prefix}'
+                    f"{self.serialize_chunk_fields(chunk)}"
+                    f'"chunk_index": {i}, "chunk_count": {count}}}}}'
+                )
+                json_docs.append(json_doc)
+
+        return "\n".join(json_docs), chunk_count
+
+    def load_docs(self, context, flowfile, attributes: dict):  # noqa: ARG002
         from langchain.schema import Document
 
-        flowfile_contents = flowfile.getContentsAsBytes().decode()
+        # Each line is decoded on its own, rather than decoding the FlowFile contents into a single string
         docs = []
-        for line in flowfile_contents.split("\n"):
-            stripped = line.strip()
-            if stripped == "":
+        for line in self.iterate_lines(flowfile.getContentsAsBytes()):
+            stripped = bytes(line).strip()
+            if stripped == b"":
                 continue
 
             json_element = json.loads(stripped)
@@ -268,10 +848,164 @@ class ChunkDocument(FlowFileTransform):
 
         return docs
 
+    def iterate_lines(self, contents: bytes):
+        view = memoryview(contents)
+        start = 0
+        end_of_contents = len(contents)
+        while start < end_of_contents:
+            end = contents.find(b"\n", start)
+            if end == -1:
+                end = end_of_contents
+
+            line = view[start:end]
+            start = end + 1
+            yield line
+
+    def iterate_docs(self, context, flowfile, attributes: dict):  # noqa: ARG002
+        for i, line in enumerate(self.iterate_lines(flowfile.getContentsAsBytes())):
+            stripped = bytes(line).strip()
+            if stripped == b"":
+                continue
+
+            try:
+                json_element = json.loads(stripped)
+            except Exception as e:
+                message = f"Could not parse line {i + 1} as JSON"
+                raise ValueError(message) from e
+
+            page_content = json_element.get(TEXT_KEY)
+            if page_content is None:
+                continue
+
+            metadata = json_element.get(METADATA_KEY)
+            if metadata is None:
+                metadata = {}
+
+            yield page_content, metadata
+
+    def stream_chunks(self, split_docs) -> tuple[bytes, int]:
+        if self.index_per_source:
+            return self.stream_source_chunks(split_docs)
+
+        # The total number of chunks is not known until every document has been split, so each chunk is serialized
+        # without its closing braces and the 'chunk_count' field is appended once all documents have been consumed.
+        serialized_chunks = []
+        for chunks, metadata in split_docs:
+            self.remove_chunk_fields(metadata, chunks)
+            metadata_prefix = self.serialize_metadata_prefix(metadata)
+            for chunk in chunks:
+                json_doc = (
+                    f'{{"{TEXT_KEY}": {json.dumps(chunk[0])}, "{METADATA_KEY}": {metadata_prefix}'
+                    f"{self.serialize_chunk_fields(chunk)}"
+                    f'"chunk_index": {len(serialized_chunks)}'
+                )
+                serialized_chunks.append(json_doc.encode())
+
+        chunk_count = len(serialized_chunks)
+        suffix = f', "chunk_count": {chunk_count}}}}}'.encode()
+        return b"".join(iter_json_lines(serialized_chunks, suffix)), chunk_count
+
+    def stream_source_chunks(self, split_docs) -> tuple[bytes, int]:
+        # Chunks are counted per source document, so each chunk is complete as soon as its document has been split
+        json_docs = []
+        for chunks, metadata in split_docs:
+            self.remove_chunk_fields(metadata, chunks)
+            metadata_prefix = self.serialize_metadata_prefix(metadata)
+            for i, chunk in enumerate(chunks):
+                json_doc = (
+                    f'{{"{TEXT_KEY}": {json.dumps(chunk[0])}, "{METADATA_KEY}": {metadata_prefix}'
+                    f"{self.serialize_chunk_fields(chunk)}"
+                    f'"chunk_index": {i}, "chunk_count": {len(chunks)}}}}}'
+                )
+                json_docs.append(json_doc.encode())
+
+        return b"\n".join(json_docs), len(json_docs)
+
     def transform(self, context, flowfile):
-        documents = self.load_docs(flowfile)
-        split_docs = self.split_docs(context, flowfile, documents)
+        if context.getProperty(self.DEDUPLICATION).getValue() == DeduplicationUtils.NONE:
+            return self.transform_chunks(context, flowfile, None)
+
+        signature_store = context.getProperty(self.SIGNATURE_STORE).getValue()
+        if signature_store is None:
+            return self.transform_chunks(context, flowfile, self.create_deduplicator(context, MemorySignatureStore()))
+
+        # The signatures of a FlowFile are committed only if it is chunked successfully, so a failed FlowFile that is
+        # retried is not considered a duplicate of itself. They are written after chunking in a short transaction, so
+        # that the store is not locked while the FlowFile is being chunked.
+        connection = sqlite3.connect(signature_store, timeout=DeduplicationUtils.STORE_TIMEOUT)
+        try:
+            store = SQLiteSignatureStore(connection, context.getProperty(self.SIGNATURE_STORE_CAPACITY).asInteger())
+            result = self.transform_chunks(context, flowfile, self.create_deduplicator(context, store))
+            store.commit()
+            return result
+        finally:
+            connection.close()
 
-        output_json = self.to_json(split_docs)
-        attributes = {"document.count": str(len(split_docs))}
+    def iterate_final_split_docs(
+        self,
+        context,
+        flowfile,
+        deduplicator: ChunkDeduplicator | None,
+        statistics: ChunkStatistics.ChunkStatistics | None,
+        attributes: dict,
+    ):
+        documents = self.iterate_docs(context, flowfile, attributes)
+        if statistics is not None:
+            documents = statistics.time_iterable(documents, ChunkStatistics.LOAD)
+
+        if context.getProperty(self.CHUNK_STRATEGY).getValue() == SPLIT_BY_HEADERS:
+            split_docs = self.iterate_header_split_docs(context, flowfile, documents)
+        else:
+            split_docs = self.iterate_split_docs(context, flowfile, documents)
+        split_docs = self.deduplicate_split_docs(split_docs, deduplicator)
+        if statistics is not None:
+            split_docs = statistics.record_split_docs(statistics.time_iterable(split_docs, ChunkStatistics.SPLIT))
+        return split_docs
+
+    def transform_chunks(self, context, flowfile, deduplicator: ChunkDeduplicator | None):
+        attributes = {}
+        statistics = None
+        if self.collect_statistics:
+            token_length_function = self.length_function if self.length_function is not len else None
+            statistics = ChunkStatistics.ChunkStatistics(token_length_function)
+        start = time.perf_counter()
+
+        if context.getProperty(self.STREAM_DOCUMENTS).asBoolean():
+            split_docs = self.iterate_final_split_docs(context, flowfile, deduplicator, statistics, attributes)
+            output_json, chunk_count = self.stream_chunks(split_docs)
+        elif (
+            self.executor is not None
+            or context.getProperty(self.SPLITTING_ENGINE).getValue() == NATIVE
+            or context.getProperty(self.CHUNK_STRATEGY).getValue() in (SPLIT_BY_HEADERS, SEMANTIC, CONTENT_DEFINED)
+            or context.getProperty(self.CODE_BOUNDARIES).getValue() == SYNTAX_TREE
+            or self.include_offsets
+            or self.index_per_source
+            or statistics is not None
+        ):
+            split_docs = self.iterate_final_split_docs(context, flowfile, deduplicator, statistics, attributes)
+            output_json, chunk_count = self.split_docs_to_json(list(split_docs))
+        else:
+            documents = self.load_docs(context, flowfile, attributes)
+            split_docs = self.split_docs(context, flowfile, documents)
+            if deduplicator is not None:
+                split_docs = [doc for doc in split_docs if not deduplicator.is_duplicate(doc.page_content)]
+
+            output_json = self.to_json(split_docs)
+            chunk_count = len(split_docs)
+
+        attributes["document.count"] = str(chunk_count)
+        if deduplicator is not None:
+            attributes["chunk.dedup.count"] = str(deduplicator.duplicate_count)
+        if statistics is not None:
+            statistics.finish(time.perf_counter() - start)
+            attributes.update(statistics.to_attributes())
+            self.log_histogram(statistics)
         return FlowFileTransformResult("success", contents=output_json, attributes=attributes)
+
+    def log_histogram(self, statistics: ChunkStatistics.ChunkStatistics) -> None:
+        if self.histogram is None:
+            return
+
+        description = self.histogram.add(statistics.character_lengths)
+        if description is not None:
+            self.logger.info(description)
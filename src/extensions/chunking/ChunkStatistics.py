@@ -0,0 +1,127 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import math
+import threading
+import time
+
+# Stages whose durations are reported for each FlowFile
+LOAD = "load"
+SPLIT = "split"
+SERIALIZE = "serialize"
+
+
+def get_percentile(sorted_values: list[int], percentile: int) -> int:
+    # Nearest-rank percentile, which is always one of the values
+    return sorted_values[max(math.ceil(len(sorted_values) * percentile / 100) - 1, 0)]
+
+
+class ChunkStatistics:
+    """
+    Collects the lengths of the chunks of a FlowFile, the amount of text that consecutive chunks of the same source
+    document share, and the time spent in each stage of chunking.
+    """
+
+    def __init__(self, token_length_function=None):
+        self.token_length_function = token_length_function
+        self.character_lengths = []
+        self.token_lengths = []
+        self.overlap_bytes = 0
+        self.durations = {LOAD: 0.0, SPLIT: 0.0, SERIALIZE: 0.0}
+        self.recording_duration = 0.0
+
+    def record_chunks(self, chunks: list) -> None:
+        recording_start = time.perf_counter()
+        previous_end = None
+        for chunk in chunks:
+            text, start, end = chunk[0], chunk[1], chunk[2]
+            self.character_lengths.append(len(text))
+            if self.token_length_function is not None:
+                self.token_lengths.append(self.token_length_function(text))
+
+            if previous_end is not None and start is not None and previous_end > start:
+                self.overlap_bytes += len(text[: previous_end - start].encode())
+            previous_end = end
+        self.recording_duration += time.perf_counter() - recording_start
+
+    def record_split_docs(self, split_docs):
+        for chunks, metadata in split_docs:
+            self.record_chunks(chunks)
+            yield chunks, metadata
+
+    def time_iterable(self, iterable, stage: str):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.durations[stage] += time.perf_counter() - start
+                return
+            self.durations[stage] += time.perf_counter() - start
+            yield item
+
+    def finish(self, total_duration: float) -> None:
+        # Documents are loaded while they are split, and serialized as they are split, so the time spent splitting includes
+        # the time spent loading, and whatever remains of the total is spent serializing. Collecting the statistics is
+        # not attributed to any stage.
+        self.durations[SPLIT] -= self.durations[LOAD]
+        self.durations[SERIALIZE] = max(
+            total_duration - self.durations[SPLIT] - self.durations[LOAD] - self.recording_duration, 0.0
+        )
+
+    def to_attributes(self) -> dict:
+        attributes = {
+            "chunk.overlap.bytes": str(self.overlap_bytes),
+            "chunk.time.load.ms": str(round(self.durations[LOAD] * 1000)),
+            "chunk.time.split.ms": str(round(self.durations[SPLIT] * 1000)),
+            "chunk.time.serialize.ms": str(round(self.durations[SERIALIZE] * 1000)),
+        }
+        self.add_length_attributes(attributes, "chars", self.character_lengths)
+        if self.token_length_function is not None:
+            self.add_length_attributes(attributes, "tokens", self.token_lengths)
+        return attributes
+
+    def add_length_attributes(self, attributes: dict, unit: str, lengths: list[int]) -> None:
+        if len(lengths) == 0:
+            return
+
+        sorted_lengths = sorted(lengths)
+        attributes[f"chunk.length.{unit}.min"] = str(sorted_lengths[0])
+        attributes[f"chunk.length.{unit}.mean"] = str(round(sum(sorted_lengths) / len(sorted_lengths), 1))
+        attributes[f"chunk.length.{unit}.p95"] = str(get_percentile(sorted_lengths, 95))
+        attributes[f"chunk.length.{unit}.max"] = str(sorted_lengths[-1])
+
+
+class ChunkLengthHistogram:
+    """
+    Counts the lengths of the chunks of all FlowFiles in buckets whose upper bounds are powers of two, and describes the
+    counts once per interval, after which counting starts over.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.flowfile_count = 0
+        self.interval_start = time.monotonic()
+
+    def add(self, lengths: list[int]) -> str | None:
+        """
+        Adds the chunk lengths of a FlowFile, returning a description of the histogram when the interval has elapsed.
+        """
+        with self.lock:
+            for length in lengths:
+                bucket = max(length - 1, 0).bit_length()
+                self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+            self.flowfile_count += 1
+
+            now = time.monotonic()
+            if now - self.interval_start < self.interval_seconds:
+                return None
+
+            counts = ", ".join(f"<={1 << bucket}: {self.buckets[bucket]}" for bucket in sorted(self.buckets))
+            description = f"Chunk lengths in characters of {self.flowfile_count} FlowFiles: {counts}"
+            self.buckets = {}
+            self.flowfile_count = 0
+            self.interval_start = now
+            return description
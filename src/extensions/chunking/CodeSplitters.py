@@ -0,0 +1,207 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Maximum number of parsed files whose syntax units are retained by each splitter
+PARSE_CACHE_SIZE = 1024
+
+# Names of the tree-sitter grammars for the languages of the Split Code strategy whose names differ
+TREE_SITTER_LANGUAGES = {
+    "js": "javascript",
+    "ts": "typescript",
+    "csharp": "c_sharp",
+}
+
+# Languages for which tree-sitter grammars are not used, as their structure is not expressed by nesting of declarations
+UNSTRUCTURED_LANGUAGES = {"markdown", "latex", "html", "rst"}
+
+
+def find_python_units(text: str) -> list[tuple] | None:
+    try:
+        module = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+
+    def to_units(statements: list) -> list[tuple]:
+        units = []
+        for statement in statements:
+            decorators = getattr(statement, "decorator_list", [])
+            start_line = min([statement.lineno] + [decorator.lineno for decorator in decorators]) - 1
+            body = getattr(statement, "body", None)
+            children = to_units(body) if isinstance(body, list) and body and isinstance(body[0], ast.stmt) else []
+            units.append((start_line, statement.end_lineno - 1, children))
+        return units
+
+    return to_units(module.body)
+
+
+def create_tree_sitter_unit_finder(language: str):
+    try:
+        from tree_sitter_languages import get_parser
+    except ImportError:
+        return None
+
+    try:
+        parser = get_parser(TREE_SITTER_LANGUAGES.get(language, language))
+    except Exception:  # noqa: BLE001
+        return None
+
+    def to_units(nodes: list) -> list[tuple]:
+        units = []
+        for node in nodes:
+            # Declarations end with a body node, such as a block or a class body, whose members are the nested units
+            body = node.named_children[-1] if node.named_children else None
+            if body is not None and body.end_point[0] > body.start_point[0]:
+                children = to_units(body.named_children)
+            else:
+                children = []
+            units.append((node.start_point[0], node.end_point[0], children))
+        return units
+
+    def find_units(text: str) -> list[tuple] | None:
+        tree = parser.parse(text.encode())
+        if tree.root_node.has_error:
+            return None
+        return to_units(tree.root_node.named_children)
+
+    return find_units
+
+
+# Functions that return the syntax units of a source file in a given language, as tuples of the first and last line of
+# each unit and the units nested within it, or None if the file cannot be parsed
+UNIT_FINDERS = {
+    "python": find_python_units,
+}
+
+
+def register_unit_finder(language: str, find_units) -> None:
+    UNIT_FINDERS[language] = find_units
+
+
+def get_unit_finder(language: str):
+    find_units = UNIT_FINDERS.get(language)
+    if find_units is None and language not in UNSTRUCTURED_LANGUAGES:
+        find_units = create_tree_sitter_unit_finder(language)
+    return find_units
+
+
+class CodeTextSplitter:
+    """
+    Splits source code along its syntax tree, packing whole functions, classes and other top-level statements into
+    chunks of up to the chunk size.
+
+    A unit that is larger than the chunk size is split into the units nested within it, such as the methods of a class,
+    and a unit without nested units is split by the separators of the language. Comments and blank lines that precede a
+    unit are kept with it. Code that cannot be parsed, or languages without a syntax parser, are split by the separators
+    of the language only. Chunks of whole units do not overlap, so the chunk overlap of the fallback splitter only
+    applies within a unit that it splits. Languages other than Python are parsed with the optional tree_sitter_languages
+    package. The syntax units of each file are cached by the hash of its content.
+    """
+
+    def __init__(self, language: str, *, chunk_size: int, fallback_splitter, length_function=len):
+        self.language = language
+        self.chunk_size = chunk_size
+        self.fallback_splitter = fallback_splitter
+        self.length_function = length_function
+        self.find_units = get_unit_finder(language)
+        self.parse_cache = OrderedDict()
+        self.parse_cache_lock = threading.Lock()
+
+    def split_text(self, text: str) -> list[str]:
+        return [chunk for chunk, _, _ in self.split_text_with_offsets(text)]
+
+    def split_text_with_offsets(self, text: str) -> list[tuple[str, int, int]]:
+        units = self.get_units(text)
+        if not units:
+            return self.fallback_splitter.split_text_with_offsets(text)
+
+        line_starts = [0]
+        position = text.find("\n")
+        while position != -1:
+            line_starts.append(position + 1)
+            position = text.find("\n", position + 1)
+
+        chunks = []
+        self.pack_units(text, line_starts, units, 0, len(text), chunks)
+        return chunks
+
+    def get_units(self, text: str) -> list[tuple] | None:
+        if self.find_units is None:
+            return None
+
+        key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        with self.parse_cache_lock:
+            if key in self.parse_cache:
+                self.parse_cache.move_to_end(key)
+                return self.parse_cache[key]
+
+        units = self.find_units(text)
+        with self.parse_cache_lock:
+            self.parse_cache[key] = units
+            if len(self.parse_cache) > PARSE_CACHE_SIZE:
+                self.parse_cache.popitem(last=False)
+        return units
+
+    def measure(self, text: str, start: int, end: int) -> int:
+        if self.length_function is len:
+            return end - start
+        return self.length_function(text[start:end])
+
+    def pack_units(self, text: str, line_starts: list[int], units: list, start: int, end: int, chunks: list) -> None:
+        # Each unit extends back to the end of the unit before it, and the last unit extends to the end of the region
+        pieces = []
+        piece_start = start
+        for i, (_, last_line, children) in enumerate(units):
+            piece_end = end if i == len(units) - 1 else self.get_line_end(line_starts, last_line, end)
+            if piece_end > piece_start:
+                pieces.append((piece_start, piece_end, children))
+                piece_start = piece_end
+
+        chunk_start = start
+        size = 0
+        for piece_start, piece_end, children in pieces:
+            piece_size = self.measure(text, piece_start, piece_end)
+            if size > 0 and size + piece_size > self.chunk_size:
+                self.append_chunk(text, chunk_start, piece_start, chunks)
+                chunk_start = piece_start
+                size = 0
+
+            if piece_size <= self.chunk_size:
+                size += piece_size
+                continue
+
+            if children:
+                self.pack_units(text, line_starts, children, piece_start, piece_end, chunks)
+            else:
+                self.append_fallback_chunks(text, piece_start, piece_end, chunks)
+            chunk_start = piece_end
+
+        if chunk_start < end:
+            self.append_chunk(text, chunk_start, end, chunks)
+
+    def get_line_end(self, line_starts: list[int], line: int, end: int) -> int:
+        if line + 1 < len(line_starts):
+            return min(line_starts[line + 1], end)
+        return end
+
+    def append_chunk(self, text: str, start: int, end: int, chunks: list) -> None:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start == end:
+            return
+
+        # The sizes of the units were measured separately, which only approximates the size of their combination
+        if self.length_function is not len and self.measure(text, start, end) > self.chunk_size:
+            self.append_fallback_chunks(text, start, end, chunks)
+            return
+
+        chunks.append((text[start:end], start, end))
+
+    def append_fallback_chunks(self, text: str, start: int, end: int, chunks: list) -> None:
+        for chunk, chunk_start, chunk_end in self.fallback_splitter.split_text_with_offsets(text[start:end]):
+            chunks.append((chunk, start + chunk_start, start + chunk_end))
@@ -0,0 +1,10 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+
+
+def open_content(content: bytes | str):
+    """
+    Opens the content of a FlowFile, which is either held in memory or has been written to the file at the given path.
+    """
+    return io.BytesIO(content) if isinstance(content, bytes) else open(content, "rb")
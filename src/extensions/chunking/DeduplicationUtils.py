@@ -0,0 +1,256 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import re
+import sqlite3
+import time
+import zlib
+from functools import lru_cache
+
+# Deduplication Strategies
+NONE = "None"
+EXACT_DUPLICATES = "Exact Duplicates"
+NEAR_DUPLICATES = "Exact and Near Duplicates"
+
+# Number of hash functions in each MinHash signature, and number of words in each shingle
+NUM_PERMUTATIONS = 128
+SHINGLE_SIZE = 3
+
+# MinHash permutations are computed as (a * x + b) mod p, and must be the same in every process that shares a store
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+PERMUTATION_SEED = 1
+
+# Seconds to wait for another process that holds the lock of the Signature Store
+STORE_TIMEOUT = 30
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1)
+def get_permutations():
+    import numpy as np
+
+    generator = np.random.RandomState(PERMUTATION_SEED)
+    return (
+        generator.randint(1, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64),
+        generator.randint(0, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64),
+    )
+
+
+def get_bands(threshold: float) -> tuple[int, int]:
+    # The probability that two signatures share a band rises most steeply at a Jaccard similarity of (1 / b) ^ (1 / r),
+    # so the number of bands b and rows per band r are chosen to place that point closest to the threshold
+    candidates = [(bands, NUM_PERMUTATIONS // bands) for bands in range(1, NUM_PERMUTATIONS + 1)]
+    candidates = [(bands, rows) for bands, rows in candidates if bands * rows == NUM_PERMUTATIONS]
+    return min(candidates, key=lambda candidate: abs((1 / candidate[0]) ** (1 / candidate[1]) - threshold))
+
+
+def hash_text(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def create_signature(text: str):
+    import numpy as np
+
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+    hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    a, b = get_permutations()
+
+    # Multiplication overflows are intended, as they are in every implementation of these permutations
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(a, hashes) + b[:, None]) % np.uint64(MERSENNE_PRIME) & np.uint64(MAX_HASH)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+class MemorySignatureStore:
+    """
+    Holds the hashes and MinHash signatures of the chunks of a single FlowFile.
+    """
+
+    def __init__(self):
+        self.hashes = set()
+        self.signatures = []
+        self.buckets = {}
+
+    def contains_hash(self, text_hash: bytes) -> bool:
+        return text_hash in self.hashes
+
+    def find_candidates(self, band_keys: list[bytes]) -> list:
+        """
+        Returns the hash and the signature of each chunk that shares at least one band with the given band keys.
+        """
+        signature_ids = set()
+        for band, key in enumerate(band_keys):
+            signature_ids.update(self.buckets.get((band, key), ()))
+        return [self.signatures[signature_id] for signature_id in signature_ids]
+
+    def mark_seen(self, text_hash: bytes) -> None:
+        # The chunks of a single FlowFile are never removed, so it does not matter when they were last seen
+        pass
+
+    def add(self, text_hash: bytes, signature, band_keys: list[bytes] | None) -> None:
+        self.hashes.add(text_hash)
+        if signature is None:
+            return
+
+        signature_id = len(self.signatures)
+        self.signatures.append((text_hash, signature))
+        for band, key in enumerate(band_keys):
+            self.buckets.setdefault((band, key), []).append(signature_id)
+
+
+class SQLiteSignatureStore:
+    """
+    Holds the hashes and MinHash signatures of chunks in a local SQLite database, so that duplicates are detected across
+    FlowFiles and restarts. The chunks of a FlowFile are added in memory while it is processed, and only written to the
+    database by commit, once it has been processed successfully, so that the database is locked only while they are
+    written. When the number of chunks exceeds the maximum, the chunks that were least recently seen are removed. The
+    number of chunks is kept up to date by triggers, so that it is not counted again whenever chunks are added.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, max_chunks: int):
+        self.connection = connection
+        self.max_chunks = max_chunks
+        self.pending = MemorySignatureStore()
+        self.pending_signatures = {}
+        self.seen_hashes = set()
+
+    @staticmethod
+    def create_schema(path: str) -> None:
+        with sqlite3.connect(path, timeout=STORE_TIMEOUT) as connection:
+            # In WAL mode, FlowFiles that look up chunks are not blocked by a FlowFile whose chunks are being written
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS chunks "
+                "(id INTEGER PRIMARY KEY, hash BLOB NOT NULL UNIQUE, signature BLOB, last_seen REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS chunks_last_seen ON chunks (last_seen)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, bucket BLOB NOT NULL, chunk_id INTEGER NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS bands_bucket ON bands (band, bucket)")
+            connection.execute("CREATE INDEX IF NOT EXISTS bands_chunk_id ON bands (chunk_id)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS chunks_count (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+            )
+            connection.execute("INSERT OR IGNORE INTO chunks_count (id, total) SELECT 0, COUNT(*) FROM chunks")
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS chunks_insert AFTER INSERT ON chunks "
+                "BEGIN UPDATE chunks_count SET total = total + 1; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS chunks_delete AFTER DELETE ON chunks "
+                "BEGIN UPDATE chunks_count SET total = total - 1; DELETE FROM bands WHERE chunk_id = OLD.id; END"
+            )
+        connection.close()
+
+    def contains_hash(self, text_hash: bytes) -> bool:
+        if self.pending.contains_hash(text_hash):
+            return True
+        cursor = self.connection.execute("SELECT 1 FROM chunks WHERE hash = ?", (text_hash,))
+        if cursor.fetchone() is None:
+            return False
+        self.seen_hashes.add(text_hash)
+        return True
+
+    def find_candidates(self, band_keys: list[bytes]) -> list:
+        import numpy as np
+
+        clauses = " OR ".join(["(band = ? AND bucket = ?)"] * len(band_keys))
+        parameters = [value for band, key in enumerate(band_keys) for value in (band, key)]
+        cursor = self.connection.execute(
+            # Only placeholders are interpolated into the query
+            f"SELECT hash, signature FROM chunks WHERE id IN (SELECT chunk_id FROM bands WHERE {clauses})",  # noqa: S608
+            parameters,
+        )
+        candidates = [(text_hash, np.frombuffer(signature, dtype=np.uint32)) for text_hash, signature in cursor]
+        return candidates + self.pending.find_candidates(band_keys)
+
+    def mark_seen(self, text_hash: bytes) -> None:
+        if not self.pending.contains_hash(text_hash):
+            self.seen_hashes.add(text_hash)
+
+    def add(self, text_hash: bytes, signature, band_keys: list[bytes] | None) -> None:
+        self.pending.add(text_hash, signature, band_keys)
+        if signature is not None:
+            self.pending_signatures[text_hash] = (signature, band_keys)
+
+    def commit(self) -> None:
+        """
+        Writes the chunks that were added since the last commit to the database in a single transaction, marks the
+        stored chunks that were seen again as recently seen, and removes the least recently seen chunks.
+        """
+        seen_time = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE chunks SET last_seen = ? WHERE hash = ?",
+                [(seen_time, text_hash) for text_hash in self.seen_hashes],
+            )
+            for text_hash in self.pending.hashes:
+                signature, band_keys = self.pending_signatures.get(text_hash, (None, None))
+                cursor = self.connection.execute(
+                    "INSERT OR IGNORE INTO chunks (hash, signature, last_seen) VALUES (?, ?, ?)",
+                    (text_hash, None if signature is None else signature.tobytes(), seen_time),
+                )
+                # Another FlowFile may have stored the same chunk since it was looked up
+                if cursor.rowcount == 1 and signature is not None:
+                    self.connection.executemany(
+                        "INSERT INTO bands (band, bucket, chunk_id) VALUES (?, ?, ?)",
+                        [(band, key, cursor.lastrowid) for band, key in enumerate(band_keys)],
+                    )
+            self.evict()
+
+        self.pending = MemorySignatureStore()
+        self.pending_signatures = {}
+        self.seen_hashes = set()
+
+    def evict(self) -> None:
+        excess = self.connection.execute("SELECT total FROM chunks_count").fetchone()[0] - self.max_chunks
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM chunks WHERE id IN (SELECT id FROM chunks ORDER BY last_seen LIMIT ?)", (excess,)
+            )
+
+
+class ChunkDeduplicator:
+    """
+    Detects chunks whose text is identical to, or when near duplicates are detected, has an estimated Jaccard similarity
+    of at least the threshold with, a chunk that was seen before.
+
+    Near duplicates are found with MinHash signatures of the word shingles of each chunk. The signatures are divided
+    into bands, and only the chunks that share at least one band with a chunk are compared with it.
+    """
+
+    def __init__(self, store, *, near_duplicates: bool, threshold: float):
+        self.store = store
+        self.near_duplicates = near_duplicates
+        self.threshold = threshold
+        self.bands, self.rows = get_bands(threshold)
+        self.duplicate_count = 0
+
+    def is_duplicate(self, text: str) -> bool:
+        text_hash = hash_text(text)
+        if self.store.contains_hash(text_hash):
+            self.duplicate_count += 1
+            return True
+
+        if not self.near_duplicates:
+            self.store.add(text_hash, None, None)
+            return False
+
+        signature = create_signature(text)
+        band_keys = [signature[i * self.rows : (i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        for candidate_hash, candidate in self.store.find_candidates(band_keys):
+            if (candidate == signature).mean() >= self.threshold:
+                self.store.mark_seen(candidate_hash)
+                self.duplicate_count += 1
+                return True
+
+        self.store.add(text_hash, signature, band_keys)
+        return False
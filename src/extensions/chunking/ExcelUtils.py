@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import ContentUtils
+
+EXCEL_FILETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Separators between the cells of a row and between the rows of a Document
+CELL_SEPARATOR = "\t"
+ROW_SEPARATOR = "\n"
+
+TABLE = "Table"
+
+
+def get_cell_texts(row: tuple) -> list[str]:
+    texts = ["" if value is None else str(value) for value in row]
+    while texts and not texts[-1].strip():
+        texts.pop()
+    return texts
+
+
+def iter_row_groups(rows, rows_per_group: int, *, repeat_header: bool):
+    """
+    Yields the non-empty rows of a sheet in groups of the given number of rows, along with the row numbers in the sheet
+    of the first and last rows of each group. When so requested, the first non-empty row is taken to be a header, which
+    is the first row of every group, but is not counted as one of its rows and does not determine its row numbers. A
+    sheet without rows below its header yields no group.
+    """
+    header = None
+    group = []
+    first_row_number = None
+    last_row_number = None
+    for row_number, row in enumerate(rows, start=1):
+        texts = get_cell_texts(row)
+        if not texts:
+            continue
+
+        if repeat_header and header is None:
+            header = texts
+            continue
+
+        if len(group) == 0:
+            first_row_number = row_number
+        group.append(texts)
+        last_row_number = row_number
+        if len(group) == rows_per_group:
+            yield [header, *group] if header is not None else group, first_row_number, last_row_number
+            group = []
+
+    if group:
+        yield [header, *group] if header is not None else group, first_row_number, last_row_number
+
+
+def load_excel(content: bytes | str, loader_settings: dict, rows_per_document: int, *, repeat_header: bool):
+    """
+    Yields a Document for each group of rows of each sheet of an Excel workbook, reading the rows of one sheet at a time
+    in the read-only mode of openpyxl, so that the workbook is never held in memory.
+    """
+    from langchain.schema import Document
+    from openpyxl import load_workbook
+
+    with ContentUtils.open_content(content) as file:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for sheet_number, sheet in enumerate(workbook.worksheets, start=1):
+                row_groups = iter_row_groups(
+                    sheet.iter_rows(values_only=True), rows_per_document, repeat_header=repeat_header
+                )
+                for group, first_row_number, last_row_number in row_groups:
+                    text = ROW_SEPARATOR.join(CELL_SEPARATOR.join(texts) for texts in group)
+                    metadata = {"source": None}
+                    if loader_settings["include_metadata"]:
+                        metadata["page_name"] = sheet.title
+                        metadata["page_number"] = sheet_number
+                        metadata["first_row_number"] = first_row_number
+                        metadata["last_row_number"] = last_row_number
+                        metadata["filetype"] = EXCEL_FILETYPE
+                    metadata["category"] = TABLE
+                    yield Document(page_content=text, metadata=metadata)
+        finally:
+            workbook.close()
@@ -0,0 +1,334 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import html
+import re
+
+# Separator between the text of the elements of a document that is loaded as a single Document, as in langchain
+ELEMENT_SEPARATOR = "\n\n"
+
+# Element categories, with the same names as the element types of unstructured
+TITLE = "Title"
+NARRATIVE_TEXT = "NarrativeText"
+LIST_ITEM = "ListItem"
+TABLE = "Table"
+TEXT = "Text"
+
+HTML_FILETYPE = "text/html"
+MARKDOWN_FILETYPE = "text/markdown"
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+LIST_TAGS = {"ol", "ul", "dl"}
+
+# Elements whose text is split into paragraphs, and elements whose contents are left out, as in unstructured
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "body",
+    "center",
+    "div",
+    "footer",
+    "header",
+    "hgroup",
+    "html",
+    "main",
+    "section",
+    "p",
+    "pre",
+    "ol",
+    "ul",
+    "li",
+    "table",
+    *HEADING_TAGS,
+}
+REMOVED_BLOCK_TAGS = {"details", "dd", "dl", "dt", "figure", "form", "hr", "input", "nav", "summary", "template"}
+
+# Elements whose contents are left out without ending the paragraph that they are in
+REMOVED_PHRASING_TAGS = {
+    "button",
+    "canvas",
+    "del",
+    "head",
+    "iframe",
+    "img",
+    "label",
+    "link",
+    "math",
+    "meta",
+    "noscript",
+    "object",
+    "script",
+    "select",
+    "style",
+    "svg",
+    "textarea",
+    "title",
+}
+EMPHASIS_TAGS = {"b": "b", "strong": "b", "i": "i", "em": "i"}
+
+BULLETS = "\u0095\u2022\u2023\u2043\u3164\u204c\u204d\u2219\u25cb\u25cf\u25d8\u25e6\u2619\u2765\u2767\u29be\u29bf\uf0b7\u00b7*\\-"
+# A bullet that is not followed by another, as a line of dashes is not a list item
+BULLETS_RE = re.compile(f"[{BULLETS}](?![{BULLETS}])")
+
+# Limits of the heuristics that classify paragraphs, which are the defaults of unstructured
+MIN_TEXT_LENGTH = 2
+TITLE_MAX_WORDS = 12
+MIN_ALPHA_RATIO = 0.5
+MAX_CAPITALIZED_RATIO = 0.5
+SENTENCE_PUNCTUATION = (".", "!", "?", ":", ";")
+
+
+def get_alpha_ratio(text: str) -> float:
+    characters = [character for character in text if not character.isspace()]
+    if len(characters) == 0:
+        return 0.0
+    return sum(character.isalpha() for character in characters) / len(characters)
+
+
+def get_text_category(text: str) -> str | None:
+    """
+    Classifies a paragraph that is not in a heading, list item or table by its text, in the way that unstructured
+    does, except that the part-of-speech tagging that unstructured uses to find a verb in short paragraphs is replaced
+    by checking whether the paragraph ends like a sentence. Returns None for text that is too short to be an element.
+    """
+    if BULLETS_RE.match(text):
+        return LIST_ITEM
+    if len(text) < MIN_TEXT_LENGTH:
+        return None
+
+    words = text.split()
+    if not text.isnumeric() and get_alpha_ratio(text) >= MIN_ALPHA_RATIO:
+        capitalized_ratio = sum(word[0].isupper() for word in words) / len(words)
+        if capitalized_ratio <= MAX_CAPITALIZED_RATIO and (
+            text.endswith(SENTENCE_PUNCTUATION) or len(words) > TITLE_MAX_WORDS
+        ):
+            return NARRATIVE_TEXT
+
+        if (
+            len(words) <= TITLE_MAX_WORDS
+            and not text.endswith(",")
+            and not (text.isupper() and text.endswith(SENTENCE_PUNCTUATION))
+        ):
+            return TITLE
+
+    return TEXT
+
+
+class Paragraph:
+    """
+    Collects the text of a paragraph from the elements that it consists of, along with the text of its links and
+    emphasized text, which are added to its metadata.
+    """
+
+    def __init__(self, *, preserve_whitespace: bool = False):
+        self.preserve_whitespace = preserve_whitespace
+        self.segments = []
+        self.emphasized_text_contents = []
+        self.emphasized_text_tags = []
+        self.link_texts = []
+        self.link_urls = []
+
+    def add_text(self, text: str | None, emphasis: str) -> None:
+        if not text:
+            return
+        self.segments.append(text)
+        if emphasis and not text.isspace():
+            self.emphasized_text_contents.append(" ".join(text.split()))
+            self.emphasized_text_tags.append(emphasis)
+
+    def add_phrasing(self, element, emphasis: str) -> None:
+        tag = element.tag
+        if tag == "br":
+            self.add_text("\n", "")
+        elif tag not in REMOVED_PHRASING_TAGS and tag not in REMOVED_BLOCK_TAGS:
+            inner_emphasis = emphasis
+            if tag in EMPHASIS_TAGS and EMPHASIS_TAGS[tag] not in emphasis:
+                inner_emphasis += EMPHASIS_TAGS[tag]
+
+            start = len(self.segments)
+            self.add_text(element.text, inner_emphasis)
+            for child in element:
+                self.add_phrasing(child, inner_emphasis)
+
+            href = element.get("href") if tag == "a" else None
+            link_text = " ".join("".join(self.segments[start:]).split())
+            if href and link_text:
+                self.link_texts.append(link_text)
+                self.link_urls.append(href)
+
+        self.add_text(element.tail, emphasis)
+
+    def get_text(self) -> str:
+        text = "".join(self.segments)
+        if not self.preserve_whitespace:
+            return " ".join(text.split())
+
+        # Browsers do not render a newline right after the opening tag of a pre element or right before its closing tag
+        return text.removeprefix("\n").removesuffix("\n")
+
+    def get_metadata(self) -> dict:
+        metadata = {}
+        if self.emphasized_text_contents:
+            metadata["emphasized_text_contents"] = self.emphasized_text_contents
+            metadata["emphasized_text_tags"] = self.emphasized_text_tags
+        if self.link_texts:
+            metadata["link_texts"] = self.link_texts
+            metadata["link_urls"] = self.link_urls
+        return metadata
+
+
+def parse_html(content: bytes):
+    from lxml import etree
+
+    if not content.strip():
+        return None
+
+    # Without a declared encoding, libxml2 assumes Latin-1, while most documents are encoded in UTF-8
+    try:
+        content.decode("utf-8")
+        encoding = "utf-8"
+    except UnicodeDecodeError:
+        encoding = None
+
+    parser = etree.HTMLParser(encoding=encoding, remove_comments=True, remove_pis=True)
+    return etree.fromstring(content, parser)
+
+
+def iter_html_elements(content: bytes):
+    """
+    Yields the category, text and metadata of each element of an HTML document. Only the main element of the
+    document is parsed if it has one, and otherwise its body.
+    """
+    root = parse_html(content)
+    if root is None:
+        return
+
+    container = next(root.iter("main"), None)
+    if container is None:
+        container = root.find("body")
+    if container is None:
+        container = root
+
+    yield from iter_block_elements(container, [])
+
+
+def iter_block_elements(block, ancestor_tags: list[str]):
+    tag = block.tag
+    if tag == "table":
+        yield from iter_table_elements(block)
+        return
+
+    if tag in HEADING_TAGS:
+        category, category_depth = TITLE, int(tag[1]) - 1
+    elif tag == "li":
+        category, category_depth = LIST_ITEM, sum(ancestor_tag in LIST_TAGS for ancestor_tag in ancestor_tags)
+    elif tag == "p" and is_list_item_paragraph(block):
+        # Markdown wraps the text of the items of loose lists in paragraphs
+        category, category_depth = LIST_ITEM, sum(ancestor_tag in LIST_TAGS for ancestor_tag in ancestor_tags[:-1])
+    else:
+        category, category_depth = None, None
+
+    # The text before the first nested block has the category of the block itself, while the text after each nested
+    # block is classified by its content
+    paragraph = Paragraph(preserve_whitespace=tag == "pre")
+    paragraph.add_text(block.text, "")
+    child_ancestor_tags = [*ancestor_tags, tag]
+    for child in block:
+        child_tag = child.tag
+        if tag == "pre" or (child_tag not in BLOCK_TAGS and child_tag not in REMOVED_BLOCK_TAGS):
+            paragraph.add_phrasing(child, "")
+            continue
+
+        yield from paragraph_to_elements(paragraph, category, category_depth)
+        category, category_depth = None, None
+        if child_tag not in REMOVED_BLOCK_TAGS:
+            yield from iter_block_elements(child, child_ancestor_tags)
+        paragraph = Paragraph()
+        paragraph.add_text(child.tail, "")
+
+    yield from paragraph_to_elements(paragraph, category, category_depth)
+
+
+def is_list_item_paragraph(paragraph) -> bool:
+    parent = paragraph.getparent()
+    return parent.tag == "li" and paragraph.getprevious() is None and not (parent.text or "").strip()
+
+
+def paragraph_to_elements(paragraph: Paragraph, category: str | None, category_depth: int | None):
+    text = paragraph.get_text()
+    if not text:
+        return
+
+    if category is None:
+        category = get_text_category(text)
+        if category is None:
+            return
+        if category == LIST_ITEM:
+            # A paragraph that starts with a bullet is a list item, but the bullet is not part of its text
+            text = BULLETS_RE.sub("", text, count=1).strip()
+            if not text:
+                return
+            category_depth = 0
+        elif category == TITLE:
+            category_depth = 0
+
+    metadata = paragraph.get_metadata()
+    if category_depth is not None:
+        metadata["category_depth"] = category_depth
+    yield category, text, metadata
+
+
+def iter_table_elements(table):
+    rows = []
+    for row in table.xpath("./tr | ./thead/tr | ./tbody/tr | ./tfoot/tr"):
+        cells = []
+        for cell in row.xpath("./td | ./th"):
+            cells.append(" ".join(stripped for stripped in (text.strip() for text in cell.itertext()) if stripped))
+        rows.append(cells)
+
+    text = " ".join(" ".join(cell for cell in cells if cell) for cells in rows).strip()
+    if not text:
+        return
+
+    yield TABLE, text, {"text_as_html": cells_to_html(rows)}
+
+
+def cells_to_html(rows: list[list[str]]) -> str:
+    html_rows = []
+    for cells in rows:
+        if cells:
+            html_cells = "".join(f"<td>{'<br/>'.join(html.escape(cell).split(chr(10))).strip()}</td>" for cell in cells)
+            html_rows.append(f"<tr>{html_cells}</tr>")
+    return f"<table>{''.join(html_rows)}</table>"
+
+
+def markdown_to_html(content: bytes) -> bytes:
+    from markdown_it import MarkdownIt
+
+    return MarkdownIt("commonmark").enable("table").render(content.decode("utf-8")).encode()
+
+
+def load_markup(content: bytes, filetype: str, loader_settings: dict):
+    """
+    Yields the Documents of an HTML or Markdown document, with the same text and metadata fields as the Documents
+    that the unstructured loaders of langchain create with the given settings, without using unstructured. Markdown is
+    converted to HTML, as unstructured does. Neither format has pages, so there are never any page breaks.
+    """
+    from langchain.schema import Document
+
+    html_content = markdown_to_html(content) if filetype == MARKDOWN_FILETYPE else content
+    elements = iter_html_elements(html_content)
+
+    if loader_settings["mode"] == "single":
+        text = ELEMENT_SEPARATOR.join(text for _, text, _ in elements)
+        yield Document(page_content=text, metadata={"source": None})
+        return
+
+    for category, text, element_metadata in elements:
+        metadata = {"source": None}
+        if loader_settings["include_metadata"]:
+            metadata.update(element_metadata)
+            metadata["filetype"] = filetype
+        metadata["category"] = category
+        yield Document(page_content=text, metadata=metadata)
@@ -0,0 +1,400 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import html
+import re
+import zlib
+from collections import deque
+from itertools import islice
+
+# Candidate boundaries of content-defined chunks are the ends of runs of whitespace
+CANDIDATE_BOUNDARY_PATTERN = re.compile(r"\s+")
+
+# Number of characters preceding a candidate boundary that decide whether it becomes a chunk boundary
+BOUNDARY_WINDOW_SIZE = 32
+
+# Separators used to split content-defined chunks and header sections that are larger than the chunk size
+FALLBACK_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+# Markdown ATX headers, and the fences of code blocks in which lines starting with '#' are not headers
+MARKDOWN_LINE_PATTERN = re.compile(
+    r"^ {0,3}(?:(?P<fence>```|~~~).*|(?P<level>#{1,6})(?:[ \t]+(?P<title>.*?))?(?:[ \t]+#+)?[ \t]*)$", re.MULTILINE
+)
+HTML_HEADER_PATTERN = re.compile(
+    r"<h(?P<level>[1-6])\b[^>]*>(?P<title>.*?)</h(?P=level)\s*>", re.IGNORECASE | re.DOTALL
+)
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class NativeTextSplitter:
+    """
+    Splits text into chunks exactly as the LangChain CharacterTextSplitter and RecursiveCharacterTextSplitter do.
+
+    Splits are tracked as start and end offsets into the source text, so substrings are only created for the chunks
+    that are returned, and the length of each split is measured once.
+    """
+
+    def __init__(
+        self,
+        separators: list[str],
+        *,
+        recursive: bool,
+        is_separator_regex: bool,
+        keep_separator: bool,
+        strip_whitespace: bool,
+        chunk_size: int,
+        chunk_overlap: int,
+        length_function=len,
+    ):
+        if chunk_overlap > chunk_size:
+            message = f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller."
+            raise ValueError(message)
+
+        self.separators = separators
+        self.recursive = recursive
+        self.is_separator_regex = is_separator_regex
+        self.keep_separator = keep_separator
+        self.strip_whitespace = strip_whitespace
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_function = length_function
+        self.patterns = {separator: re.compile(separator) for separator in separators if is_separator_regex}
+
+    @staticmethod
+    def supports(separators: list[str], *, is_separator_regex: bool) -> bool:
+        # Capturing groups in a separator add the captured text to the splits, which cannot be represented as offsets
+        return not is_separator_regex or all(re.compile(separator).groups == 0 for separator in separators)
+
+    def split_text(self, text: str) -> list[str]:
+        return [chunk for chunk, _, _ in self.split_text_with_offsets(text)]
+
+    def split_text_with_offsets(self, text: str) -> list[tuple[str, int, int]]:
+        """
+        Returns a tuple of the chunk text, and the start and end offsets of the chunk in the source text, for each chunk.
+        """
+        chunks = []
+        if self.recursive:
+            self.split_recursively(text, 0, len(text), self.separators, chunks)
+        else:
+            separator = self.separators[0]
+            splits = self.find_splits(text, 0, len(text), separator)
+            self.merge_splits(
+                text, [(start, end, self.measure(text, start, end)) for start, end in splits], separator, chunks
+            )
+
+        return chunks
+
+    def measure(self, text: str, start: int, end: int) -> int:
+        if self.length_function is len:
+            return end - start
+        return self.length_function(text[start:end])
+
+    def get_segment(self, text: str, start: int, end: int) -> str:
+        # Regular expressions are evaluated against the substring, as anchors and lookarounds depend on its boundaries
+        if start == 0 and end == len(text):
+            return text
+        return text[start:end]
+
+    def contains(self, text: str, start: int, end: int, separator: str) -> bool:
+        if self.is_separator_regex:
+            return self.patterns[separator].search(self.get_segment(text, start, end)) is not None
+        return text.find(separator, start, end) != -1
+
+    def find_splits(self, text: str, start: int, end: int, separator: str) -> list[tuple[int, int]]:
+        if separator == "":
+            return [(position, position + 1) for position in range(start, end)]
+
+        splits = []
+        segment = self.get_segment(text, start, end)
+        if self.is_separator_regex:
+            split_start = start
+            for match in self.patterns[separator].finditer(segment):
+                splits.append((split_start, match.start() + start))
+                # A kept separator becomes the beginning of the split that follows it
+                split_start = match.start() + start if self.keep_separator else match.end() + start
+            splits.append((split_start, end))
+            return [(split_start, split_end) for split_start, split_end in splits if split_end > split_start]
+
+        separator_length = len(separator)
+        position = start
+        for i, piece in enumerate(segment.split(separator)):
+            piece_end = position + len(piece)
+            split_start = position - separator_length if self.keep_separator and i > 0 else position
+            if piece_end > split_start:
+                splits.append((split_start, piece_end))
+            position = piece_end + separator_length
+        return splits
+
+    def split_recursively(self, text: str, start: int, end: int, separators: list[str], chunks: list) -> None:
+        separator = separators[-1]
+        new_separators = []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if self.contains(text, start, end, candidate):
+                separator = candidate
+                new_separators = separators[i + 1 :]
+                break
+
+        good_splits = []
+        for split_start, split_end in self.find_splits(text, start, end, separator):
+            length = self.measure(text, split_start, split_end)
+            if length < self.chunk_size:
+                good_splits.append((split_start, split_end, length))
+                continue
+
+            if good_splits:
+                self.merge_splits(text, good_splits, separator, chunks)
+                good_splits = []
+
+            if new_separators:
+                self.split_recursively(text, split_start, split_end, new_separators, chunks)
+            else:
+                chunks.append((text[split_start:split_end], split_start, split_end))
+
+        if good_splits:
+            self.merge_splits(text, good_splits, separator, chunks)
+
+    def merge_splits(self, text: str, splits: list[tuple[int, int, int]], separator: str, chunks: list) -> None:
+        join_separator = "" if self.keep_separator else separator
+        separator_length = self.length_function(join_separator)
+        separator_characters = len(join_separator)
+        chunk_size = self.chunk_size
+        chunk_overlap = self.chunk_overlap
+
+        # The total is measured with the length function, while the number of characters in the joined splits is
+        # tracked separately in order to recognize splits that form a single substring of the source text
+        current_splits = deque()
+        total = 0
+        characters = 0
+        for split in splits:
+            length = split[2]
+            if current_splits and total + length + separator_length > chunk_size:
+                self.append_chunk(text, current_splits, join_separator, characters, chunks)
+                while total > chunk_overlap or (
+                    total + length + (separator_length if current_splits else 0) > chunk_size and total > 0
+                ):
+                    first_start, first_end, first_length = current_splits.popleft()
+                    if current_splits:
+                        total -= first_length + separator_length
+                        characters -= first_end - first_start + separator_characters
+                    else:
+                        total -= first_length
+                        characters -= first_end - first_start
+
+            current_splits.append(split)
+            if len(current_splits) > 1:
+                total += length + separator_length
+                characters += split[1] - split[0] + separator_characters
+            else:
+                total += length
+                characters += split[1] - split[0]
+
+        if current_splits:
+            self.append_chunk(text, current_splits, join_separator, characters, chunks)
+
+    def append_chunk(self, text: str, splits: deque, separator: str, characters: int, chunks: list) -> None:
+        start = splits[0][0]
+        end = splits[-1][1]
+
+        # Splits joined by the separator form a single substring of the source text when exactly one separator lies
+        # between each of them, which is the case when the joined length matches the length of the source range
+        contiguous = end - start == characters
+        if contiguous and self.is_separator_regex and separator != "":
+            previous_end = splits[0][1]
+            for split_start, split_end, _ in islice(splits, 1, None):
+                if split_start - previous_end != len(separator) or not text.startswith(separator, previous_end):
+                    contiguous = False
+                    break
+                previous_end = split_end
+
+        if self.strip_whitespace:
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+
+        if contiguous:
+            chunk = text[start:end]
+        else:
+            chunk = separator.join(text[split_start:split_end] for split_start, split_end, _ in splits)
+            if self.strip_whitespace:
+                chunk = chunk.strip()
+
+        if chunk != "":
+            chunks.append((chunk, start, end))
+
+
+class ContentDefinedTextSplitter:
+    """
+    Splits text into chunks whose boundaries are determined by the text around them rather than by the position of the
+    previous boundary, so that an edit to the text only changes the chunks around the edit.
+
+    Each candidate boundary that follows a run of whitespace becomes a chunk boundary when the hash of the characters
+    preceding it falls below a limit proportional to the size of the text since the previous candidate. Chunks therefore
+    average half of the chunk size, are at least a quarter of the chunk size unless the text ends, and are cut at the
+    last candidate boundary before they would exceed the chunk size.
+    """
+
+    def __init__(self, *, chunk_size: int, length_function=len):
+        self.chunk_size = chunk_size
+        self.minimum_size = chunk_size // 4
+        self.target_size = max(chunk_size // 2, 1)
+        self.length_function = length_function
+        self.fallback_splitter = NativeTextSplitter(
+            FALLBACK_SEPARATORS,
+            recursive=True,
+            is_separator_regex=False,
+            keep_separator=False,
+            strip_whitespace=True,
+            chunk_size=chunk_size,
+            chunk_overlap=0,
+            length_function=length_function,
+        )
+
+    def split_text(self, text: str) -> list[str]:
+        return [chunk for chunk, _, _ in self.split_text_with_offsets(text)]
+
+    def split_text_with_offsets(self, text: str) -> list[tuple[str, int, int]]:
+        chunks = []
+        chunk_start = 0
+        size = 0
+        previous = 0
+        for match in CANDIDATE_BOUNDARY_PATTERN.finditer(text):
+            position = match.end()
+            piece_size = self.measure(text, previous, position)
+            if size > 0 and size + piece_size > self.chunk_size:
+                self.append_chunk(text, chunk_start, previous, chunks)
+                chunk_start = previous
+                size = 0
+
+            size += piece_size
+            if size >= self.minimum_size and self.is_boundary(text, position, piece_size):
+                self.append_chunk(text, chunk_start, position, chunks)
+                chunk_start = position
+                size = 0
+            previous = position
+
+        if size > 0 and size + self.measure(text, previous, len(text)) > self.chunk_size:
+            self.append_chunk(text, chunk_start, previous, chunks)
+            chunk_start = previous
+        self.append_chunk(text, chunk_start, len(text), chunks)
+
+        return chunks
+
+    def measure(self, text: str, start: int, end: int) -> int:
+        if self.length_function is len:
+            return end - start
+        return self.length_function(text[start:end])
+
+    def is_boundary(self, text: str, position: int, piece_size: int) -> bool:
+        window = text[max(position - BOUNDARY_WINDOW_SIZE, 0) : position]
+        return zlib.crc32(window.encode()) % self.target_size < piece_size
+
+    def append_chunk(self, text: str, start: int, end: int, chunks: list) -> None:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start == end:
+            return
+
+        chunk = text[start:end]
+        if self.measure(text, start, end) <= self.chunk_size:
+            chunks.append((chunk, start, end))
+            return
+
+        # A single word that is larger than the chunk size, or a chunk whose pieces measured less than the whole
+        for fallback_chunk, fallback_start, fallback_end in self.fallback_splitter.split_text_with_offsets(chunk):
+            chunks.append((fallback_chunk, start + fallback_start, start + fallback_end))
+
+
+class HeaderTextSplitter:
+    """
+    Splits Markdown or HTML text into the sections that its headers delimit, in a single pass over the text.
+
+    Each chunk is returned with the path of titles of the headers that contain it, from the outermost header to its own.
+    A header that is directly followed by another header is kept with the section that follows it, and the text below
+    the headers of sections that are larger than the chunk size is split further along paragraphs, lines and words.
+    """
+
+    def __init__(self, *, html: bool, chunk_size: int, chunk_overlap: int, length_function=len):
+        self.html = html
+        self.chunk_size = chunk_size
+        self.length_function = length_function
+        self.fallback_splitter = NativeTextSplitter(
+            FALLBACK_SEPARATORS,
+            recursive=True,
+            is_separator_regex=False,
+            keep_separator=False,
+            strip_whitespace=True,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=length_function,
+        )
+
+    def split_text(self, text: str) -> list[str]:
+        return [chunk[0] for chunk in self.split_text_with_offsets(text)]
+
+    def split_text_with_offsets(self, text: str) -> list[tuple[str, int, int, dict]]:
+        """
+        Returns a tuple of the chunk text, the start and end offsets of the chunk in the source text, and the metadata
+        fields of the chunk, for each chunk.
+        """
+        chunks = []
+        headers = []
+        section_start = 0
+        header_end = 0
+        for start, end, level, title in self.find_headers(text):
+            # A section that consists of nothing but its header is merged into the section that follows it
+            if text[header_end:start].strip() != "":
+                self.append_section(text, section_start, header_end, start, headers, chunks)
+                section_start = start
+
+            while headers and headers[-1][0] >= level:
+                headers.pop()
+            headers.append((level, title))
+            header_end = end
+
+        self.append_section(text, section_start, header_end, len(text), headers, chunks)
+        return chunks
+
+    def find_headers(self, text: str):
+        if self.html:
+            for match in HTML_HEADER_PATTERN.finditer(text):
+                title = html.unescape(HTML_TAG_PATTERN.sub("", match.group("title")))
+                yield match.start(), match.end(), int(match.group("level")), WHITESPACE_PATTERN.sub(" ", title).strip()
+            return
+
+        fence = None
+        for match in MARKDOWN_LINE_PATTERN.finditer(text):
+            marker = match.group("fence")
+            if marker is not None:
+                if fence is None:
+                    fence = marker
+                elif marker == fence:
+                    fence = None
+            elif fence is None:
+                yield match.start(), match.end(), len(match.group("level")), (match.group("title") or "").strip()
+
+    def append_section(self, text: str, start: int, body_start: int, end: int, headers: list, chunks: list) -> None:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start == end:
+            return
+
+        metadata = {"header_path": [title for _, title in headers]}
+        section = text[start:end]
+        if self.length_function(section) <= self.chunk_size:
+            chunks.append((section, start, end, metadata))
+            return
+
+        # The headers of a section that is split further are only kept in the header path, so that they do not form a
+        # chunk of their own
+        body_start = max(body_start, start)
+        body = text[body_start:end]
+        for chunk, chunk_start, chunk_end in self.fallback_splitter.split_text_with_offsets(body):
+            chunks.append((chunk, body_start + chunk_start, body_start + chunk_end, metadata))
@@ -0,0 +1,114 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import ParseStatistics
+from ChunkDocument import ChunkDocument
+from nifiapi.documentation import use_case
+from ParseDocument import ParseDocument
+
+
+@use_case(
+    description="Parse and chunk the textual contents of a PDF document in order to prepare it for storage in a vector store.",
+    notes="The input for this use case is expected to be a FlowFile whose content is a PDF document.",
+    keywords=["pdf", "embedding", "vector", "text", "rag", "retrieval augmented generation"],
+    configuration="""
+        Set "Input Format" to "PDF"
+        Set "Chunking Strategy" to "Recursively Split by Character"
+        Set "Separator" to "\\n\\n,\\n, ,"
+        Set "Chunk Size" to "4000"
+        Set "Chunk Overlap" to "200"
+
+        Connect the 'success' Relationship to the appropriate destination to store data in the desired vector store.
+        """,
+)
+class ParseAndChunkDocument(ChunkDocument):
+    class Java:
+        implements = ["org.apache.nifi.python.processor.FlowFileTransform"]
+
+    class ProcessorDetails:
+        version = "2.0.0.dev0"
+        description = """Parses incoming unstructured text documents in the same way as ParseDocument, and chunks the parsed documents in the same way as ChunkDocument,
+            without serializing the parsed documents in between. The output is formatted as "json-lines" with two keys: 'text' and 'metadata', and is the same as the output
+            of ParseDocument followed by ChunkDocument with the same properties. The Worker Processes and Stream Documents properties apply to both parsing and chunking."""
+        tags = [
+            "text",
+            "split",
+            "chunk",
+            "embeddings",
+            "vector",
+            "machine learning",
+            "ML",
+            "artificial intelligence",
+            "ai",
+            "document",
+            "langchain",
+            "pdf",
+            "html",
+            "markdown",
+            "word",
+            "excel",
+            "powerpoint",
+        ]
+        dependencies = [
+            "pikepdf==8.12.0",
+            "pypdf==4.0.1",
+            "langchain==0.1.7",
+            "unstructured==0.14.8",
+            "unstructured-inference==0.7.36",
+            "unstructured_pytesseract==0.3.12",
+            "pillow-heif==0.15.0",
+            "numpy==1.26.4",
+            "opencv-python==4.9.0.80",
+            "pdf2image==1.17.0",
+            "pdfminer.six==20221105",
+            "python-docx==1.1.0",
+            "openpyxl==3.1.2",
+            "python-pptx==0.6.23",
+            "lxml==5.2.2",
+            "markdown-it-py==3.0.0",
+            "tiktoken",
+        ]
+
+    # Properties that ChunkDocument shares with ParseDocument by name are only listed once, and the parsed Documents are
+    # never written, so there is no shared metadata to write as attributes
+    property_descriptors = [
+        descriptor
+        for descriptor in ParseDocument.property_descriptors
+        if descriptor.name not in {chunk_descriptor.name for chunk_descriptor in ChunkDocument.property_descriptors}
+        and descriptor is not ParseDocument.SHARED_METADATA_AS_ATTRIBUTES
+    ] + ChunkDocument.property_descriptors
+
+    parser = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.parser = ParseDocument(**kwargs)
+
+    def onScheduled(self, context):
+        self.parser.logger = self.logger
+        self.parser.onScheduled(context)
+        super().onScheduled(context)
+
+    def onStopped(self, context):
+        self.parser.onStopped(context)
+        super().onStopped(context)
+
+    def transform(self, context, flowfile):
+        if self.parser.profile_directory is not None:
+            return ParseStatistics.run_profiled(
+                self.parser.profile_directory, flowfile.getAttribute("uuid"), super().transform, context, flowfile
+            )
+        return super().transform(context, flowfile)
+
+    def load_docs(self, context, flowfile, attributes: dict):
+        statistics = self.parser.create_statistics()
+        documents = self.parser.create_docs(context, flowfile, attributes, statistics)
+        if statistics is not None:
+            attributes.update(statistics.to_attributes())
+        return documents
+
+    def iterate_docs(self, context, flowfile, attributes: dict):
+        statistics = self.parser.create_statistics()
+        for doc in self.parser.iterate_docs(context, flowfile, attributes, statistics):
+            yield doc.page_content, doc.metadata
+        if statistics is not None:
+            attributes.update(statistics.to_attributes())
@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+
+# Seconds to wait for another process that holds the lock of the cache database
+CACHE_TIMEOUT = 30
+
+
+class ParseCache:
+    """
+    Keeps the Documents parsed from each input in a local SQLite database, keyed by the hash of the content and of the
+    settings that it was parsed with. When the total size of the compressed Documents exceeds the maximum size, the
+    Documents that were least recently used are removed.
+    """
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        with closing(self.connect()) as connection, connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_documents "
+                "(key BLOB PRIMARY KEY, contents BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS parsed_documents_last_access ON parsed_documents (last_access)"
+            )
+
+    @staticmethod
+    def create_key(content: bytes, input_format: str, loader_settings: dict) -> bytes:
+        digest = hashlib.sha256(content)
+        digest.update(json.dumps([input_format, loader_settings], sort_keys=True).encode())
+        return digest.digest()
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=CACHE_TIMEOUT)
+
+    def get(self, key: bytes) -> list | None:
+        from langchain.schema import Document
+
+        with closing(self.connect()) as connection, connection:
+            row = connection.execute("SELECT contents FROM parsed_documents WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE parsed_documents SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        text = zlib.decompress(row[0]).decode()
+        lines = text.split("\n") if text else []
+        return [Document(page_content=doc["text"], metadata=doc["metadata"]) for doc in map(json.loads, lines)]
+
+    def store(self, key: bytes, documents):
+        """
+        Yields the given Documents, serializing each one before it is yielded, so that changes made to it afterwards
+        are not stored, and stores all of them once they have been consumed.
+        """
+        lines = []
+        for doc in documents:
+            lines.append(json.dumps({"text": doc.page_content, "metadata": doc.metadata}))
+            yield doc
+
+        self.put(key, lines)
+
+    def put(self, key: bytes, lines: list[str]) -> None:
+        contents = zlib.compress("\n".join(lines).encode())
+        if len(contents) > self.max_size:
+            return
+
+        with closing(self.connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO parsed_documents (key, contents, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, contents, len(contents), time.time()),
+            )
+            self.evict(connection)
+
+    def evict(self, connection: sqlite3.Connection) -> None:
+        total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM parsed_documents").fetchone()[0]
+        if total_size <= self.max_size:
+            return
+
+        evicted_keys = []
+        for key, size in connection.execute("SELECT key, size FROM parsed_documents ORDER BY last_access").fetchall():
+            if total_size <= self.max_size:
+                break
+            evicted_keys.append((key,))
+            total_size -= size
+        connection.executemany("DELETE FROM parsed_documents WHERE key = ?", evicted_keys)
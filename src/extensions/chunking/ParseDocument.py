@@ -1,10 +1,21 @@
 # SPDX-License-Identifier: Apache-2.0
 
-import io
+import collections
 import json
-
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import ContentUtils
+import ExcelUtils
+import MarkupUtils
+import ParseStatistics
+import PdfUtils
 from nifiapi.flowfiletransform import FlowFileTransform, FlowFileTransformResult
-from nifiapi.properties import PropertyDependency, PropertyDescriptor, StandardValidators
+from nifiapi.properties import DataUnit, PropertyDependency, PropertyDescriptor, StandardValidators
+from ParseCache import ParseCache
 
 PLAIN_TEXT = "Plain Text"
 HTML = "HTML"
@@ -19,12 +30,36 @@ PARSING_STRATEGY_HIGH_RES = "High Resolution"
 PARSING_STRATEGY_OCR_ONLY = "OCR Only"
 PARSING_STRATEGY_FAST = "Fast"
 
+MARKUP_PARSER_UNSTRUCTURED = "Unstructured"
+MARKUP_PARSER_FAST = "Fast"
+
+EXCEL_PARSER_UNSTRUCTURED = "Unstructured"
+EXCEL_PARSER_STREAMING = "Streaming"
+
 SINGLE_DOCUMENT = "Single Document"
 DOCUMENT_PER_ELEMENT = "Document Per Element"
 
+# Input Formats whose content may be written to a temporary file and parsed from there
+SPILLED_FORMATS = [PDF, WORD, EXCEL, POWERPOINT]
+
 TEXT_KEY = "text"
 METADATA_KEY = "metadata"
 
+# Prefix of the attributes to which metadata that all Documents share is written
+SHARED_METADATA_ATTRIBUTE_PREFIX = "parse.metadata."
+
+# Metadata is only shared among Documents when there are at least this many
+MIN_DOCUMENTS_FOR_SHARED_METADATA = 2
+
+
+def iter_json_lines(json_docs: list[bytes], suffix: bytes):
+    # Yields the parts of the output, so that it is joined into a single bytes object without intermediate copies
+    for i, json_doc in enumerate(json_docs):
+        if i > 0:
+            yield b"\n"
+        yield json_doc
+        yield suffix
+
 
 class ParseDocument(FlowFileTransform):
     class Java:
@@ -68,6 +103,8 @@ class ParseDocument(FlowFileTransform):
             "python-docx==1.1.0",
             "openpyxl==3.1.2",
             "python-pptx==0.6.23",
+            "lxml==5.2.2",
+            "markdown-it-py==3.0.0",
         ]
 
     INPUT_FORMAT = PropertyDescriptor(
@@ -108,6 +145,18 @@ class ParseDocument(FlowFileTransform):
         default_value=DOCUMENT_PER_ELEMENT,
         dependencies=[PropertyDependency(INPUT_FORMAT, HTML, MARKDOWN)],
     )
+    MARKUP_PARSER = PropertyDescriptor(
+        name="Markup Parser",
+        description="""Specifies how HTML and Markdown are parsed. Unstructured uses the partitioning of the unstructured library.
+                    Fast parses HTML with lxml, and converts Markdown to HTML with markdown-it, without importing unstructured, producing
+                    Documents with the same text and metadata fields, including the 'category' of each element and the 'category_depth' of headings and
+                    list items. Paragraphs are classified as titles or narrative text by simpler rules than those of unstructured, and the language of
+                    the text is not detected.""",
+        allowable_values=[MARKUP_PARSER_UNSTRUCTURED, MARKUP_PARSER_FAST],
+        required=True,
+        default_value=MARKUP_PARSER_UNSTRUCTURED,
+        dependencies=[PropertyDependency(INPUT_FORMAT, HTML, MARKDOWN)],
+    )
     INCLUDE_PAGE_BREAKS = PropertyDescriptor(
         name="Include Page Breaks",
         description="Specifies whether or not page breaks should be considered when creating Documents from the input",
@@ -137,6 +186,132 @@ class ParseDocument(FlowFileTransform):
         required=True,
         dependencies=[PropertyDependency(INPUT_FORMAT, PDF)],
     )
+    MIN_TEXT_LAYER_CHARACTERS = PropertyDescriptor(
+        name="Minimum Text Layer Characters",
+        description="""Enables routing each page of a PDF to a parsing strategy of its own when greater than 0. In that case, the text layer of each page is
+                    scanned before the PDF is parsed. Pages with at least this many non-whitespace characters are parsed with the Fast strategy. Pages with
+                    fewer, such as scanned pages, are parsed with the OCR Only strategy rather than High Resolution. The strategy that was used for the
+                    page of each element is added to its metadata in a key named 'parsing_strategy'. With the default of 0, no page is scanned and the whole
+                    PDF is parsed with a single strategy chosen by unstructured, as without this property.""",
+        required=True,
+        default_value="0",
+        validators=[StandardValidators.NON_NEGATIVE_INTEGER_VALIDATOR],
+        dependencies=[PropertyDependency(PDF_PARSING_STRATEGY, PARSING_STRATEGY_AUTO)],
+    )
+    INTRA_OP_THREADS = PropertyDescriptor(
+        name="Intra-Op Threads",
+        description="""The number of threads that ONNX Runtime uses to run each operation of the layout detection model. When parsing with several concurrent tasks
+                    or Worker Processes, this should be set so that the total number of threads does not exceed the number of CPU cores.
+                    A value of 0 lets ONNX Runtime choose, which is typically one thread per CPU core.""",
+        required=True,
+        default_value="0",
+        validators=[StandardValidators.NON_NEGATIVE_INTEGER_VALIDATOR],
+        dependencies=[PropertyDependency(PDF_MODEL_NAME, *PdfUtils.ONNX_MODELS)],
+    )
+    INTER_OP_THREADS = PropertyDescriptor(
+        name="Inter-Op Threads",
+        description="""The number of threads that ONNX Runtime uses to run independent operations of the layout detection model concurrently.
+                    A value of 0 lets ONNX Runtime choose.""",
+        required=True,
+        default_value="0",
+        validators=[StandardValidators.NON_NEGATIVE_INTEGER_VALIDATOR],
+        dependencies=[PropertyDependency(PDF_MODEL_NAME, *PdfUtils.ONNX_MODELS)],
+    )
+    WORKER_PROCESSES = PropertyDescriptor(
+        name="Worker Processes",
+        description="""The number of Python processes to use for parsing the pages of a PDF. When set to 1, the whole PDF is parsed in the Processor's own process.
+                    When greater than 1, the PDF is divided into ranges of pages that are parsed in parallel by a pool of worker processes, and the resulting
+                    Documents are written in page order, with the same page numbers as when the whole PDF is parsed at once.""",
+        required=True,
+        default_value="1",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+        dependencies=[PropertyDependency(INPUT_FORMAT, PDF)],
+    )
+    PAGES_PER_TASK = PropertyDescriptor(
+        name="Pages Per Task",
+        description="""The maximum number of pages of a PDF that a worker process parses at a time, when more than one Worker Process is used.
+                    Fewer pages are given to each worker process when the PDF does not have enough pages to keep all of them busy.""",
+        required=True,
+        default_value="8",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+        dependencies=[PropertyDependency(INPUT_FORMAT, PDF)],
+    )
+    EXCEL_PARSER = PropertyDescriptor(
+        name="Excel Parser",
+        description="""Specifies how Excel workbooks are parsed. Unstructured loads each sheet as a single table, with its HTML rendering in the
+                    'text_as_html' metadata field. Streaming reads the rows of each sheet one at a time with the read-only mode of openpyxl, without loading
+                    the workbook into memory, and creates a Document for each group of rows, whose cells are separated by tabs. The metadata of each Document
+                    includes the 'page_name' and 'page_number' of its sheet, and the 'first_row_number' and 'last_row_number' of its rows, not counting a
+                    repeated header row. A sheet without rows below its header yields no Document. Streaming supports only the .xlsx format.""",
+        allowable_values=[EXCEL_PARSER_UNSTRUCTURED, EXCEL_PARSER_STREAMING],
+        required=True,
+        default_value=EXCEL_PARSER_UNSTRUCTURED,
+        dependencies=[PropertyDependency(INPUT_FORMAT, EXCEL)],
+    )
+    ROWS_PER_DOCUMENT = PropertyDescriptor(
+        name="Rows Per Document",
+        description="The maximum number of rows of a sheet that are included in each Document, not counting a repeated header row.",
+        required=True,
+        default_value="100",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+        dependencies=[PropertyDependency(EXCEL_PARSER, EXCEL_PARSER_STREAMING)],
+    )
+    REPEAT_HEADER_ROW = PropertyDescriptor(
+        name="Repeat Header Row",
+        description="""Whether or not the first non-empty row of each sheet is taken to be a header, and repeated as the first row of every Document of the
+                    sheet, so that the rows of each Document can be understood without the others.""",
+        allowable_values=["true", "false"],
+        required=True,
+        default_value="true",
+        dependencies=[PropertyDependency(EXCEL_PARSER, EXCEL_PARSER_STREAMING)],
+    )
+    SPILL_THRESHOLD = PropertyDescriptor(
+        name="Spill Threshold",
+        description="""The size above which the content of a FlowFile is written to a temporary file and parsed from that file, rather than from memory.
+                    The content is then not kept in memory while it is parsed, and the parsers read only the parts of the file that they need, which keeps
+                    the memory used by large PDF, Word, Excel and PowerPoint documents bounded. The NiFi Python API still hands the content to the Processor
+                    as a single bytes object, so the whole content is held in memory until it has been written to the file. The temporary file is removed once
+                    the FlowFile has been parsed. If not specified, all content is parsed from memory.""",
+        required=False,
+        validators=[StandardValidators.DATA_SIZE_VALIDATOR],
+        dependencies=[PropertyDependency(INPUT_FORMAT, *SPILLED_FORMATS)],
+    )
+    SPILL_DIRECTORY = PropertyDescriptor(
+        name="Spill Directory",
+        description="""The directory in which the temporary files of content larger than the Spill Threshold are written.
+                    If not specified, the temporary directory of the system is used.""",
+        required=False,
+        validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+        dependencies=[PropertyDependency(INPUT_FORMAT, *SPILLED_FORMATS)],
+    )
+    PARSE_CACHE_FILE = PropertyDescriptor(
+        name="Parse Cache File",
+        description="""The path of a local SQLite database in which the Documents parsed from each input are kept, keyed by the SHA-256 hash of the content
+                    and the properties that affect parsing. When an input with the same content is parsed again with the same properties, the Documents are
+                    read from the database instead of being parsed. The database is created if it does not exist, and may be shared by several Processors.
+                    If not specified, every input is parsed.""",
+        required=False,
+        validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+    )
+    PARSE_CACHE_SIZE = PropertyDescriptor(
+        name="Parse Cache Size",
+        description="""The maximum total size of the Documents kept in the Parse Cache File. When it is exceeded, the Documents that were least recently used
+                    are removed.""",
+        required=True,
+        default_value="1 GB",
+        validators=[StandardValidators.DATA_SIZE_VALIDATOR],
+    )
+    STREAM_DOCUMENTS = PropertyDescriptor(
+        name="Stream Documents",
+        description="""Whether or not to serialize each Document as soon as the loader produces it, rather than collecting all Documents before serializing them.
+                    When enabled, the Documents of a PDF that is parsed by Worker Processes are serialized as each range of pages is parsed, and no list of
+                    all Documents and their metadata is kept in memory. The output is built from the serialized Documents once the last one is produced, so
+                    memory usage peaks at about twice the size of the output. The 'chunk_index' and 'chunk_count' metadata fields are written as the last fields of
+                    each Document's metadata.""",
+        required=True,
+        default_value="false",
+        allowable_values=["true", "false"],
+    )
     METADATA_FIELDS = PropertyDescriptor(
         name="Metadata Fields",
         description="A comma-separated list of FlowFile attributes that will be added to the Documents' Metadata",
@@ -152,24 +327,179 @@ class ParseDocument(FlowFileTransform):
         required=True,
     )
 
+    INCLUDED_METADATA_KEYS = PropertyDescriptor(
+        name="Included Metadata Keys",
+        description="""A comma-separated list of the keys of the extracted metadata that are included in the Documents. Other extracted keys, such as the
+                    coordinates and detection probabilities of the elements of a PDF, are left out. If not specified, all extracted keys are included,
+                    except for the Excluded Metadata Keys. The Metadata Fields are always included.""",
+        required=False,
+        validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+        dependencies=[PropertyDependency(EXTRACT_METADATA, "true")],
+    )
+    EXCLUDED_METADATA_KEYS = PropertyDescriptor(
+        name="Excluded Metadata Keys",
+        description="""A comma-separated list of the keys of the extracted metadata that are left out of the Documents, such as 'coordinates',
+                    'detection_class_prob' or 'text_as_html'.""",
+        required=False,
+        validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+        dependencies=[PropertyDependency(EXTRACT_METADATA, "true")],
+    )
+    SHARED_METADATA_AS_ATTRIBUTES = PropertyDescriptor(
+        name="Shared Metadata as Attributes",
+        description="""Whether or not the extracted metadata that all Documents of a FlowFile have in common, such as the 'filetype' and 'languages' of
+                    the input, is written once as FlowFile attributes rather than on every Document. Each key is written to an attribute whose name is
+                    the key prefixed with 'parse.metadata.', with a JSON value unless the value is a string. This has no effect when
+                    there is only one Document, or when Documents are streamed.""",
+        required=True,
+        default_value="false",
+        allowable_values=["true", "false"],
+        dependencies=[PropertyDependency(EXTRACT_METADATA, "true")],
+    )
+
+    PARSE_STATISTICS = PropertyDescriptor(
+        name="Parse Statistics",
+        description="""Whether or not to add attributes that describe the parsing of each FlowFile: the milliseconds spent in each stage, in attributes
+                    named 'parse.ms.<stage>', the number of pages in 'parse.pages', and the number of elements in 'parse.elements' and of each category of
+                    element in 'parse.elements.<category>'. The stages are 'cache' for reading the Parse Cache File, 'parse' for loading the Documents,
+                    'serialize' for writing them, and 'total'. For PDFs, 'scan' is the scan of the text layer of each page, and 'fast', 'ocr', 'hi_res' and
+                    'auto' are the parsing of the pages with each strategy, which for pages parsed by Worker Processes is the sum of the time spent by each
+                    worker. On Linux, peak resident set sizes in bytes are added in attributes named 'parse.peak_rss.<stage>': for those stages, the largest
+                    peak of a worker while parsing a page range, and for 'parse', the peak of the Processor's own process while the Documents are loaded.
+                    As that peak is reset for the whole process, it is measured for one FlowFile at a time, and includes the memory used by other FlowFiles
+                    that the process handles meanwhile.""",
+        required=True,
+        default_value="false",
+        allowable_values=["true", "false"],
+    )
+    PROFILE_DIRECTORY = PropertyDescriptor(
+        name="Profile Directory",
+        description="""A local directory to which a cProfile dump of the processing of each FlowFile is written, in a file named after the FlowFile's
+                    UUID with the extension '.prof', for debugging performance. Only the Processor's own process is profiled, not its Worker Processes.
+                    Only one FlowFile is profiled at a time, so FlowFiles that are processed while another one is profiled have no profile. If not
+                    specified, no profiles are written.""",
+        required=False,
+        validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+    )
+
     property_descriptors = [
         INPUT_FORMAT,
         PDF_PARSING_STRATEGY,
         PDF_MODEL_NAME,
         ELEMENT_STRATEGY,
+        MARKUP_PARSER,
         INCLUDE_PAGE_BREAKS,
         PDF_INFER_TABLE_STRUCTURE,
         LANGUAGES,
+        MIN_TEXT_LAYER_CHARACTERS,
+        INTRA_OP_THREADS,
+        INTER_OP_THREADS,
+        WORKER_PROCESSES,
+        PAGES_PER_TASK,
+        EXCEL_PARSER,
+        ROWS_PER_DOCUMENT,
+        REPEAT_HEADER_ROW,
+        SPILL_THRESHOLD,
+        SPILL_DIRECTORY,
+        PARSE_CACHE_FILE,
+        PARSE_CACHE_SIZE,
+        STREAM_DOCUMENTS,
         METADATA_FIELDS,
         EXTRACT_METADATA,
+        INCLUDED_METADATA_KEYS,
+        EXCLUDED_METADATA_KEYS,
+        SHARED_METADATA_AS_ATTRIBUTES,
+        PARSE_STATISTICS,
+        PROFILE_DIRECTORY,
     ]
 
+    executor = None
+    worker_processes = 1
+    pages_per_task = 1
+    parse_cache = None
+    min_text_layer_characters = 0
+    fast_markup_parser = False
+    streaming_excel_parser = False
+    rows_per_document = 1
+    repeat_header_row = False
+    spill_threshold = None
+    spill_directory = None
+    included_metadata_keys = None
+    excluded_metadata_keys = None
+    collect_statistics = False
+    profile_directory = None
+
     def __init__(self, **kwargs):
         pass
 
     def getPropertyDescriptors(self):
         return self.property_descriptors
 
+    def onScheduled(self, context):
+        self.worker_processes = context.getProperty(self.WORKER_PROCESSES).asInteger()
+        self.pages_per_task = context.getProperty(self.PAGES_PER_TASK).asInteger()
+        self.min_text_layer_characters = context.getProperty(self.MIN_TEXT_LAYER_CHARACTERS).asInteger()
+        self.fast_markup_parser = context.getProperty(self.MARKUP_PARSER).getValue() == MARKUP_PARSER_FAST
+        self.streaming_excel_parser = context.getProperty(self.EXCEL_PARSER).getValue() == EXCEL_PARSER_STREAMING
+        self.rows_per_document = context.getProperty(self.ROWS_PER_DOCUMENT).asInteger()
+        self.repeat_header_row = context.getProperty(self.REPEAT_HEADER_ROW).asBoolean()
+
+        if context.getProperty(self.SPILL_THRESHOLD).getValue() is not None:
+            self.spill_threshold = context.getProperty(self.SPILL_THRESHOLD).asDataSize(DataUnit.B)
+        else:
+            self.spill_threshold = None
+        self.spill_directory = context.getProperty(self.SPILL_DIRECTORY).getValue()
+
+        included_metadata_keys = context.getProperty(self.INCLUDED_METADATA_KEYS).getValue()
+        self.included_metadata_keys = None if included_metadata_keys is None else self.get_keys(included_metadata_keys)
+        excluded_metadata_keys = context.getProperty(self.EXCLUDED_METADATA_KEYS).getValue()
+        self.excluded_metadata_keys = None if excluded_metadata_keys is None else self.get_keys(excluded_metadata_keys)
+        self.collect_statistics = context.getProperty(self.PARSE_STATISTICS).asBoolean()
+        self.profile_directory = context.getProperty(self.PROFILE_DIRECTORY).getValue()
+
+        parse_cache_file = context.getProperty(self.PARSE_CACHE_FILE).getValue()
+        if parse_cache_file is not None:
+            self.parse_cache = ParseCache(
+                parse_cache_file, context.getProperty(self.PARSE_CACHE_SIZE).asDataSize(DataUnit.B)
+            )
+        else:
+            self.parse_cache = None
+
+        if context.getProperty(self.INPUT_FORMAT).getValue() != PDF:
+            return
+
+        # The layout detection model is loaded before the first FlowFile arrives, in this process and in each worker process
+        layout_model_settings = None
+        strategy = self.get_parsing_strategy(context.getProperty(self.PDF_PARSING_STRATEGY).getValue(), "auto")
+        # Pages that are scanned for a text layer are parsed with the fast or OCR strategies, neither of which uses the model
+        if strategy in PdfUtils.LAYOUT_STRATEGIES and not (strategy == "auto" and self.min_text_layer_characters > 0):
+            layout_model_settings = (
+                context.getProperty(self.PDF_MODEL_NAME).getValue(),
+                context.getProperty(self.INTRA_OP_THREADS).asInteger(),
+                context.getProperty(self.INTER_OP_THREADS).asInteger(),
+            )
+            self.load_layout_model(*layout_model_settings)
+
+        if self.worker_processes > 1:
+            # Worker processes are spawned rather than forked so that they do not inherit the state of the NiFi communication threads
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.worker_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=PdfUtils.initialize_worker if layout_model_settings is not None else None,
+                initargs=layout_model_settings or (),
+            )
+
+    def onStopped(self, context):  # noqa: ARG002
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def load_layout_model(self, model_name: str, intra_op_threads: int, inter_op_threads: int) -> None:
+        # The model is downloaded when it is first loaded, so a failure is not fatal, as loading is retried for each FlowFile
+        try:
+            PdfUtils.load_layout_model(model_name, intra_op_threads, inter_op_threads)
+        except Exception:  # noqa: BLE001
+            self.logger.warning(f"Failed to load layout detection model {model_name}", exc_info=True)
+
     def get_parsing_strategy(self, nifi_value: str, default_value: str) -> str:
         if nifi_value == PARSING_STRATEGY_OCR_ONLY:
             return "ocr_only"
@@ -184,117 +514,338 @@ class ParseDocument(FlowFileTransform):
     def get_languages(self, nifi_value: str) -> list[str]:
         return [lang.strip() for lang in nifi_value.split(",")]
 
-    def create_docs(self, context, flowFile):
+    def get_keys(self, nifi_value: str) -> set[str]:
+        return {key.strip() for key in nifi_value.split(",") if key.strip()}
+
+    def get_metadata_fields(self, context) -> list[str]:
+        return [
+            attribute_name.strip() for attribute_name in context.getProperty(self.METADATA_FIELDS).getValue().split(",")
+        ]
+
+    def create_statistics(self) -> ParseStatistics.ParseStatistics | None:
+        return ParseStatistics.ParseStatistics() if self.collect_statistics else None
+
+    def create_docs(self, context, flowFile, attributes: dict, statistics=None) -> list:
+        return list(self.iterate_docs(context, flowFile, attributes, statistics))
+
+    def iterate_docs(
+        self, context, flowFile, attributes: dict, statistics: ParseStatistics.ParseStatistics | None = None
+    ):
+        documents = self.iterate_flowfile_docs(context, flowFile, attributes, statistics)
+        if statistics is None:
+            yield from documents
+            return
+
+        with statistics.measure_peak_rss(ParseStatistics.PARSE):
+            yield from statistics.record_documents(documents)
+
+    def iterate_flowfile_docs(
+        self, context, flowFile, attributes: dict, statistics: ParseStatistics.ParseStatistics | None
+    ):
         from langchain.schema import Document
 
         metadata = {}
 
-        for attribute_name in context.getProperty(self.METADATA_FIELDS).getValue().split(","):
-            trimmed = attribute_name.strip()
-            value = flowFile.getAttribute(trimmed)
-            metadata[trimmed] = value
+        for attribute_name in self.get_metadata_fields(context):
+            metadata[attribute_name] = flowFile.getAttribute(attribute_name)
 
         input_format = context.getProperty(self.INPUT_FORMAT).evaluateAttributeExpressions(flowFile).getValue()
         if input_format == PLAIN_TEXT:
-            return [Document(page_content=flowFile.getContentsAsBytes().decode("utf-8"), metadata=metadata)]
-
+            yield Document(page_content=flowFile.getContentsAsBytes().decode("utf-8"), metadata=metadata)
+            return
+
+        loader_settings = self.get_loader_settings(context, input_format)
+        content = flowFile.getContentsAsBytes()
+        key = None
+        if self.parse_cache is not None:
+            key = ParseCache.create_key(content, input_format, self.get_cache_settings(loader_settings))
+            if statistics is not None:
+                with statistics.measure(ParseStatistics.CACHE):
+                    documents = self.parse_cache.get(key)
+            else:
+                documents = self.parse_cache.get(key)
+            attributes["parse.cache"] = "miss" if documents is None else "hit"
+            if documents is not None:
+                yield from self.add_metadata(self.project_metadata(documents), metadata)
+                return
+
+        spill_file = None
+        if self.should_spill(flowFile.getSize(), input_format):
+            spill_file = self.spill_content(content)
+            # The content is parsed from the file, so it is not kept in memory while it is parsed
+            content = spill_file
+
+        try:
+            documents = self.load_docs(content, input_format, loader_settings, statistics)
+            if statistics is not None:
+                documents = statistics.time_iterable(documents, ParseStatistics.PARSE)
+            if key is not None:
+                documents = self.parse_cache.store(key, documents)
+            yield from self.add_metadata(self.project_metadata(documents), metadata)
+        finally:
+            if spill_file is not None:
+                os.remove(spill_file)
+
+    def should_spill(self, content_size: int, input_format: str) -> bool:
+        return (
+            self.spill_threshold is not None and content_size > self.spill_threshold and input_format in SPILLED_FORMATS
+        )
+
+    def spill_content(self, content: bytes) -> str:
+        """
+        Writes the given content to a temporary file, returning its path.
+        """
+        with tempfile.NamedTemporaryFile(dir=self.spill_directory, prefix="parse-", delete=False) as spill_file:
+            spill_file.write(content)
+        return spill_file.name
+
+    def get_loader_settings(self, context, input_format: str) -> dict:
+        """
+        Returns the arguments of the loader for the given Input Format, which are all the properties that affect how
+        the content is parsed.
+        """
         element_strategy = context.getProperty(self.ELEMENT_STRATEGY).getValue()
-        mode = "single" if element_strategy == SINGLE_DOCUMENT else "elements"
-
-        include_page_breaks = context.getProperty(self.INCLUDE_PAGE_BREAKS).asBoolean()
-        include_metadata = context.getProperty(self.EXTRACT_METADATA).asBoolean()
+        loader_settings = {
+            "mode": "single" if element_strategy == SINGLE_DOCUMENT else "elements",
+            "include_page_breaks": context.getProperty(self.INCLUDE_PAGE_BREAKS).asBoolean(),
+            "include_metadata": context.getProperty(self.EXTRACT_METADATA).asBoolean(),
+        }
+
+        if input_format == PDF:
+            loader_settings["infer_table_structure"] = context.getProperty(self.PDF_INFER_TABLE_STRUCTURE).asBoolean()
+            loader_settings["languages"] = self.get_languages(context.getProperty(self.LANGUAGES).getValue())
+            loader_settings["strategy"] = self.get_parsing_strategy(
+                context.getProperty(self.PDF_PARSING_STRATEGY).getValue(), PARSING_STRATEGY_AUTO
+            )
+            loader_settings["model_name"] = context.getProperty(self.PDF_MODEL_NAME).getValue()
+
+        return loader_settings
+
+    def get_cache_settings(self, loader_settings: dict) -> dict:
+        # Besides the arguments of the loader, the settings that change how the Processor uses the loader affect the result
+        return {
+            **loader_settings,
+            "min_text_layer_characters": self.min_text_layer_characters,
+            "fast_markup_parser": self.fast_markup_parser,
+            "streaming_excel_parser": self.streaming_excel_parser,
+            "rows_per_document": self.rows_per_document,
+            "repeat_header_row": self.repeat_header_row,
+        }
+
+    def load_docs(
+        self,
+        content: bytes | str,
+        input_format: str,
+        loader_settings: dict,
+        statistics: ParseStatistics.ParseStatistics | None = None,
+    ):
+        """
+        Returns an iterator over the Documents parsed from the given content, or from the file at the given path, which
+        are produced as the loader creates them.
+        """
+        if input_format in (HTML, MARKDOWN) and self.fast_markup_parser:
+            filetype = MarkupUtils.HTML_FILETYPE if input_format == HTML else MarkupUtils.MARKDOWN_FILETYPE
+            return MarkupUtils.load_markup(content, filetype, loader_settings)
+
+        if input_format == EXCEL and self.streaming_excel_parser:
+            return ExcelUtils.load_excel(
+                content, loader_settings, self.rows_per_document, repeat_header=self.repeat_header_row
+            )
 
         if input_format == HTML:
             from langchain.document_loaders import UnstructuredHTMLLoader
 
-            loader = UnstructuredHTMLLoader(
-                None,
-                file=io.BytesIO(flowFile.getContentsAsBytes()),
-                mode=mode,
-                include_page_breaks=include_page_breaks,
-                include_metadata=include_metadata,
-            )
+            loader_class = UnstructuredHTMLLoader
 
         elif input_format == PDF:
-            from langchain.document_loaders import UnstructuredPDFLoader
-
-            infer_table_structure = context.getProperty(self.PDF_INFER_TABLE_STRUCTURE).asBoolean()
-            strategy = self.get_parsing_strategy(
-                context.getProperty(self.PDF_PARSING_STRATEGY).getValue(), PARSING_STRATEGY_AUTO
-            )
-            languages = self.get_languages(context.getProperty(self.LANGUAGES).getValue())
-            model_name = context.getProperty(self.PDF_MODEL_NAME).getValue()
-
-            loader = UnstructuredPDFLoader(
-                None,
-                file=io.BytesIO(flowFile.getContentsAsBytes()),
-                mode=mode,
-                infer_table_structure=infer_table_structure,
-                include_page_breaks=include_page_breaks,
-                languages=languages,
-                strategy=strategy,
-                include_metadata=include_metadata,
-                model_name=model_name,
-            )
+            return self.load_pdf(content, loader_settings, statistics)
 
         elif input_format == MARKDOWN:
             from langchain.document_loaders import UnstructuredMarkdownLoader
 
-            loader = UnstructuredMarkdownLoader(
-                None,
-                file=io.BytesIO(flowFile.getContentsAsBytes()),
-                mode=mode,
-                include_page_breaks=include_page_breaks,
-                include_metadata=include_metadata,
-            )
+            loader_class = UnstructuredMarkdownLoader
 
         elif input_format == WORD:
             from langchain.document_loaders import UnstructuredWordDocumentLoader
 
-            loader = UnstructuredWordDocumentLoader(
-                None,
-                file=io.BytesIO(flowFile.getContentsAsBytes()),
-                mode=mode,
-                include_page_breaks=include_page_breaks,
-                include_metadata=include_metadata,
-            )
+            loader_class = UnstructuredWordDocumentLoader
 
         elif input_format == EXCEL:
             from langchain.document_loaders import UnstructuredExcelLoader
 
-            loader = UnstructuredExcelLoader(
-                None,
-                file=io.BytesIO(flowFile.getContentsAsBytes()),
-                mode=mode,
-                include_page_breaks=include_page_breaks,
-                include_metadata=include_metadata,
-            )
+            loader_class = UnstructuredExcelLoader
 
         elif input_format == POWERPOINT:
             from langchain.document_loaders import UnstructuredPowerPointLoader
 
-            loader = UnstructuredPowerPointLoader(
-                None,
-                file=io.BytesIO(flowFile.getContentsAsBytes()),
-                mode=mode,
-                include_page_breaks=include_page_breaks,
-                include_metadata=include_metadata,
-            )
+            loader_class = UnstructuredPowerPointLoader
 
         else:
             raise ValueError("Configured Input Format is invalid: " + input_format)
 
-        documents = loader.load()
-
-        if len(metadata) > 0:
-            for doc in documents:
+        return self.lazy_load(loader_class, content, loader_settings)
+
+    def lazy_load(self, loader_class, content: bytes | str, loader_settings: dict):
+        with ContentUtils.open_content(content) as file:
+            yield from loader_class(None, file=file, **loader_settings).lazy_load()
+
+    def project_metadata(self, documents):
+        """
+        Removes the keys of the extracted metadata that are not included, or that are excluded, from each Document.
+        """
+        if self.included_metadata_keys is None and self.excluded_metadata_keys is None:
+            yield from documents
+            return
+
+        for doc in documents:
+            if doc.metadata is not None:
+                doc.metadata = {
+                    key: value
+                    for key, value in doc.metadata.items()
+                    if (self.included_metadata_keys is None or key in self.included_metadata_keys)
+                    and (self.excluded_metadata_keys is None or key not in self.excluded_metadata_keys)
+                }
+            yield doc
+
+    def add_metadata(self, documents, metadata: dict):
+        for doc in documents:
+            if len(metadata) > 0:
                 if doc.metadata is None:
                     doc.metadata = metadata
                 else:
                     doc.metadata.update(metadata)
+            yield doc
+
+    def load_pdf(self, content: bytes | str, loader_settings: dict, statistics: ParseStatistics.ParseStatistics | None):
+        page_strategies = None
+        if loader_settings["strategy"] == "auto" and self.min_text_layer_characters > 0:
+            if statistics is not None:
+                with statistics.measure(ParseStatistics.SCAN):
+                    page_strategies = PdfUtils.get_page_strategies(content, self.min_text_layer_characters)
+            else:
+                page_strategies = PdfUtils.get_page_strategies(content, self.min_text_layer_characters)
+
+        if self.executor is None and page_strategies is None:
+            yield from self.lazy_load_pdf(content, loader_settings, statistics)
+            return
+
+        page_count = PdfUtils.get_page_count(content) if page_strategies is None else len(page_strategies)
+        if statistics is not None:
+            statistics.page_count = page_count
+        if self.executor is not None:
+            page_ranges = PdfUtils.get_page_ranges(
+                page_count, self.pages_per_task, self.worker_processes, page_strategies
+            )
+        else:
+            page_ranges = PdfUtils.get_page_ranges(page_count, page_count, 1, page_strategies)
 
+        range_settings = [
+            loader_settings if page_strategies is None else {**loader_settings, "strategy": page_strategies[start]}
+            for start, _ in page_ranges
+        ]
+        if len(page_ranges) > 1:
+            documents = self.load_pdf_pages(content, page_ranges, range_settings, statistics)
+        elif len(page_ranges) == 1:
+            # All pages are parsed with the same strategy, so the PDF does not need to be divided
+            documents = self.lazy_load_pdf(content, range_settings[0], statistics)
+        else:
+            documents = self.lazy_load_pdf(content, loader_settings, statistics)
+
+        for doc in documents:
+            page_number = doc.metadata.get("page_number")
+            if page_strategies is not None and page_number is not None:
+                doc.metadata["parsing_strategy"] = page_strategies[page_number - 1]
+            yield doc
+
+    def lazy_load_pdf(
+        self, content: bytes | str, loader_settings: dict, statistics: ParseStatistics.ParseStatistics | None
+    ):
+        documents = PdfUtils.lazy_load_pdf(content, loader_settings)
+        if statistics is not None:
+            documents = statistics.time_iterable(
+                documents, ParseStatistics.STRATEGY_STAGES[loader_settings["strategy"]]
+            )
         return documents
 
+    def load_pdf_pages(
+        self,
+        content: bytes | str,
+        page_ranges: list[tuple[int, int]],
+        range_settings: list[dict],
+        statistics: ParseStatistics.ParseStatistics | None,
+    ):
+        from langchain.schema import Document
+
+        range_pdfs = PdfUtils.extract_pages(content, page_ranges)
+        first_pages = [start for start, _ in page_ranges]
+        if self.executor is not None:
+            results = self.submit_page_ranges(range_pdfs, first_pages, range_settings)
+        else:
+            results = map(PdfUtils.parse_pages, range_pdfs, first_pages, range_settings)
+        element_lists = self.record_page_ranges(results, range_settings, statistics)
+
+        if range_settings[0]["mode"] == "single":
+            # Each range was loaded as a single Document, whose text is joined the way that the elements of the whole PDF would be
+            elements = [element for element_list in element_lists for element in element_list]
+            text = PdfUtils.ELEMENT_SEPARATOR.join(text for text, _ in elements if text)
+            yield Document(page_content=text, metadata=elements[0][1] if elements else {})
+            return
+
+        elements = PdfUtils.merge_page_ranges(
+            element_lists,
+            page_ranges,
+            include_metadata=range_settings[0]["include_metadata"],
+            include_page_breaks=range_settings[0]["include_page_breaks"],
+        )
+        for text, element_metadata in elements:
+            yield Document(page_content=text, metadata=element_metadata)
+
+    def submit_page_ranges(self, range_pdfs, first_pages: list[int], range_settings: list[dict]):
+        """
+        Yields the result of parsing each page range, in page order. Only a few more ranges than there are workers are
+        extracted and submitted ahead of the range being yielded, so that the PDFs of all ranges are never held at once.
+        """
+        futures = collections.deque()
+        for range_pdf, first_page, settings in zip(range_pdfs, first_pages, range_settings, strict=True):
+            if len(futures) == self.worker_processes * 2:
+                yield futures.popleft().result()
+            futures.append(
+                self.executor.submit(PdfUtils.parse_pages, range_pdf, first_page, settings, measure_peak_rss=True)
+            )
+        while futures:
+            yield futures.popleft().result()
+
+    def record_page_ranges(
+        self, results, range_settings: list[dict], statistics: ParseStatistics.ParseStatistics | None
+    ):
+        for (elements, duration, peak_rss), settings in zip(results, range_settings, strict=True):
+            if statistics is not None:
+                statistics.record(ParseStatistics.STRATEGY_STAGES[settings["strategy"]], duration, peak_rss)
+            yield elements
+
+    def remove_shared_metadata(self, docs: list, metadata_fields: list[str]) -> dict:
+        """
+        Removes the extracted metadata that all the given Documents have in common from each of them, returning it. The
+        Metadata Fields are left in place, as they are attributes of the FlowFile already.
+        """
+        if len(docs) < MIN_DOCUMENTS_FOR_SHARED_METADATA:
+            return {}
+
+        shared_metadata = {key: value for key, value in docs[0].metadata.items() if key not in metadata_fields}
+        for doc in docs[1:]:
+            shared_metadata = {
+                key: value
+                for key, value in shared_metadata.items()
+                if key in doc.metadata and doc.metadata[key] == value
+            }
+            if len(shared_metadata) == 0:
+                return shared_metadata
+
+        for doc in docs:
+            for key in shared_metadata:
+                del doc.metadata[key]
+        return shared_metadata
+
     def to_json(self, docs) -> str:
         json_docs = []
 
@@ -307,8 +858,45 @@ class ParseDocument(FlowFileTransform):
 
         return "\n".join(json_docs)
 
-    def transform(self, context, flowFile):
-        documents = self.create_docs(context, flowFile)
-        output_json = self.to_json(documents)
+    def stream_docs(self, docs) -> bytes:
+        # The total number of Documents is not known until the loader has produced all of them, so each Document is
+        # serialized as soon as it is produced, without its closing braces, and the 'chunk_count' field is appended
+        # once the loader is exhausted
+        json_docs = []
+        for i, doc in enumerate(docs):
+            metadata = json.dumps({**doc.metadata, "chunk_index": i})
+            json_docs.append(
+                f'{{"{TEXT_KEY}": {json.dumps(doc.page_content)}, "{METADATA_KEY}": {metadata[:-1]}'.encode()
+            )
+
+        suffix = f', "chunk_count": {len(json_docs)}}}}}'.encode()
+        return b"".join(iter_json_lines(json_docs, suffix))
 
-        return FlowFileTransformResult("success", contents=output_json, attributes={"mime.type": "application/json"})
+    def transform(self, context, flowFile):
+        if self.profile_directory is not None:
+            return ParseStatistics.run_profiled(
+                self.profile_directory, flowFile.getAttribute("uuid"), self.transform_docs, context, flowFile
+            )
+        return self.transform_docs(context, flowFile)
+
+    def transform_docs(self, context, flowFile):
+        start = time.perf_counter()
+        statistics = self.create_statistics()
+        attributes = {"mime.type": "application/json"}
+        if context.getProperty(self.STREAM_DOCUMENTS).asBoolean():
+            output_json = self.stream_docs(self.iterate_docs(context, flowFile, attributes, statistics))
+        else:
+            documents = self.create_docs(context, flowFile, attributes, statistics)
+            if context.getProperty(self.SHARED_METADATA_AS_ATTRIBUTES).asBoolean():
+                shared_metadata = self.remove_shared_metadata(documents, self.get_metadata_fields(context))
+                for key, value in shared_metadata.items():
+                    attributes[SHARED_METADATA_ATTRIBUTE_PREFIX + key] = (
+                        value if isinstance(value, str) else json.dumps(value)
+                    )
+            output_json = self.to_json(documents)
+
+        if statistics is not None:
+            statistics.finish(time.perf_counter() - start)
+            attributes.update(statistics.to_attributes())
+
+        return FlowFileTransformResult("success", contents=output_json, attributes=attributes)
@@ -0,0 +1,155 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import contextlib
+import cProfile
+import os
+import threading
+import time
+
+# Stages whose durations and peak memory are reported for each FlowFile
+CACHE = "cache"
+SCAN = "scan"
+PARSE = "parse"
+SERIALIZE = "serialize"
+TOTAL = "total"
+
+# The stage of parsing the pages of a PDF with each strategy of unstructured
+STRATEGY_STAGES = {"fast": "fast", "ocr_only": "ocr", "hi_res": "hi_res", "auto": "auto"}
+
+# Held while a FlowFile is profiled, as only one profiler can be enabled in a process at a time
+profile_lock = threading.Lock()
+
+# Held while the peak memory of a FlowFile is measured, as the peak is reset for the whole process
+peak_rss_lock = threading.Lock()
+
+
+def reset_peak_rss() -> None:
+    # On Linux, writing 5 to clear_refs resets the peak resident set size of the process to its current size
+    with contextlib.suppress(OSError), open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+
+
+def get_peak_rss() -> int | None:
+    """
+    Returns the peak resident set size of this process in bytes since it was last reset, or None where it is unknown.
+    """
+    with contextlib.suppress(OSError), open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def run_profiled(directory: str, name: str, function, *args):
+    """
+    Calls the given function with cProfile enabled, and writes the profile to a file with the given name in the
+    given directory. While another call is being profiled, the function is called without profiling.
+    """
+    if not profile_lock.acquire(blocking=False):
+        return function(*args)
+
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return function(*args)
+        finally:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(directory, f"{name}.prof"))
+    finally:
+        profile_lock.release()
+
+
+class ParseStatistics:
+    """
+    Collects the time spent in each stage of parsing a FlowFile, the peak memory of some stages, and the number of pages
+    and elements that it has.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self.peak_rss = {}
+        self.page_count = None
+        self.max_page_number = 0
+        self.element_counts = {}
+
+    def record(self, stage: str, duration: float, peak_rss: int | None = None) -> None:
+        self.durations[stage] = self.durations.get(stage, 0.0) + duration
+        if peak_rss is not None:
+            self.peak_rss[stage] = max(self.peak_rss.get(stage, 0), peak_rss)
+
+    @contextlib.contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def measure_peak_rss(self, stage: str):
+        """
+        Records the peak resident set size of this process while the body runs as the peak memory of the stage. The
+        peak is measured for one FlowFile at a time, and includes the memory used by the other FlowFiles that the
+        process handles meanwhile.
+        """
+        if not peak_rss_lock.acquire(blocking=False):
+            yield
+            return
+
+        try:
+            reset_peak_rss()
+            yield
+            peak_rss = get_peak_rss()
+            if peak_rss is not None:
+                self.peak_rss[stage] = max(self.peak_rss.get(stage, 0), peak_rss)
+        finally:
+            peak_rss_lock.release()
+
+    def time_iterable(self, iterable, stage: str):
+        # Only the time spent producing each item counts towards the stage
+        duration = 0.0
+        try:
+            iterator = iter(iterable)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    duration += time.perf_counter() - start
+                    return
+                duration += time.perf_counter() - start
+                yield item
+        finally:
+            self.record(stage, duration)
+
+    def record_documents(self, documents):
+        for doc in documents:
+            category = doc.metadata.get("category") if doc.metadata is not None else None
+            self.element_counts[category] = self.element_counts.get(category, 0) + 1
+            page_number = doc.metadata.get("page_number") if doc.metadata is not None else None
+            if isinstance(page_number, int):
+                self.max_page_number = max(self.max_page_number, page_number)
+            yield doc
+
+    def finish(self, total_duration: float) -> None:
+        # The Documents are serialized as they are loaded, so whatever the total does not spend loading them is spent
+        # serializing them
+        self.durations[TOTAL] = total_duration
+        self.durations[SERIALIZE] = max(
+            total_duration - self.durations.get(CACHE, 0.0) - self.durations.get(PARSE, 0.0), 0.0
+        )
+
+    def to_attributes(self) -> dict:
+        attributes = {f"parse.ms.{stage}": str(round(duration * 1000)) for stage, duration in self.durations.items()}
+        for stage, peak_rss in self.peak_rss.items():
+            attributes[f"parse.peak_rss.{stage}"] = str(peak_rss)
+
+        page_count = self.page_count if self.page_count is not None else self.max_page_number
+        if page_count > 0:
+            attributes["parse.pages"] = str(page_count)
+        attributes["parse.elements"] = str(sum(self.element_counts.values()))
+        for category, count in self.element_counts.items():
+            if category is not None:
+                attributes[f"parse.elements.{category}"] = str(count)
+        return attributes
@@ -0,0 +1,260 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import contextlib
+import hashlib
+import io
+import math
+import time
+
+import ContentUtils
+import ParseStatistics
+
+# Separator between the text of the elements of a PDF that is loaded as a single Document
+ELEMENT_SEPARATOR = "\n\n"
+
+# Layout detection models that run in ONNX Runtime
+ONNX_MODELS = ["yolox", "detectron2_onnx"]
+
+# Strategies of unstructured that may detect the layout of pages with a model
+LAYOUT_STRATEGIES = ["hi_res", "auto"]
+
+# Strategies of unstructured for pages that have a text layer and for pages that only have images
+FAST_STRATEGY = "fast"
+OCR_STRATEGY = "ocr_only"
+
+PAGE_BREAK_CATEGORY = "PageBreak"
+
+# The categories of the elements that unstructured nests under elements of each category, when it sets the parent of
+# each element of a document
+HIERARCHY_RULE_SET = {
+    "Title": [
+        "Text",
+        "UncategorizedText",
+        "NarrativeText",
+        "ListItem",
+        "BulletedText",
+        "Table",
+        "FigureCaption",
+        "CheckBox",
+    ],
+    "Header": [
+        "Title",
+        "Text",
+        "UncategorizedText",
+        "NarrativeText",
+        "ListItem",
+        "BulletedText",
+        "Table",
+        "FigureCaption",
+        "CheckBox",
+    ],
+}
+
+# The metadata that a page break added between page ranges takes from the elements around it, as unstructured gives
+# page breaks no page number
+PAGE_BREAK_METADATA_KEYS = ["source", "filetype", "languages"]
+
+
+def create_pdf_loader(file, loader_settings: dict):
+    from langchain.document_loaders import UnstructuredPDFLoader
+
+    return UnstructuredPDFLoader(None, file=file, **loader_settings)
+
+
+def lazy_load_pdf(content: bytes | str, loader_settings: dict):
+    with ContentUtils.open_content(content) as file:
+        yield from create_pdf_loader(file, loader_settings).lazy_load()
+
+
+def load_layout_model(model_name: str, intra_op_threads: int, inter_op_threads: int) -> None:
+    """
+    Loads a layout detection model into the model cache of unstructured-inference, which keeps one instance of each
+    model per process for all subsequent documents. The ONNX Runtime session of the model is recreated with the given
+    numbers of threads, where 0 lets ONNX Runtime choose.
+    """
+    from unstructured_inference.models.base import get_model
+
+    model = get_model(model_name)
+    if model_name not in ONNX_MODELS or (intra_op_threads == 0 and inter_op_threads == 0):
+        return
+
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = intra_op_threads
+    session_options.inter_op_num_threads = inter_op_threads
+    model.model = onnxruntime.InferenceSession(
+        model.model_path, sess_options=session_options, providers=model.model.get_providers()
+    )
+
+
+def initialize_worker(model_name: str, intra_op_threads: int, inter_op_threads: int) -> None:
+    # An exception here would break the whole pool, while a model that fails to load is loaded again, and its error
+    # reported, when the first page range is parsed
+    with contextlib.suppress(Exception):
+        load_layout_model(model_name, intra_op_threads, inter_op_threads)
+
+
+def get_page_count(content: bytes | str) -> int:
+    import pikepdf
+
+    with ContentUtils.open_content(content) as file, pikepdf.open(file) as pdf:
+        return len(pdf.pages)
+
+
+def get_page_strategies(content: bytes | str, min_text_characters: int) -> list[str]:
+    """
+    Returns the strategy for parsing each page of a PDF document: the fast strategy for pages whose text layer has at
+    least the given number of non-whitespace characters, and OCR for the other pages.
+    """
+    from pypdf import PdfReader
+
+    strategies = []
+    with ContentUtils.open_content(content) as file:
+        for page in PdfReader(file).pages:
+            try:
+                text = page.extract_text()
+            except Exception:  # noqa: BLE001
+                # A text layer that cannot be read is no better than none, as the fast strategy cannot read it either
+                text = ""
+            text_characters = len(text) - sum(character.isspace() for character in text)
+            strategies.append(FAST_STRATEGY if text_characters >= min_text_characters else OCR_STRATEGY)
+    return strategies
+
+
+def get_page_ranges(
+    page_count: int, pages_per_task: int, worker_processes: int, page_strategies: list[str] | None = None
+) -> list[tuple[int, int]]:
+    # Ranges are made smaller than the configured number of pages when that would leave some of the workers idle, and
+    # end wherever the strategy of the pages changes
+    range_size = max(min(pages_per_task, math.ceil(page_count / worker_processes)), 1)
+    page_ranges = []
+    start = 0
+    for page in range(1, page_count + 1):
+        if (
+            page == page_count
+            or page - start == range_size
+            or (page_strategies is not None and page_strategies[page] != page_strategies[start])
+        ):
+            page_ranges.append((start, page))
+            start = page
+    return page_ranges
+
+
+def extract_pages(content: bytes | str, page_ranges: list[tuple[int, int]]):
+    """
+    Yields a PDF document containing only the pages of each of the given ranges, with page indexes starting at 0.
+    """
+    import pikepdf
+
+    with ContentUtils.open_content(content) as file, pikepdf.open(file) as pdf:
+        for start, end in page_ranges:
+            with pikepdf.new() as range_pdf:
+                range_pdf.pages.extend(pdf.pages[start:end])
+                output = io.BytesIO()
+                range_pdf.save(output)
+            yield output.getvalue()
+
+
+def parse_pages(
+    content: bytes, first_page: int, loader_settings: dict, *, measure_peak_rss: bool = False
+) -> tuple[list[tuple[str, dict]], float, int | None]:
+    """
+    Parses a PDF document that contains a range of the pages of a larger document, returning the text and metadata of
+    each element, with page numbers that refer to the pages of the larger document, along with the seconds spent
+    parsing and, when measured, the peak resident set size of the process while parsing.
+
+    This function runs in worker processes, so it returns plain values rather than langchain Documents. The peak
+    resident set size is measured there for each page range, as a worker process parses one page range at a time.
+    """
+    if measure_peak_rss:
+        ParseStatistics.reset_peak_rss()
+    start = time.perf_counter()
+    loader = create_pdf_loader(io.BytesIO(content), loader_settings)
+    elements = []
+    for document in loader.load():
+        metadata = document.metadata
+        if metadata.get("page_number") is not None:
+            metadata["page_number"] += first_page
+        elements.append((document.page_content, metadata))
+    duration = time.perf_counter() - start
+    return elements, duration, ParseStatistics.get_peak_rss() if measure_peak_rss else None
+
+
+def get_element_id(text: str, metadata: dict, sequence_number: int) -> str:
+    """
+    Returns the id that unstructured gives an element by default: a hash of its file name, text, page number and the
+    position of the element among the consecutive elements on the same page.
+    """
+    data = f"{metadata.get('filename')}{text}{metadata.get('page_number')}{sequence_number}"
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+def create_page_break(elements: list[tuple[str, dict]]) -> tuple[str, dict]:
+    for text, metadata in elements:
+        if metadata.get("category") == PAGE_BREAK_CATEGORY:
+            return text, {key: value for key, value in metadata.items() if key != "parent_id"}
+    if not elements:
+        # The loader is created without a file path, which is the source of every element
+        return "", {"source": None, "category": PAGE_BREAK_CATEGORY}
+    metadata = {key: elements[0][1][key] for key in PAGE_BREAK_METADATA_KEYS if key in elements[0][1]}
+    metadata["category"] = PAGE_BREAK_CATEGORY
+    return "", metadata
+
+
+def merge_page_ranges(
+    element_lists, page_ranges: list[tuple[int, int]], *, include_metadata: bool, include_page_breaks: bool
+):
+    """
+    Yields the elements of consecutive page ranges of a PDF document as if the whole document had been parsed at once.
+    Each range was parsed as a document of its own, so unstructured set the parent of each element within its range
+    only, with ids that depend on the page numbers within the range. The parents are set again across ranges, with the
+    same rules, and refer to the ids of the elements in the whole document. The hi_res strategy adds no page break
+    after the last page of a document, so the page break between ranges that have one break less than pages is added
+    back.
+    """
+    # The elements that later elements may be nested under, as (id, category, depth)
+    stack = []
+    page_number = None
+    sequence_number = -1
+    missing_page_break = None
+    page_break = None
+    for element_list, (start, end) in zip(element_lists, page_ranges, strict=True):
+        previous_element_list = missing_page_break
+        page_breaks = sum(metadata.get("category") == PAGE_BREAK_CATEGORY for _, metadata in element_list)
+        missing_page_break = element_list if include_page_breaks and page_breaks < end - start else None
+        range_elements = element_list
+        if previous_element_list is not None:
+            # The page break is made like the elements around it, or the last page break when there are none
+            elements = [*previous_element_list, *element_list]
+            if elements or page_break is None:
+                page_break = create_page_break(elements)
+            range_elements = [(page_break[0], dict(page_break[1])), *element_list]
+
+        for text, metadata in range_elements:
+            if not include_metadata:
+                yield text, metadata
+                continue
+
+            # Elements are numbered within each run of consecutive elements on the same page
+            sequence_number = sequence_number + 1 if metadata.get("page_number") == page_number else 0
+            page_number = metadata.get("page_number")
+
+            category = metadata.get("category")
+            depth = metadata.get("category_depth") or 0
+            metadata.pop("parent_id", None)
+            if not category:
+                yield text, metadata
+                continue
+
+            while stack:
+                top_id, top_category, top_depth = stack[-1]
+                if (top_category == category and top_depth < depth) or (
+                    top_category != category and category in HIERARCHY_RULE_SET.get(top_category, [])
+                ):
+                    metadata["parent_id"] = top_id
+                    break
+                stack.pop()
+
+            stack.append((get_element_id(text, metadata, sequence_number), category, depth))
+            yield text, metadata
@@ -0,0 +1,149 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import re
+
+from NativeSplitters import NativeTextSplitter
+
+SEMANTIC = "Semantic"
+
+# Sentences end with terminal punctuation followed by whitespace, or with a blank line
+SENTENCE_BOUNDARY_PATTERN = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+# Separators used to split semantic sections that are larger than the Chunk Size
+SECTION_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+def find_sentences(text: str) -> list[tuple[int, int]]:
+    sentences = []
+    start = 0
+    for match in SENTENCE_BOUNDARY_PATTERN.finditer(text):
+        sentences.append((start, match.start()))
+        start = match.end()
+    sentences.append((start, len(text)))
+
+    stripped_sentences = []
+    for sentence_start, sentence_end in sentences:
+        start = sentence_start
+        end = sentence_end
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            stripped_sentences.append((start, end))
+
+    return stripped_sentences
+
+
+class SemanticTextSplitter:
+    """
+    Splits text into sections of semantically related sentences.
+
+    The sentences of all texts in a batch are embedded together, and a section ends wherever the cosine distance between
+    the windows of sentences before and after a sentence boundary exceeds the configured percentile of those distances.
+    Sections that are larger than the chunk size are split further along paragraphs, lines and words.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        *,
+        breakpoint_percentile: int,
+        window_size: int,
+        embedding_batch_size: int,
+        chunk_size: int,
+        chunk_overlap: int,
+        length_function=len,
+    ):
+        self.embeddings = embeddings
+        self.breakpoint_percentile = breakpoint_percentile
+        self.window_size = window_size
+        self.embedding_batch_size = embedding_batch_size
+        self.chunk_size = chunk_size
+        self.length_function = length_function
+        self.section_splitter = NativeTextSplitter(
+            SECTION_SEPARATORS,
+            recursive=True,
+            is_separator_regex=False,
+            keep_separator=False,
+            strip_whitespace=True,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=length_function,
+        )
+
+    def split_text(self, text: str) -> list[str]:
+        return self.split_texts([text])[0]
+
+    def split_texts(self, texts: list[str]) -> list[list[str]]:
+        return [[chunk for chunk, _, _ in chunks] for chunks in self.split_texts_with_offsets(texts)]
+
+    def split_texts_with_offsets(self, texts: list[str]) -> list[list[tuple[str, int, int]]]:
+        import numpy as np
+
+        text_sentences = [find_sentences(text) for text in texts]
+        sentence_texts = [
+            text[start:end] for text, sentences in zip(texts, text_sentences, strict=True) for start, end in sentences
+        ]
+
+        embedding_batches = []
+        for i in range(0, len(sentence_texts), self.embedding_batch_size):
+            batch = sentence_texts[i : i + self.embedding_batch_size]
+            embedding_batches.append(np.asarray(self.embeddings.embed_documents(batch), dtype=np.float32))
+
+        chunk_lists = []
+        offset = 0
+        embeddings = np.concatenate(embedding_batches) if embedding_batches else None
+        for text, sentences in zip(texts, text_sentences, strict=True):
+            sentence_embeddings = embeddings[offset : offset + len(sentences)] if sentences else None
+            offset += len(sentences)
+            chunk_lists.append(self.split_sections(text, sentences, sentence_embeddings))
+
+        return chunk_lists
+
+    def find_breakpoints(self, sentence_embeddings) -> list[int]:
+        import numpy as np
+
+        sentence_count = len(sentence_embeddings)
+        if sentence_count <= 1:
+            return []
+
+        norms = np.linalg.norm(sentence_embeddings, axis=1, keepdims=True)
+        normalized = sentence_embeddings / np.where(norms == 0, 1, norms)
+
+        # Cumulative sums give the sum of the embeddings in every window before and after each boundary in one pass
+        cumulative = np.vstack([
+            np.zeros((1, normalized.shape[1]), dtype=normalized.dtype),
+            np.cumsum(normalized, axis=0),
+        ])
+        boundaries = np.arange(1, sentence_count)
+        before = cumulative[boundaries] - cumulative[np.maximum(boundaries - self.window_size, 0)]
+        after = cumulative[np.minimum(boundaries + self.window_size, sentence_count)] - cumulative[boundaries]
+
+        denominators = np.linalg.norm(before, axis=1) * np.linalg.norm(after, axis=1)
+        similarities = np.einsum("ij,ij->i", before, after) / np.where(denominators == 0, 1, denominators)
+        distances = 1 - similarities
+
+        threshold = np.percentile(distances, self.breakpoint_percentile)
+        return [int(boundary) for boundary in boundaries[distances > threshold]]
+
+    def split_sections(self, text: str, sentences: list[tuple[int, int]], sentence_embeddings) -> list:
+        if not sentences:
+            return []
+
+        chunks = []
+        section_start = 0
+        for section_end in [*self.find_breakpoints(sentence_embeddings), len(sentences)]:
+            start = sentences[section_start][0]
+            end = sentences[section_end - 1][1]
+            section_start = section_end
+
+            section = text[start:end]
+            if self.length_function(section) <= self.chunk_size:
+                chunks.append((section, start, end))
+                continue
+
+            for chunk, chunk_start, chunk_end in self.section_splitter.split_text_with_offsets(section):
+                chunks.append((chunk, start + chunk_start, start + chunk_end))
+
+        return chunks
@@ -0,0 +1,255 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import TokenizerUtils
+from CodeSplitters import CodeTextSplitter
+from NativeSplitters import (
+    ContentDefinedTextSplitter,
+    HeaderTextSplitter,
+    NativeTextSplitter,
+)
+
+# Chunking Strategies
+SPLIT_BY_CHARACTER = "Split by Character"
+SPLIT_CODE = "Split Code"
+RECURSIVELY_SPLIT_BY_CHARACTER = "Recursively Split by Character"
+CONTENT_DEFINED = "Content-Defined"
+SPLIT_BY_HEADERS = "Split by Headers"
+
+# Code Boundaries
+SYNTAX_TREE = "Syntax Tree"
+LANGUAGE_SEPARATORS = "Language Separators"
+
+# Header Formats
+MARKDOWN = "Markdown"
+HTML = "HTML"
+
+# Splitting Engines
+NATIVE = "Native"
+LANGCHAIN = "LangChain"
+
+# Languages supported by the Split Code strategy
+LANGUAGES = [
+    "cpp",
+    "go",
+    "java",
+    "kotlin",
+    "js",
+    "ts",
+    "php",
+    "proto",
+    "python",
+    "rst",
+    "ruby",
+    "rust",
+    "scala",
+    "swift",
+    "markdown",
+    "latex",
+    "html",
+    "sol",
+    "csharp",
+    "cobol",
+    "c",
+    "lua",
+    "perl",
+    "haskell",
+]
+
+# Separator Formats
+PLAIN_TEXT = "Plain Text"
+REGULAR_EXPRESSION = "Regular Expression"
+
+# Maximum number of splitters retained by each worker process
+WORKER_TEXT_SPLITTER_CACHE_SIZE = 16
+
+worker_text_splitters = {}
+
+
+def unescape_separators(separator: str) -> list[str]:
+    unescaped = []
+    for split in separator.split(","):
+        unescaped.append(split.replace("\\n", "\n").replace("\\r", "\r").replace("\\t", "\t"))
+    return unescaped
+
+
+def get_language_separators(language: str) -> list[str]:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter.get_separators_for_language(language)
+
+
+def create_native_text_splitter(
+    length_function,
+    *,
+    strategy: str,
+    separator: str | None,
+    separator_format: str,
+    keep_separator: bool,
+    strip_whitespace: bool,
+    chunk_size: int,
+    chunk_overlap: int,
+    language: str,
+) -> NativeTextSplitter | None:
+    if strategy == SPLIT_BY_CHARACTER:
+        separators = [separator]
+        is_separator_regex = separator_format == REGULAR_EXPRESSION
+    elif strategy == SPLIT_CODE:
+        # Code is split with the same settings that RecursiveCharacterTextSplitter.from_language applies
+        separators = get_language_separators(language)
+        is_separator_regex = True
+        keep_separator = True
+        strip_whitespace = True
+    else:
+        separators = unescape_separators(separator)
+        is_separator_regex = separator_format == REGULAR_EXPRESSION
+
+    if not NativeTextSplitter.supports(separators, is_separator_regex=is_separator_regex):
+        return None
+
+    return NativeTextSplitter(
+        separators,
+        recursive=strategy != SPLIT_BY_CHARACTER,
+        is_separator_regex=is_separator_regex,
+        keep_separator=keep_separator,
+        strip_whitespace=strip_whitespace,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+    )
+
+
+def create_text_splitter(
+    length_function,
+    *,
+    engine: str,
+    strategy: str,
+    separator: str | None,
+    separator_format: str,
+    keep_separator: bool,
+    strip_whitespace: bool,
+    chunk_size: int,
+    chunk_overlap: int,
+    language: str,
+    code_boundaries: str,
+    header_format: str,
+):
+    # Content-defined boundaries and header sections have no equivalent LangChain splitter, so the Splitting Engine does
+    # not apply to them
+    if strategy == CONTENT_DEFINED:
+        return ContentDefinedTextSplitter(chunk_size=chunk_size, length_function=length_function)
+
+    if strategy == SPLIT_BY_HEADERS:
+        return HeaderTextSplitter(
+            html=header_format == HTML,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=length_function,
+        )
+
+    if strategy == SPLIT_CODE and code_boundaries == SYNTAX_TREE:
+        fallback_splitter = create_native_text_splitter(
+            length_function,
+            strategy=strategy,
+            separator=separator,
+            separator_format=separator_format,
+            keep_separator=keep_separator,
+            strip_whitespace=strip_whitespace,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            language=language,
+        )
+        return CodeTextSplitter(
+            language, chunk_size=chunk_size, fallback_splitter=fallback_splitter, length_function=length_function
+        )
+
+    if engine == NATIVE:
+        text_splitter = create_native_text_splitter(
+            length_function,
+            strategy=strategy,
+            separator=separator,
+            separator_format=separator_format,
+            keep_separator=keep_separator,
+            strip_whitespace=strip_whitespace,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            language=language,
+        )
+        # Separators that the native splitter cannot represent are handled by the LangChain splitters
+        if text_splitter is not None:
+            return text_splitter
+
+    from langchain.text_splitter import (
+        CharacterTextSplitter,
+        RecursiveCharacterTextSplitter,
+    )
+
+    if strategy == SPLIT_BY_CHARACTER:
+        return CharacterTextSplitter(
+            separator=separator,
+            keep_separator=keep_separator,
+            is_separator_regex=separator_format == REGULAR_EXPRESSION,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=length_function,
+            strip_whitespace=strip_whitespace,
+        )
+
+    if strategy == SPLIT_CODE:
+        return RecursiveCharacterTextSplitter.from_language(
+            language=language,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=length_function,
+        )
+
+    return RecursiveCharacterTextSplitter(
+        separators=unescape_separators(separator),
+        keep_separator=keep_separator,
+        is_separator_regex=separator_format == REGULAR_EXPRESSION,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+        strip_whitespace=strip_whitespace,
+    )
+
+
+def split_text_with_offsets(text_splitter, text: str) -> list[tuple[str, int | None, int | None]]:
+    if hasattr(text_splitter, "split_text_with_offsets"):
+        return text_splitter.split_text_with_offsets(text)
+
+    # The LangChain splitters do not report offsets, so each chunk is located after the start of the previous chunk as
+    # LangChain does when adding start indexes. Chunks that were joined with a different separator are not found.
+    chunks = []
+    search_start = 0
+    for chunk in text_splitter.split_text(text):
+        start = text.find(chunk, search_start)
+        if start == -1:
+            chunks.append((chunk, None, None))
+            continue
+
+        chunks.append((chunk, start, start + len(chunk)))
+        search_start = start + 1
+    return chunks
+
+
+def split_texts(
+    splitter_settings: dict, length_settings: dict, texts: list[str]
+) -> list[list[tuple[str, int | None, int | None]]]:
+    """
+    Splits each of the given texts into chunks, returning one list of chunks per text, with each chunk given as a tuple
+    of its text and its start and end offsets in the source text.
+
+    This function runs in worker processes, so it receives the splitter configuration as plain values and keeps the
+    splitters it creates for subsequent calls with the same configuration.
+    """
+    key = (tuple(splitter_settings.items()), tuple(length_settings.items()))
+    text_splitter = worker_text_splitters.get(key)
+    if text_splitter is None:
+        if len(worker_text_splitters) >= WORKER_TEXT_SPLITTER_CACHE_SIZE:
+            worker_text_splitters.clear()
+
+        length_function = TokenizerUtils.create_length_function(**length_settings)
+        text_splitter = create_text_splitter(length_function, **splitter_settings)
+        worker_text_splitters[key] = text_splitter
+
+    return [split_text_with_offsets(text_splitter, text) for text in texts]
@@ -0,0 +1,50 @@
+# SPDX-License-Identifier: Apache-2.0
+
+from functools import lru_cache
+
+# Length Units
+CHARACTERS = "Characters"
+TOKENS = "Tokens"
+
+# Tokenizers
+TIKTOKEN = "tiktoken"
+HUGGING_FACE_TOKENIZER = "Hugging Face Tokenizer File"
+
+# Maximum number of texts whose token counts are remembered by a length function
+TOKEN_COUNT_CACHE_SIZE = 16384
+
+
+def create_token_counter(tokenizer: str, tiktoken_encoding: str | None, tokenizer_file: str | None):
+    if tokenizer == TIKTOKEN:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(tiktoken_encoding)
+
+        def count_tokens(text: str) -> int:
+            return len(encoding.encode(text, disallowed_special=()))
+
+        return count_tokens
+
+    if tokenizer == HUGGING_FACE_TOKENIZER:
+        from tokenizers import Tokenizer
+
+        hugging_face_tokenizer = Tokenizer.from_file(tokenizer_file)
+
+        def count_tokens(text: str) -> int:
+            return len(hugging_face_tokenizer.encode(text, add_special_tokens=False).ids)
+
+        return count_tokens
+
+    raise ValueError("Configured Tokenizer is invalid: " + tokenizer)
+
+
+def create_length_function(
+    length_unit: str, tokenizer: str | None, tiktoken_encoding: str | None, tokenizer_file: str | None
+):
+    if length_unit != TOKENS:
+        return len
+
+    count_tokens = create_token_counter(tokenizer, tiktoken_encoding, tokenizer_file)
+
+    # The splitters measure the same pieces of text repeatedly while merging splits, so token counts are remembered
+    return lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)(count_tokens)
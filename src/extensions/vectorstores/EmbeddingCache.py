@@ -0,0 +1,141 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import math
+import sqlite3
+import struct
+import time
+from contextlib import closing
+
+# Seconds to wait for another process that holds the lock of the cache database
+CACHE_TIMEOUT = 30
+
+# The number of keys that are looked up in a single query, which is below the limit of SQLite on query parameters
+LOOKUP_BATCH_SIZE = 500
+
+# Seconds for which the last access time of a vector is not updated again, so that most lookups only read the database
+ACCESS_TIME_RESOLUTION = 60
+
+FLOAT32 = "float32"
+FLOAT16 = "float16"
+
+# The struct format characters of the precisions that vectors are stored with
+VECTOR_FORMATS = {FLOAT32: "f", FLOAT16: "e"}
+
+
+def encode_vector(vector, vector_format: str) -> bytes:
+    return struct.pack(f"<{len(vector)}{vector_format}", *vector)
+
+
+def decode_vector(blob: bytes, vector_format: str) -> list[float]:
+    return list(struct.unpack(f"<{len(blob) // struct.calcsize(vector_format)}{vector_format}", blob))
+
+
+class EmbeddingCache:
+    """
+    Keeps the embedding of each text in a local SQLite database, keyed by the hash of the identity of the model that
+    created it and of the text. Vectors are stored as little-endian blobs of 32-bit or 16-bit floats. When the total
+    size of the vectors exceeds the maximum size, the vectors that were least recently used are removed. The total
+    size is kept up to date by triggers, so that it is not summed up again whenever vectors are added.
+    """
+
+    def __init__(self, path: str, max_size: int, precision: str):
+        self.path = path
+        self.max_size = max_size
+        self.vector_format = VECTOR_FORMATS[precision]
+        with closing(self.connect()) as connection, connection:
+            # Lookups are not blocked while another process adds vectors
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL, "
+                "format TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO embeddings_size (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM embeddings"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS embeddings_insert AFTER INSERT ON embeddings "
+                "BEGIN UPDATE embeddings_size SET total = total + NEW.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS embeddings_update AFTER UPDATE OF size ON embeddings "
+                "BEGIN UPDATE embeddings_size SET total = total - OLD.size + NEW.size; END"
+            )
+            connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS embeddings_delete AFTER DELETE ON embeddings "
+                "BEGIN UPDATE embeddings_size SET total = total - OLD.size; END"
+            )
+
+    @staticmethod
+    def create_key(model: str, text: str) -> bytes:
+        digest = hashlib.sha256(model.encode())
+        digest.update(b"\0")
+        digest.update(text.encode())
+        return digest.digest()
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=CACHE_TIMEOUT)
+
+    def get(self, keys: list[bytes]) -> dict[bytes, list[float]]:
+        """
+        Returns the vectors of those of the given keys that are in the cache, and marks them as recently used, unless
+        they were already marked recently.
+        """
+        vectors = {}
+        access_time = time.time()
+        accessed_keys = []
+        with closing(self.connect()) as connection, connection:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start : start + LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                rows = connection.execute(
+                    # Only placeholders are interpolated into the query
+                    f"SELECT key, vector, format, last_access FROM embeddings WHERE key IN ({placeholders})",  # noqa: S608
+                    batch,
+                ).fetchall()
+                for key, blob, vector_format, last_access in rows:
+                    vectors[key] = decode_vector(blob, vector_format)
+                    if last_access < access_time - ACCESS_TIME_RESOLUTION:
+                        accessed_keys.append((access_time, key))
+
+            if accessed_keys:
+                connection.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", accessed_keys)
+        return vectors
+
+    def put(self, vectors: dict[bytes, list[float]]) -> None:
+        if not vectors:
+            return
+
+        access_time = time.time()
+        rows = []
+        for key, vector in vectors.items():
+            blob = encode_vector(vector, self.vector_format)
+            rows.append((key, blob, self.vector_format, len(blob), access_time))
+
+        with closing(self.connect()) as connection, connection:
+            # Vectors that are already cached are updated in place, so that the triggers count their size once
+            connection.executemany(
+                "INSERT INTO embeddings (key, vector, format, size, last_access) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET vector = excluded.vector, format = excluded.format, "
+                "size = excluded.size, last_access = excluded.last_access",
+                rows,
+            )
+            self.evict(connection)
+
+    def evict(self, connection: sqlite3.Connection) -> None:
+        while True:
+            total_size = connection.execute("SELECT total FROM embeddings_size").fetchone()[0]
+            if total_size <= self.max_size:
+                return
+
+            # The vectors of a model all have the same size, so the number of vectors to remove is estimated from the
+            # size of the least recently used one
+            oldest_size = connection.execute("SELECT size FROM embeddings ORDER BY last_access LIMIT 1").fetchone()[0]
+            connection.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+                (math.ceil((total_size - self.max_size) / max(oldest_size, 1)),),
+            )
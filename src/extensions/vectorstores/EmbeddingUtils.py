@@ -1,8 +1,11 @@
 # SPDX-License-Identifier: Apache-2.0
 
-from langchain.embeddings.huggingface import HuggingFaceInferenceAPIEmbeddings
-from langchain.embeddings.openai import OpenAIEmbeddings
-from nifiapi.properties import PropertyDependency, PropertyDescriptor, StandardValidators
+import contextlib
+import json
+
+from EmbeddingCache import FLOAT16, FLOAT32, EmbeddingCache
+from langchain.schema.embeddings import Embeddings
+from nifiapi.properties import DataUnit, PropertyDependency, PropertyDescriptor, StandardValidators
 
 # Embedding Functions
 ONNX_ALL_MINI_LM_L6_V2 = "ONNX all-MiniLM-L6-v2 Model"
@@ -10,6 +13,8 @@ HUGGING_FACE = "Hugging Face Model"
 OPENAI = "OpenAI Model"
 SENTENCE_TRANSFORMERS = "Sentence Transformers"
 
+# Suffix of the model identity of query embeddings, which some models create differently from document embeddings
+QUERY_MODEL_SUFFIX = "/query"
 
 EMBEDDING_FUNCTION = PropertyDescriptor(
     name="Embedding Function",
@@ -118,6 +123,31 @@ HUGGING_FACE_MODEL = PropertyDescriptor(
     dependencies=[PropertyDependency(EMBEDDING_MODEL, HUGGING_FACE)],
 )
 
+EMBEDDING_CACHE_FILE = PropertyDescriptor(
+    name="Embedding Cache File",
+    description="""The path of a local SQLite database in which the embedding of each text is kept, keyed by the SHA-256 hash of the text and of the
+                embedding function or model that created it. Texts whose embeddings are in the database are not sent to the embedding function or model again.
+                The database is created if it does not exist, and may be shared by several Processors. If not specified, every text is embedded.""",
+    required=False,
+    validators=[StandardValidators.NON_EMPTY_VALIDATOR],
+)
+EMBEDDING_CACHE_SIZE = PropertyDescriptor(
+    name="Embedding Cache Size",
+    description="""The maximum total size of the embeddings kept in the Embedding Cache File. When it is exceeded, the embeddings that were least recently used
+                are removed.""",
+    required=True,
+    default_value="1 GB",
+    validators=[StandardValidators.DATA_SIZE_VALIDATOR],
+)
+EMBEDDING_CACHE_PRECISION = PropertyDescriptor(
+    name="Embedding Cache Precision",
+    description="""The precision of the floating-point numbers that embeddings are kept with in the Embedding Cache File. Half precision takes half the space,
+                at the cost of slightly different embeddings being returned for texts that are found in the cache.""",
+    allowable_values=[FLOAT32, FLOAT16],
+    default_value=FLOAT32,
+    required=True,
+)
+
 PROPERTIES = [
     EMBEDDING_FUNCTION,
     HUGGING_FACE_MODEL_NAME,
@@ -133,6 +163,79 @@ PROPERTIES = [
     EMBEDDING_MODEL,
 ]
 
+CACHE_PROPERTIES = [EMBEDDING_CACHE_FILE, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PRECISION]
+
+
+class CachedEmbedder:
+    """
+    Embeds texts with an embedding function or service, taking the embeddings of the texts that are in an
+    EmbeddingCache from the cache, and adding those of the other texts to it. Each text that occurs more than once is
+    only embedded once. The number of texts that were looked up and found in the cache is counted, so a new instance is
+    meant to be created for each FlowFile.
+    """
+
+    def __init__(self, cache: EmbeddingCache, model: str):
+        self.cache = cache
+        self.model = model
+        self.lookups = 0
+        self.hits = 0
+
+    def embed(self, texts: list[str], embed_texts, model: str) -> list[list[float]]:
+        keys = [EmbeddingCache.create_key(model, text) for text in texts]
+        vectors = self.cache.get(keys)
+        self.lookups += len(keys)
+        self.hits += sum(key in vectors for key in keys)
+
+        missing_texts = {}
+        for key, text in zip(keys, texts, strict=True):
+            if key not in vectors:
+                missing_texts.setdefault(key, text)
+        if missing_texts:
+            missing_vectors = dict(zip(missing_texts.keys(), embed_texts(list(missing_texts.values())), strict=True))
+            self.cache.put(missing_vectors)
+            vectors.update(missing_vectors)
+
+        return [vectors[key] for key in keys]
+
+    def to_attributes(self) -> dict:
+        attributes = {"embedding.cache.lookups": str(self.lookups), "embedding.cache.hits": str(self.hits)}
+        if self.lookups > 0:
+            attributes["embedding.cache.hit.ratio"] = f"{self.hits / self.lookups:.4f}"
+        return attributes
+
+
+class CachedEmbeddingFunction(CachedEmbedder):
+    """
+    Wraps a Chroma embedding function with an EmbeddingCache.
+    """
+
+    def __init__(self, function, cache: EmbeddingCache, model: str):
+        super().__init__(cache, model)
+        self.function = function
+
+    # Chroma requires the parameter of an embedding function to be named 'input'
+    def __call__(self, input: list[str]) -> list[list[float]]:  # noqa: A002
+        return self.embed(list(input), self.function, self.model)
+
+
+class CachedEmbeddings(CachedEmbedder, Embeddings):
+    """
+    Wraps a langchain embedding service with an EmbeddingCache.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str):
+        super().__init__(cache, model)
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed(list(texts), self.embeddings.embed_documents, self.model)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed([text], self.embed_queries, self.model + QUERY_MODEL_SUFFIX)[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return [self.embeddings.embed_query(text) for text in texts]
+
 
 def create_embedding_function(context):
     from chromadb.utils.embedding_functions import (
@@ -173,12 +276,101 @@ def create_embedding_function(context):
 
 
 def create_embedding_service(context):
+    # The embedding services are imported when they are created, as ChunkDocument only creates one for the Semantic
+    # Chunking Strategy
     embedding_service = context.getProperty(EMBEDDING_MODEL).getValue()
 
     if embedding_service == OPENAI:
+        from langchain.embeddings.openai import OpenAIEmbeddings
+
         openai_api_key = context.getProperty(OPENAI_API_KEY).getValue()
         openai_model = context.getProperty(OPENAI_MODEL).getValue()
         return OpenAIEmbeddings(openai_api_key=openai_api_key, model=openai_model)
+    from langchain.embeddings.huggingface import HuggingFaceInferenceAPIEmbeddings
+
     huggingface_api_key = context.getProperty(HUGGING_FACE_API_KEY).getValue()
     huggingface_model = context.getProperty(HUGGING_FACE_MODEL).getValue()
     return HuggingFaceInferenceAPIEmbeddings(api_key=huggingface_api_key, model_name=huggingface_model)
+
+
+def get_function_identity(context) -> str:
+    """
+    Returns the identity of the configured embedding function, which is part of the keys of its embeddings in the
+    embedding cache.
+    """
+    function_name = context.getProperty(EMBEDDING_FUNCTION).getValue()
+    model_names = {
+        OPENAI: OPENAI_MODEL_NAME,
+        HUGGING_FACE: HUGGING_FACE_MODEL_NAME,
+        SENTENCE_TRANSFORMERS: SENTENCE_TRANSFORMER_MODEL_NAME,
+    }
+    model_name = context.getProperty(model_names[function_name]).getValue() if function_name in model_names else None
+    return json.dumps(["function", function_name, model_name])
+
+
+def get_service_identity(context) -> str:
+    """
+    Returns the identity of the configured embedding service, which is part of the keys of its embeddings in the
+    embedding cache.
+    """
+    embedding_service = context.getProperty(EMBEDDING_MODEL).getValue()
+    model_name = context.getProperty(OPENAI_MODEL if embedding_service == OPENAI else HUGGING_FACE_MODEL).getValue()
+    return json.dumps(["service", embedding_service, model_name])
+
+
+def get_token_encoding(context):
+    """
+    Returns the tiktoken encoding of the configured embedding service, which is the encoding of the OpenAI model if it
+    is known, and otherwise cl100k_base, with which the number of tokens of texts for other models is estimated.
+    """
+    import tiktoken
+
+    if context.getProperty(EMBEDDING_MODEL).getValue() == OPENAI:
+        with contextlib.suppress(KeyError):
+            return tiktoken.encoding_for_model(context.getProperty(OPENAI_MODEL).getValue())
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def iter_batches(texts: list[str], max_count: int, max_tokens: int | None, encoding):
+    """
+    Yields the start and end indexes of consecutive batches of the given texts, each of which has at most the given
+    number of texts and, where a token limit is given, at most that many tokens. A text that exceeds the token limit by
+    itself is a batch of its own.
+    """
+    start = 0
+    batch_tokens = 0
+    for index, text in enumerate(texts):
+        text_tokens = 0 if max_tokens is None else len(encoding.encode(text, disallowed_special=()))
+        if index > start and (
+            index - start == max_count or (max_tokens is not None and batch_tokens + text_tokens > max_tokens)
+        ):
+            yield start, index
+            start = index
+            batch_tokens = 0
+        batch_tokens += text_tokens
+
+    if start < len(texts):
+        yield start, len(texts)
+
+
+def create_embedding_cache(context) -> EmbeddingCache | None:
+    cache_file = context.getProperty(EMBEDDING_CACHE_FILE).getValue()
+    if cache_file is None:
+        return None
+    return EmbeddingCache(
+        cache_file,
+        context.getProperty(EMBEDDING_CACHE_SIZE).asDataSize(DataUnit.B),
+        context.getProperty(EMBEDDING_CACHE_PRECISION).getValue(),
+    )
+
+
+def cache_embedding_function(function, cache: EmbeddingCache | None, model: str):
+    return function if cache is None else CachedEmbeddingFunction(function, cache, model)
+
+
+def cache_embedding_service(embeddings, cache: EmbeddingCache | None, model: str):
+    return embeddings if cache is None else CachedEmbeddings(embeddings, cache, model)
+
+
+def get_cache_attributes(embedder) -> dict:
+    return embedder.to_attributes() if isinstance(embedder, CachedEmbedder) else {}
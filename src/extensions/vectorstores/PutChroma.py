@@ -56,11 +56,14 @@ class PutChroma(FlowFileTransform):
 
     client = None
     embedding_function = None
+    embedding_cache = None
+    embedding_function_identity = None
 
     def __init__(self, **kwargs):  # noqa: ARG002
         self.property_descriptors = list(ChromaUtils.PROPERTIES) + [
             prop for prop in EmbeddingUtils.PROPERTIES if prop != EmbeddingUtils.EMBEDDING_MODEL
         ]
+        self.property_descriptors.extend(EmbeddingUtils.CACHE_PROPERTIES)
         self.property_descriptors.append(self.STORE_TEXT)
         self.property_descriptors.append(self.DISTANCE_METHOD)
         self.property_descriptors.append(self.DOC_ID_FIELD_NAME)
@@ -71,10 +74,14 @@ class PutChroma(FlowFileTransform):
     def onScheduled(self, context):
         self.client = ChromaUtils.create_client(context)
         self.embedding_function = EmbeddingUtils.create_embedding_function(context)
+        self.embedding_cache = EmbeddingUtils.create_embedding_cache(context)
+        self.embedding_function_identity = EmbeddingUtils.get_function_identity(context)
 
     def transform(self, context, flowfile):
         client = self.client
-        embedding_function = self.embedding_function
+        embedding_function = EmbeddingUtils.cache_embedding_function(
+            self.embedding_function, self.embedding_cache, self.embedding_function_identity
+        )
         collection_name = (
             context.getProperty(ChromaUtils.COLLECTION_NAME).evaluateAttributeExpressions(flowfile).getValue()
         )
@@ -125,4 +132,5 @@ class PutChroma(FlowFileTransform):
 
         collection.upsert(ids, embeddings, metadatas, texts)
 
-        return FlowFileTransformResult(relationship="success")
+        attributes = EmbeddingUtils.get_cache_attributes(embedding_function)
+        return FlowFileTransformResult(relationship="success", attributes=attributes)
@@ -1,6 +1,16 @@
 # SPDX-License-Identifier: Apache-2.0
 
-from EmbeddingUtils import EMBEDDING_MODEL, HUGGING_FACE_MODEL, OPENAI_MODEL, create_embedding_service
+from EmbeddingUtils import (
+    CACHE_PROPERTIES,
+    EMBEDDING_MODEL,
+    HUGGING_FACE_MODEL,
+    OPENAI_MODEL,
+    cache_embedding_service,
+    create_embedding_cache,
+    create_embedding_service,
+    get_cache_attributes,
+    get_service_identity,
+)
 from langchain.vectorstores import OpenSearchVectorSearch
 from nifiapi.documentation import use_case
 from nifiapi.flowfiletransform import FlowFileTransform, FlowFileTransformResult
@@ -202,9 +212,12 @@ class PutOpenSearchVector(FlowFileTransform):
         EF_SEARCH,
         EF_CONSTRUCTION,
         M,
+        *CACHE_PROPERTIES,
     ]
 
     embeddings = None
+    embedding_cache = None
+    embedding_service_identity = None
 
     def __init__(self, **kwargs):
         pass
@@ -214,6 +227,8 @@ class PutOpenSearchVector(FlowFileTransform):
 
     def onScheduled(self, context):
         self.embeddings = create_embedding_service(context)
+        self.embedding_cache = create_embedding_cache(context)
+        self.embedding_service_identity = get_service_identity(context)
 
     def transform(self, context, flowfile):
         file_name = flowfile.getAttribute("filename")
@@ -254,8 +269,9 @@ class PutOpenSearchVector(FlowFileTransform):
         json_lines = flowfile.getContentsAsBytes().decode()
         parsed_documents = parse_documents(json_lines, id_field_name, file_name)
 
+        embeddings = cache_embedding_service(self.embeddings, self.embedding_cache, self.embedding_service_identity)
         vectorstore = OpenSearchVectorSearch(
-            opensearch_url=http_host, index_name=index_name, embedding_function=self.embeddings, **params
+            opensearch_url=http_host, index_name=index_name, embedding_function=embeddings, **params
         )
         vectorstore.add_texts(
             texts=parsed_documents["texts"],
@@ -264,4 +280,4 @@ class PutOpenSearchVector(FlowFileTransform):
             **params,
         )
 
-        return FlowFileTransformResult(relationship="success")
+        return FlowFileTransformResult(relationship="success", attributes=get_cache_attributes(embeddings))
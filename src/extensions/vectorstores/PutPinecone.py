@@ -2,14 +2,20 @@
 
 import json
 
-import langchain.vectorstores
 from EmbeddingUtils import (
+    CACHE_PROPERTIES,
     EMBEDDING_MODEL,
     HUGGING_FACE,
     HUGGING_FACE_MODEL,
     OPENAI,
     OPENAI_MODEL,
+    cache_embedding_service,
+    create_embedding_cache,
     create_embedding_service,
+    get_cache_attributes,
+    get_service_identity,
+    get_token_encoding,
+    iter_batches,
 )
 from nifiapi.documentation import use_case
 from nifiapi.flowfiletransform import FlowFileTransform, FlowFileTransformResult
@@ -130,6 +136,37 @@ class PutPinecone(FlowFileTransform):
         validators=[StandardValidators.NON_EMPTY_VALIDATOR],
         expression_language_scope=ExpressionLanguageScope.FLOWFILE_ATTRIBUTES,
     )
+    EMBEDDING_BATCH_SIZE = PropertyDescriptor(
+        name="Embedding Batch Size",
+        description="""The maximum number of documents whose text is sent to the Embedding Model in a single request. The embeddings of each batch are upserted
+                    to Pinecone before the next batch is embedded.""",
+        required=True,
+        default_value="100",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+    )
+    EMBEDDING_BATCH_TOKENS = PropertyDescriptor(
+        name="Embedding Batch Token Limit",
+        description="""The maximum total number of tokens of the documents that are sent to the Embedding Model in a single request, so that requests stay
+                    within the limits of the model. Tokens are counted with the tokenizer of the OpenAI Model, or estimated with the cl100k_base tokenizer
+                    for other models. A document with more tokens than this is sent in a request of its own. If not specified, batches are only limited by
+                    the Embedding Batch Size.""",
+        required=False,
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+    )
+    UPSERT_BATCH_SIZE = PropertyDescriptor(
+        name="Upsert Batch Size",
+        description="The maximum number of vectors that are upserted to Pinecone in a single request.",
+        required=True,
+        default_value="100",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+    )
+    UPSERT_THREADS = PropertyDescriptor(
+        name="Upsert Threads",
+        description="The number of upsert requests for the vectors of an embedding batch that are sent to Pinecone at the same time.",
+        required=True,
+        default_value="4",
+        validators=[StandardValidators.POSITIVE_INTEGER_VALIDATOR],
+    )
 
     properties = [
         PINECONE_API_KEY,
@@ -143,9 +180,17 @@ class PutPinecone(FlowFileTransform):
         TEXT_KEY,
         NAMESPACE,
         DOC_ID_FIELD_NAME,
+        EMBEDDING_BATCH_SIZE,
+        EMBEDDING_BATCH_TOKENS,
+        UPSERT_BATCH_SIZE,
+        UPSERT_THREADS,
+        *CACHE_PROPERTIES,
     ]
 
     embeddings = None
+    token_encoding = None
+    embedding_cache = None
+    embedding_service_identity = None
     pc = None
 
     def __init__(self, **kwargs):
@@ -162,6 +207,13 @@ class PutPinecone(FlowFileTransform):
         )
         # initialize embedding service
         self.embeddings = create_embedding_service(context)
+        self.embedding_cache = create_embedding_cache(context)
+        self.embedding_service_identity = get_service_identity(context)
+        # The tokenizer is only needed to count the tokens of batches when they are limited
+        if context.getProperty(self.EMBEDDING_BATCH_TOKENS).getValue() is not None:
+            self.token_encoding = get_token_encoding(context)
+        else:
+            self.token_encoding = None
 
     def transform(self, context, flowfile):
         # First, check if our index already exists. If it doesn't, we create it
@@ -169,7 +221,8 @@ class PutPinecone(FlowFileTransform):
         namespace = context.getProperty(self.NAMESPACE).evaluateAttributeExpressions(flowfile).getValue()
         id_field_name = context.getProperty(self.DOC_ID_FIELD_NAME).evaluateAttributeExpressions(flowfile).getValue()
 
-        index = self.pc.Index(index_name)
+        # The upserts of each embedding batch are sent by the thread pool of the index, which is closed once they are done
+        index = self.pc.Index(index_name, pool_threads=context.getProperty(self.UPSERT_THREADS).asInteger())
 
         # Read the FlowFile content as "json-lines".
         json_lines = flowfile.getContentsAsBytes().decode()
@@ -206,6 +259,33 @@ class PutPinecone(FlowFileTransform):
             i += 1
 
         text_key = context.getProperty(self.TEXT_KEY).evaluateAttributeExpressions().getValue()
-        vectorstore = langchain.vectorstores.Pinecone(index, self.embeddings.embed_query, text_key)
-        vectorstore.add_texts(texts=texts, metadatas=metadatas, ids=ids, namespace=namespace)
-        return FlowFileTransformResult(relationship="success")
+        embedding_batch_size = context.getProperty(self.EMBEDDING_BATCH_SIZE).asInteger()
+        embedding_batch_tokens = context.getProperty(self.EMBEDDING_BATCH_TOKENS).asInteger()
+        upsert_batch_size = context.getProperty(self.UPSERT_BATCH_SIZE).asInteger()
+        embeddings = cache_embedding_service(self.embeddings, self.embedding_cache, self.embedding_service_identity)
+
+        # Each batch of texts is embedded in a single request, and its vectors are upserted before the next batch is
+        # embedded, so that the vectors of the whole FlowFile are never held in memory at once
+        with index:
+            for start, end in iter_batches(texts, embedding_batch_size, embedding_batch_tokens, self.token_encoding):
+                vectors = embeddings.embed_documents(texts[start:end])
+                records = []
+                for doc_id, vector, text, metadata in zip(
+                    ids[start:end], vectors, texts[start:end], metadatas[start:end], strict=True
+                ):
+                    # The text is stored in the metadata under the Text Key, where QueryPinecone reads it from
+                    records.append((doc_id, vector, {**metadata, text_key: text}))
+                # The batches of vectors are upserted concurrently by the Upsert Threads, and all of them are done before the
+                # next texts are embedded
+                async_results = [
+                    index.upsert(
+                        vectors=records[upsert_start : upsert_start + upsert_batch_size],
+                        namespace=namespace,
+                        async_req=True,
+                    )
+                    for upsert_start in range(0, len(records), upsert_batch_size)
+                ]
+                for async_result in async_results:
+                    async_result.get()
+
+        return FlowFileTransformResult(relationship="success", attributes=get_cache_attributes(embeddings))
@@ -4,7 +4,12 @@ import json
 
 import QdrantUtils
 from EmbeddingUtils import (
+    CACHE_PROPERTIES,
+    cache_embedding_service,
+    create_embedding_cache,
     create_embedding_service,
+    get_cache_attributes,
+    get_service_identity,
 )
 from langchain.vectorstores.qdrant import Qdrant
 from nifiapi.documentation import use_case
@@ -97,8 +102,13 @@ class PutQdrant(FlowFileTransform):
             SIMILARITY_METRIC,
             DOC_ID_FIELD_NAME,
         ]
+        + CACHE_PROPERTIES
     )
 
+    vector_store = None
+    embedding_cache = None
+    embedding_service_identity = None
+
     def __init__(self, **kwargs):
         pass
 
@@ -119,6 +129,8 @@ class PutQdrant(FlowFileTransform):
             force_recreate=context.getProperty(self.FORCE_RECREATE_COLLECTION).asBoolean(),
             distance_func=context.getProperty(self.SIMILARITY_METRIC).getValue(),
         )
+        self.embedding_cache = create_embedding_cache(context)
+        self.embedding_service_identity = get_service_identity(context)
 
     def transform(self, context, flowfile):
         id_field_name = context.getProperty(self.DOC_ID_FIELD_NAME).evaluateAttributeExpressions(flowfile).getValue()
@@ -147,5 +159,21 @@ class PutQdrant(FlowFileTransform):
 
             i += 1
 
-        self.vector_store.add_texts(texts=texts, metadatas=metadatas, ids=ids)
-        return FlowFileTransformResult(relationship="success")
+        embeddings = cache_embedding_service(
+            self.vector_store.embeddings, self.embedding_cache, self.embedding_service_identity
+        )
+        vector_store = self.vector_store
+        if embeddings is not vector_store.embeddings:
+            # The vector store of the collection is shared by all FlowFiles, so the cache is used through a vector store
+            # of the same collection that embeds with it
+            vector_store = Qdrant(
+                client=vector_store.client,
+                collection_name=vector_store.collection_name,
+                embeddings=embeddings,
+                content_payload_key=vector_store.content_payload_key,
+                metadata_payload_key=vector_store.metadata_payload_key,
+                distance_strategy=vector_store.distance_strategy,
+                vector_name=vector_store.vector_name,
+            )
+        vector_store.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+        return FlowFileTransformResult(relationship="success", attributes=get_cache_attributes(embeddings))
@@ -66,6 +66,8 @@ class QueryChroma(FlowFileTransform):
 
     client = None
     embedding_function = None
+    embedding_cache = None
+    embedding_function_identity = None
     include_ids = None
     include_metadatas = None
     include_documents = None
@@ -76,6 +78,7 @@ class QueryChroma(FlowFileTransform):
     property_descriptors = (
         list(ChromaUtils.PROPERTIES)
         + [prop for prop in EmbeddingUtils.PROPERTIES if prop != EmbeddingUtils.EMBEDDING_MODEL]
+        + EmbeddingUtils.CACHE_PROPERTIES
         + [
             QUERY,
             NUMBER_OF_RESULTS,
@@ -100,6 +103,8 @@ class QueryChroma(FlowFileTransform):
     def onScheduled(self, context):
         self.client = ChromaUtils.create_client(context)
         self.embedding_function = EmbeddingUtils.create_embedding_function(context)
+        self.embedding_cache = EmbeddingUtils.create_embedding_cache(context)
+        self.embedding_function_identity = EmbeddingUtils.get_function_identity(context)
         self.include_ids = context.getProperty(QueryUtils.INCLUDE_IDS).asBoolean()
         self.include_metadatas = context.getProperty(QueryUtils.INCLUDE_METADATAS).asBoolean()
         self.include_documents = context.getProperty(QueryUtils.INCLUDE_DOCUMENTS).asBoolean()
@@ -110,7 +115,9 @@ class QueryChroma(FlowFileTransform):
 
     def transform(self, context, flowfile):
         client = self.client
-        embedding_function = self.embedding_function
+        embedding_function = EmbeddingUtils.cache_embedding_function(
+            self.embedding_function, self.embedding_cache, self.embedding_function_identity
+        )
         collection_name = (
             context.getProperty(ChromaUtils.COLLECTION_NAME).evaluateAttributeExpressions(flowfile).getValue()
         )
@@ -178,4 +185,5 @@ class QueryChroma(FlowFileTransform):
 
         # Return the results
         attributes = {"mime.type": mime_type}
+        attributes.update(EmbeddingUtils.get_cache_attributes(embedding_function))
         return FlowFileTransformResult(relationship="success", contents=output_contents, attributes=attributes)
@@ -2,7 +2,17 @@
 
 import json
 
-from EmbeddingUtils import EMBEDDING_MODEL, HUGGING_FACE_MODEL, OPENAI_MODEL, create_embedding_service
+from EmbeddingUtils import (
+    CACHE_PROPERTIES,
+    EMBEDDING_MODEL,
+    HUGGING_FACE_MODEL,
+    OPENAI_MODEL,
+    cache_embedding_service,
+    create_embedding_cache,
+    create_embedding_service,
+    get_cache_attributes,
+    get_service_identity,
+)
 from langchain.vectorstores import OpenSearchVectorSearch
 from nifiapi.flowfiletransform import FlowFileTransform, FlowFileTransformResult
 from nifiapi.properties import ExpressionLanguageScope, PropertyDependency, PropertyDescriptor, StandardValidators
@@ -155,9 +165,12 @@ class QueryOpenSearchVector(FlowFileTransform):
         RESULTS_FIELD,
         INCLUDE_METADATAS,
         INCLUDE_DISTANCES,
+        *CACHE_PROPERTIES,
     ]
 
     embeddings = None
+    embedding_cache = None
+    embedding_service_identity = None
     query_utils = None
 
     def __init__(self, **kwargs):
@@ -169,6 +182,8 @@ class QueryOpenSearchVector(FlowFileTransform):
     def onScheduled(self, context):
         # initialize embedding service
         self.embeddings = create_embedding_service(context)
+        self.embedding_cache = create_embedding_cache(context)
+        self.embedding_service_identity = get_service_identity(context)
         self.query_utils = QueryUtils(context)
 
     def transform(self, context, flowfile):
@@ -210,8 +225,9 @@ class QueryOpenSearchVector(FlowFileTransform):
                 )
                 params["space_type"] = self.PAINLESS_SCRIPTING_SPACE_TYPE_VALUES.get(space_type)
 
+        embeddings = cache_embedding_service(self.embeddings, self.embedding_cache, self.embedding_service_identity)
         vectorstore = OpenSearchVectorSearch(
-            index_name=index_name, embedding_function=self.embeddings, opensearch_url=http_host, **params
+            index_name=index_name, embedding_function=embeddings, opensearch_url=http_host, **params
         )
 
         results = vectorstore.similarity_search_with_score(query=query, k=num_results, **params)
@@ -238,5 +254,6 @@ class QueryOpenSearchVector(FlowFileTransform):
             flowfile, documents, metadatas, None, distances, None
         )
         attributes = {"mime.type": mime_type}
+        attributes.update(get_cache_attributes(embeddings))
 
         return FlowFileTransformResult(relationship="success", contents=output_contents, attributes=attributes)
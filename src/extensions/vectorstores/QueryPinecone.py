@@ -5,12 +5,17 @@ import json
 import langchain.vectorstores
 import QueryUtils
 from EmbeddingUtils import (
+    CACHE_PROPERTIES,
     EMBEDDING_MODEL,
     HUGGING_FACE,
     HUGGING_FACE_MODEL,
     OPENAI,
     OPENAI_MODEL,
+    cache_embedding_service,
+    create_embedding_cache,
     create_embedding_service,
+    get_cache_attributes,
+    get_service_identity,
 )
 from nifiapi.flowfiletransform import FlowFileTransform, FlowFileTransformResult
 from nifiapi.properties import ExpressionLanguageScope, PropertyDependency, PropertyDescriptor, StandardValidators
@@ -132,9 +137,12 @@ class QueryPinecone(FlowFileTransform):
         QueryUtils.RESULTS_FIELD,
         QueryUtils.INCLUDE_METADATAS,
         QueryUtils.INCLUDE_DISTANCES,
+        *CACHE_PROPERTIES,
     ]
 
     embeddings = None
+    embedding_cache = None
+    embedding_service_identity = None
     query_utils = None
     pc = None
 
@@ -152,6 +160,8 @@ class QueryPinecone(FlowFileTransform):
         )
         # initialize embedding service
         self.embeddings = create_embedding_service(context)
+        self.embedding_cache = create_embedding_cache(context)
+        self.embedding_service_identity = get_service_identity(context)
         self.query_utils = QueryUtils.QueryUtils(context)
 
     def transform(self, context, flowfile):
@@ -165,7 +175,8 @@ class QueryPinecone(FlowFileTransform):
 
         text_key = context.getProperty(self.TEXT_KEY).evaluateAttributeExpressions().getValue()
         filter_definition = context.getProperty(self.FILTER).evaluateAttributeExpressions(flowfile).getValue()
-        vectorstore = langchain.vectorstores.Pinecone(index, self.embeddings.embed_query, text_key, namespace=namespace)
+        embeddings = cache_embedding_service(self.embeddings, self.embedding_cache, self.embedding_service_identity)
+        vectorstore = langchain.vectorstores.Pinecone(index, embeddings.embed_query, text_key, namespace=namespace)
         results = vectorstore.similarity_search_with_score(
             query, num_results, filter=None if filter_definition is None else json.loads(filter_definition)
         )
@@ -192,5 +203,6 @@ class QueryPinecone(FlowFileTransform):
             flowfile, documents, metadatas, None, distances, None
         )
         attributes = {"mime.type": mime_type}
+        attributes.update(get_cache_attributes(embeddings))
 
         return FlowFileTransformResult(relationship="success", contents=output_contents, attributes=attributes)
@@ -5,7 +5,12 @@ import json
 import QdrantUtils
 import QueryUtils
 from EmbeddingUtils import (
+    CACHE_PROPERTIES,
+    cache_embedding_service,
+    create_embedding_cache,
     create_embedding_service,
+    get_cache_attributes,
+    get_service_identity,
 )
 from langchain.vectorstores.qdrant import Qdrant
 from nifiapi.documentation import use_case
@@ -95,9 +100,12 @@ class QueryQdrant(FlowFileTransform):
             QueryUtils.INCLUDE_METADATAS,
             QueryUtils.INCLUDE_DISTANCES,
         ]
+        + CACHE_PROPERTIES
     )
 
     embeddings = None
+    embedding_cache = None
+    embedding_service_identity = None
     query_utils = None
     client = None
 
@@ -115,6 +123,8 @@ class QueryQdrant(FlowFileTransform):
             https=context.getProperty(QdrantUtils.HTTPS).asBoolean(),
         )
         self.embeddings = create_embedding_service(context)
+        self.embedding_cache = create_embedding_cache(context)
+        self.embedding_service_identity = get_service_identity(context)
         self.query_utils = QueryUtils.QueryUtils(context)
 
     def transform(self, context, flowfile):
@@ -124,10 +134,11 @@ class QueryQdrant(FlowFileTransform):
         query = context.getProperty(self.QUERY).evaluateAttributeExpressions(flowfile).getValue()
         num_results = context.getProperty(self.NUMBER_OF_RESULTS).evaluateAttributeExpressions(flowfile).asInteger()
         filter_definition = context.getProperty(self.FILTER).evaluateAttributeExpressions(flowfile).getValue()
+        embeddings = cache_embedding_service(self.embeddings, self.embedding_cache, self.embedding_service_identity)
         vector_store = Qdrant(
             client=self.client,
             collection_name=collection_name,
-            embeddings=self.embeddings,
+            embeddings=embeddings,
         )
         results = vector_store.similarity_search_with_score(
             query=query,
@@ -157,5 +168,6 @@ class QueryQdrant(FlowFileTransform):
             flowfile, documents, metadatas, None, distances, None
         )
         attributes = {"mime.type": mime_type}
+        attributes.update(get_cache_attributes(embeddings))
 
         return FlowFileTransformResult(relationship="success", contents=output_contents, attributes=attributes)
@@ -0,0 +1,109 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+
+import pytest
+
+pytest.importorskip("langchain")
+ChunkDocument = pytest.importorskip("ChunkDocument").ChunkDocument
+ParseDocument = pytest.importorskip("ParseDocument").ParseDocument
+
+WORDS = ["alpha", "beta", "gamma.", "delta,", "epsilon\n", "zeta\n\n", "eta", "theta"]
+
+
+def create_documents(count: int) -> bytes:
+    lines = []
+    for i in range(count):
+        text = " ".join(WORDS[(i * j) % len(WORDS)] for j in range(i * 7 % 300))
+        lines.append(json.dumps({"text": text, "metadata": {"source": f"document-{i}", "page_number": i % 5}}))
+    return "\n".join(lines).encode()
+
+
+@pytest.mark.parametrize(
+    "properties",
+    [
+        {},
+        {"Splitting Engine": "LangChain"},
+        {"Chunking Strategy": "Split by Character", "Separator": "\\n"},
+        {"Chunking Strategy": "Content-Defined"},
+        {"Chunk Index Scope": "Source Document", "Include Chunk Offsets": "true"},
+        {"Stream Documents": "true"},
+        {"Deduplication": "Exact Duplicates"},
+    ],
+)
+def test_worker_processes_produce_serial_output(run_processor, properties):
+    properties = {"Chunk Size": "120", "Chunk Overlap": "20", **properties}
+    contents = [create_documents(count) for count in [0, 1, 40, 250]]
+
+    serial_results = run_processor(ChunkDocument(), properties, contents)
+    parallel_results = run_processor(ChunkDocument(), {**properties, "Worker Processes": "2"}, contents)
+
+    for serial_result, parallel_result in zip(serial_results, parallel_results, strict=True):
+        assert parallel_result.contents == serial_result.contents
+        assert parallel_result.attributes == serial_result.attributes
+
+
+@pytest.mark.parametrize("worker_processes", ["1", "2"])
+def test_split_by_headers_builds_header_paths_of_parsed_elements(run_processor, worker_processes):
+    pytest.importorskip("markdown_it")
+    markdown = b"""# Parsing
+
+Documents are parsed into elements.
+
+## Chunking
+
+Elements are chunked along their headers.
+
+### Overlap
+
+Chunks overlap.
+
+## Embedding
+
+Chunks are embedded.
+"""
+    properties = {"Input Format": "Markdown", "Markup Parser": "Fast", "Chunking Strategy": "Split by Headers"}
+
+    parsed_results = run_processor(ParseDocument(), properties, [markdown])
+    chunked_results = run_processor(
+        ChunkDocument(), {**properties, "Worker Processes": worker_processes}, [parsed_results[0].contents]
+    )
+
+    chunks = [json.loads(line) for line in chunked_results[0].contents.splitlines()]
+    assert [(chunk["text"], chunk["metadata"]["header_path"]) for chunk in chunks] == [
+        ("Parsing", ["Parsing"]),
+        ("Documents are parsed into elements.", ["Parsing"]),
+        ("Chunking", ["Parsing", "Chunking"]),
+        ("Elements are chunked along their headers.", ["Parsing", "Chunking"]),
+        ("Overlap", ["Parsing", "Chunking", "Overlap"]),
+        ("Chunks overlap.", ["Parsing", "Chunking", "Overlap"]),
+        ("Embedding", ["Parsing", "Embedding"]),
+        ("Chunks are embedded.", ["Parsing", "Embedding"]),
+    ]
+
+
+def test_semantic_strategy_embeds_sentences_with_the_configured_model(run_processor, monkeypatch):
+    pytest.importorskip("numpy")
+    from langchain.embeddings.huggingface import HuggingFaceInferenceAPIEmbeddings
+
+    models = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        models.append(self.model_name)
+        return [[1.0, 0.0] if "cat" in text else [0.0, 1.0] for text in texts]
+
+    monkeypatch.setattr(HuggingFaceInferenceAPIEmbeddings, "embed_documents", embed_documents)
+    text = "The cat sleeps. The cat eats. Stocks rose today. Stocks fell later."
+    properties = {
+        "Chunking Strategy": "Semantic",
+        "Embedding Model": "Hugging Face Model",
+        "HuggingFace API Key": "key",
+        "HuggingFace Model": "sentence-transformers/all-mpnet-base-v2",
+        "Breakpoint Percentile": "50",
+    }
+
+    results = run_processor(ChunkDocument(), properties, [json.dumps({"text": text, "metadata": {}})])
+
+    chunks = [json.loads(line)["text"] for line in results[0].contents.splitlines()]
+    assert chunks == ["The cat sleeps. The cat eats.", "Stocks rose today. Stocks fell later."]
+    assert models == ["sentence-transformers/all-mpnet-base-v2"]
@@ -0,0 +1,121 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import sqlite3
+
+import DeduplicationUtils
+import pytest
+from DeduplicationUtils import (
+    ChunkDeduplicator,
+    MemorySignatureStore,
+    SQLiteSignatureStore,
+)
+
+pytest.importorskip("numpy")
+
+TEXT = (
+    "Apache NiFi supports powerful and scalable directed graphs of data routing, transformation, and system mediation "
+    "logic. It provides a web-based user interface, data provenance, and extensive configuration options."
+)
+NEAR_DUPLICATE_TEXT = TEXT.replace("powerful", "robust")
+OTHER_TEXT = "The parsed documents are split into chunks that are small enough to be embedded one at a time."
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    path = str(tmp_path / "signatures.db")
+    SQLiteSignatureStore.create_schema(path)
+    return path
+
+
+def test_bands_divide_the_signature():
+    for threshold in [0.5, 0.8, 0.9, 0.95]:
+        bands, rows = DeduplicationUtils.get_bands(threshold)
+        assert bands * rows == DeduplicationUtils.NUM_PERMUTATIONS
+
+
+def test_exact_duplicates():
+    deduplicator = ChunkDeduplicator(MemorySignatureStore(), near_duplicates=False, threshold=0.9)
+
+    assert [deduplicator.is_duplicate(text) for text in [TEXT, NEAR_DUPLICATE_TEXT, TEXT, OTHER_TEXT, TEXT]] == [
+        False,
+        False,
+        True,
+        False,
+        True,
+    ]
+    assert deduplicator.duplicate_count == 2
+
+
+def test_near_duplicates():
+    deduplicator = ChunkDeduplicator(MemorySignatureStore(), near_duplicates=True, threshold=0.7)
+
+    assert [deduplicator.is_duplicate(text) for text in [TEXT, NEAR_DUPLICATE_TEXT, OTHER_TEXT, TEXT]] == [
+        False,
+        True,
+        False,
+        True,
+    ]
+    assert deduplicator.duplicate_count == 2
+
+
+def test_near_duplicates_below_threshold_are_kept():
+    deduplicator = ChunkDeduplicator(MemorySignatureStore(), near_duplicates=True, threshold=0.99)
+
+    assert not deduplicator.is_duplicate(TEXT)
+    assert not deduplicator.is_duplicate(NEAR_DUPLICATE_TEXT)
+
+
+@pytest.mark.parametrize("near_duplicates", [False, True])
+def test_sqlite_store_detects_duplicates_across_connections(store_path, near_duplicates):
+    with sqlite3.connect(store_path) as first_connection, sqlite3.connect(store_path) as second_connection:
+        first_store = SQLiteSignatureStore(first_connection, 100)
+        first = ChunkDeduplicator(first_store, near_duplicates=near_duplicates, threshold=0.7)
+        assert not first.is_duplicate(TEXT)
+        assert first.is_duplicate(TEXT)
+        # Chunks are only visible to other FlowFiles once the FlowFile that added them is committed
+        second = ChunkDeduplicator(
+            SQLiteSignatureStore(second_connection, 100), near_duplicates=near_duplicates, threshold=0.7
+        )
+        assert not second.is_duplicate(TEXT)
+
+        first_store.commit()
+        third = ChunkDeduplicator(
+            SQLiteSignatureStore(second_connection, 100), near_duplicates=near_duplicates, threshold=0.7
+        )
+        assert third.is_duplicate(TEXT)
+        assert third.is_duplicate(NEAR_DUPLICATE_TEXT) == near_duplicates
+        assert not third.is_duplicate(OTHER_TEXT)
+
+
+def test_sqlite_store_discards_uncommitted_chunks(store_path):
+    with sqlite3.connect(store_path) as connection:
+        ChunkDeduplicator(SQLiteSignatureStore(connection, 100), near_duplicates=True, threshold=0.7).is_duplicate(TEXT)
+
+    with sqlite3.connect(store_path) as connection:
+        deduplicator = ChunkDeduplicator(SQLiteSignatureStore(connection, 100), near_duplicates=True, threshold=0.7)
+        assert not deduplicator.is_duplicate(TEXT)
+
+
+@pytest.mark.parametrize("near_duplicates", [False, True])
+def test_sqlite_store_removes_least_recently_seen_chunks(store_path, near_duplicates):
+    with sqlite3.connect(store_path) as connection:
+        for text in [TEXT, OTHER_TEXT]:
+            store = SQLiteSignatureStore(connection, 2)
+            ChunkDeduplicator(store, near_duplicates=near_duplicates, threshold=0.7).is_duplicate(text)
+            store.commit()
+
+        # Seeing the first chunk again keeps it, so the second chunk is the least recently seen one
+        store = SQLiteSignatureStore(connection, 2)
+        deduplicator = ChunkDeduplicator(store, near_duplicates=near_duplicates, threshold=0.7)
+        assert deduplicator.is_duplicate(NEAR_DUPLICATE_TEXT if near_duplicates else TEXT)
+        assert not deduplicator.is_duplicate("A third chunk that is added to the full store.")
+        store.commit()
+
+        assert connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] == 2
+        assert connection.execute("SELECT total FROM chunks_count").fetchone()[0] == 2
+        assert connection.execute("SELECT COUNT(DISTINCT chunk_id) FROM bands").fetchone()[0] == (
+            2 if near_duplicates else 0
+        )
+        deduplicator = ChunkDeduplicator(SQLiteSignatureStore(connection, 2), near_duplicates=False, threshold=0.7)
+        assert deduplicator.is_duplicate(TEXT)
+        assert not deduplicator.is_duplicate(OTHER_TEXT)
@@ -0,0 +1,40 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import ExcelUtils
+import pytest
+
+ROWS = [
+    (None, None),
+    ("Name", "Value"),
+    ("first", 1),
+    (None, None),
+    ("second", 2),
+    ("third", 3),
+]
+
+
+@pytest.mark.parametrize(
+    ("repeat_header", "expected"),
+    [
+        (
+            True,
+            [
+                ([["Name", "Value"], ["first", "1"], ["second", "2"]], 3, 5),
+                ([["Name", "Value"], ["third", "3"]], 6, 6),
+            ],
+        ),
+        (
+            False,
+            [
+                ([["Name", "Value"], ["first", "1"]], 2, 3),
+                ([["second", "2"], ["third", "3"]], 5, 6),
+            ],
+        ),
+    ],
+)
+def test_row_groups_are_numbered_by_their_rows(repeat_header, expected):
+    assert list(ExcelUtils.iter_row_groups(ROWS, 2, repeat_header=repeat_header)) == expected
+
+
+def test_sheet_with_only_a_header_has_no_row_groups():
+    assert list(ExcelUtils.iter_row_groups([(None,), ("Name", "Value")], 2, repeat_header=True)) == []
@@ -0,0 +1,140 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+from NativeSplitters import NativeTextSplitter
+
+text_splitter = pytest.importorskip("langchain.text_splitter")
+
+TEXT = """# Title
+
+The first paragraph has a few sentences. It is long enough to be split on spaces.
+It also has a second line, with a comma, and  double  spaces.
+
+
+## Section
+
+def example(value):
+    return value
+
+class Example:
+    pass
+Closing words without a trailing newline"""
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+@pytest.mark.parametrize(("chunk_size", "chunk_overlap"), [(1, 0), (20, 0), (40, 10), (100, 30), (1000, 0)])
+@pytest.mark.parametrize("keep_separator", [True, False])
+@pytest.mark.parametrize("strip_whitespace", [True, False])
+@pytest.mark.parametrize(
+    ("separators", "is_separator_regex"),
+    [
+        (["\n\n", "\n", " ", ""], False),
+        (["\n\n", "\n", " "], False),
+        ([", ", "."], False),
+        (["\\n{2,}", "\\n", "\\s+", ""], True),
+        (["^#+ ", "$", " "], True),
+    ],
+)
+def test_recursive_splitter_matches_langchain(
+    separators, is_separator_regex, strip_whitespace, keep_separator, chunk_size, chunk_overlap
+):
+    expected = text_splitter.RecursiveCharacterTextSplitter(
+        separators=separators,
+        is_separator_regex=is_separator_regex,
+        keep_separator=keep_separator,
+        strip_whitespace=strip_whitespace,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    ).split_text(TEXT)
+    splitter = NativeTextSplitter(
+        separators,
+        recursive=True,
+        is_separator_regex=is_separator_regex,
+        keep_separator=keep_separator,
+        strip_whitespace=strip_whitespace,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+    assert splitter.split_text(TEXT) == expected
+
+
+@pytest.mark.parametrize(("chunk_size", "chunk_overlap"), [(1, 0), (30, 5), (200, 50)])
+@pytest.mark.parametrize("keep_separator", [True, False])
+@pytest.mark.parametrize(
+    ("separator", "is_separator_regex"), [("\n\n", False), ("\n", False), (" ", False), ("", False), ("\\s+", True)]
+)
+def test_character_splitter_matches_langchain(separator, is_separator_regex, keep_separator, chunk_size, chunk_overlap):
+    expected = text_splitter.CharacterTextSplitter(
+        separator=separator,
+        is_separator_regex=is_separator_regex,
+        keep_separator=keep_separator,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    ).split_text(TEXT)
+    splitter = NativeTextSplitter(
+        [separator],
+        recursive=False,
+        is_separator_regex=is_separator_regex,
+        keep_separator=keep_separator,
+        strip_whitespace=True,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+    assert splitter.split_text(TEXT) == expected
+
+
+@pytest.mark.parametrize("language", ["python", "markdown", "html", "latex", "js"])
+@pytest.mark.parametrize("length_function", [len, count_words])
+def test_language_separators_match_langchain(language, length_function):
+    chunk_size = 50 if length_function is len else 8
+    expected = text_splitter.RecursiveCharacterTextSplitter.from_language(
+        language, chunk_size=chunk_size, chunk_overlap=chunk_size // 5, length_function=length_function
+    ).split_text(TEXT)
+    splitter = NativeTextSplitter(
+        text_splitter.RecursiveCharacterTextSplitter.get_separators_for_language(language),
+        recursive=True,
+        is_separator_regex=True,
+        keep_separator=True,
+        strip_whitespace=True,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_size // 5,
+        length_function=length_function,
+    )
+
+    assert splitter.split_text(TEXT) == expected
+
+
+def test_offsets_locate_chunks_in_source_text():
+    splitter = NativeTextSplitter(
+        ["\n\n", "\n", " ", ""],
+        recursive=True,
+        is_separator_regex=False,
+        keep_separator=True,
+        strip_whitespace=True,
+        chunk_size=40,
+        chunk_overlap=10,
+    )
+
+    chunks = splitter.split_text_with_offsets(TEXT)
+
+    assert [chunk for chunk, _, _ in chunks] == splitter.split_text(TEXT)
+    for chunk, start, end in chunks:
+        assert TEXT[start:end] == chunk
+
+
+def test_overlap_larger_than_chunk_size_is_rejected():
+    with pytest.raises(ValueError, match="larger chunk overlap"):
+        NativeTextSplitter(
+            [" "],
+            recursive=False,
+            is_separator_regex=False,
+            keep_separator=False,
+            strip_whitespace=True,
+            chunk_size=10,
+            chunk_overlap=20,
+        )
@@ -0,0 +1,56 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import pytest
+
+pytest.importorskip("langchain")
+ChunkDocument = pytest.importorskip("ChunkDocument").ChunkDocument
+ParseAndChunkDocument = pytest.importorskip("ParseAndChunkDocument").ParseAndChunkDocument
+ParseDocument = pytest.importorskip("ParseDocument").ParseDocument
+
+MARKDOWN = b"""# Parsing
+
+Documents are parsed into elements, which are chunked to be embedded.
+
+## Chunking
+
+* The first item of a list
+* The second item of a list, which repeats the first item of a list
+
+Chunks overlap, so that the context of each chunk is kept. Chunks overlap, so that the context of each chunk is kept.
+
+## Chunking
+
+Chunks overlap, so that the context of each chunk is kept. Chunks overlap, so that the context of each chunk is kept.
+"""
+
+PLAIN_TEXT = b"\n\n".join(
+    b" ".join(b"word%d" % (paragraph * word % 17) for word in range(paragraph * 11)) for paragraph in range(30)
+)
+
+
+@pytest.mark.parametrize(
+    "properties",
+    [
+        {"Input Format": "Plain Text"},
+        {"Input Format": "Plain Text", "Stream Documents": "true"},
+        {"Input Format": "Plain Text", "Chunk Index Scope": "Source Document", "Include Chunk Offsets": "true"},
+        {"Input Format": "Plain Text", "Deduplication": "Exact Duplicates"},
+        {"Input Format": "Markdown", "Markup Parser": "Fast"},
+        {"Input Format": "Markdown", "Markup Parser": "Fast", "Element Strategy": "Single Document"},
+        {"Input Format": "Markdown", "Markup Parser": "Fast", "Stream Documents": "true", "Chunk Statistics": "true"},
+    ],
+)
+def test_parse_and_chunk_matches_parse_then_chunk(run_processor, properties):
+    if properties["Input Format"] == "Markdown":
+        pytest.importorskip("markdown_it")
+    properties = {"Chunk Size": "100", "Chunk Overlap": "20", **properties}
+    contents = [MARKDOWN if properties["Input Format"] == "Markdown" else PLAIN_TEXT, b""]
+
+    parsed_results = run_processor(ParseDocument(), properties, contents)
+    chunked_results = run_processor(ChunkDocument(), properties, [result.contents for result in parsed_results])
+    fused_results = run_processor(ParseAndChunkDocument(), properties, contents)
+
+    for chunked_result, fused_result in zip(chunked_results, fused_results, strict=True):
+        assert fused_result.relationship == chunked_result.relationship
+        assert fused_result.contents == chunked_result.contents
+        assert fused_result.attributes["document.count"] == chunked_result.attributes["document.count"]
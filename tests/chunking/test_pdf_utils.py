@@ -0,0 +1,133 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import itertools
+import random
+
+import PdfUtils
+import pytest
+
+
+def element(text: str, category: str, page_number: int | None, **metadata) -> tuple[str, dict]:
+    metadata = {"source": None, "filetype": "application/pdf", **metadata, "category": category}
+    if page_number is not None:
+        metadata["page_number"] = page_number
+    return text, metadata
+
+
+def page_break() -> tuple[str, dict]:
+    return element("", PdfUtils.PAGE_BREAK_CATEGORY, None)
+
+
+def test_page_ranges_end_where_strategy_changes():
+    assert PdfUtils.get_page_ranges(7, 3, 4) == [(0, 2), (2, 4), (4, 6), (6, 7)]
+    assert PdfUtils.get_page_ranges(5, 10, 1, ["fast", "fast", "ocr_only", "fast", "fast"]) == [(0, 2), (2, 3), (3, 5)]
+
+
+def test_parents_are_set_across_page_ranges():
+    # The Title on page 1 is the parent of the text on page 2, which was parsed in another range, and the ids refer to
+    # the page numbers in the whole document
+    title = element("Introduction", "Title", 1)
+    first_text = element("First", "NarrativeText", 1, parent_id="range-local")
+    second_text = element("Second", "NarrativeText", 2)
+
+    elements = list(
+        PdfUtils.merge_page_ranges(
+            [[title, first_text], [second_text]], [(0, 1), (1, 2)], include_metadata=True, include_page_breaks=False
+        )
+    )
+
+    title_id = PdfUtils.get_element_id("Introduction", title[1], 0)
+    assert [metadata.get("parent_id") for _, metadata in elements] == [None, title_id, title_id]
+
+
+def test_missing_page_breaks_are_added_between_page_ranges():
+    # The hi_res strategy adds no page break after the last page of each range, which resets the hierarchy
+    ranges = [
+        [element("Introduction", "Title", 1), page_break(), element("First", "NarrativeText", 2)],
+        [element("Second", "NarrativeText", 3)],
+    ]
+
+    elements = list(
+        PdfUtils.merge_page_ranges(ranges, [(0, 2), (2, 3)], include_metadata=True, include_page_breaks=True)
+    )
+
+    assert [metadata["category"] for _, metadata in elements] == [
+        "Title",
+        "PageBreak",
+        "NarrativeText",
+        "PageBreak",
+        "NarrativeText",
+    ]
+    assert [metadata.get("parent_id") for _, metadata in elements] == [None, None, None, None, None]
+    assert elements[3] == page_break()
+
+
+def test_page_breaks_of_fast_strategy_are_kept():
+    ranges = [
+        [element("First", "NarrativeText", 1), page_break()],
+        [element("Second", "NarrativeText", 2), page_break()],
+    ]
+
+    elements = list(
+        PdfUtils.merge_page_ranges(ranges, [(0, 1), (1, 2)], include_metadata=False, include_page_breaks=True)
+    )
+
+    assert elements == [*ranges[0], *ranges[1]]
+
+
+CATEGORIES = ["Title", "NarrativeText", "ListItem", "Header", "Table", "UncategorizedText", "Footer"]
+
+
+def create_page_contents(page_count: int, generator: random.Random) -> list[list[tuple[str, str, int | None]]]:
+    return [
+        [
+            (generator.choice(CATEGORIES), generator.choice(["a", "b", "c"]), generator.choice([None, 0, 1, 2]))
+            for _ in range(generator.randint(0, 4))
+        ]
+        for _ in range(page_count)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(50))
+@pytest.mark.parametrize("last_page_break", [True, False])
+def test_merged_page_ranges_match_serial_parsing(seed, last_page_break):
+    # The elements that unstructured loads from each page, with the hierarchy and ids that it sets, are compared with
+    # those of all the pages at once
+    elements_module = pytest.importorskip("unstructured.documents.elements")
+    common = pytest.importorskip("unstructured.partition.common")
+
+    def parse(pages, first_page):
+        elements = []
+        for page_index, page in enumerate(pages):
+            for category, text, depth in page:
+                parsed_element = elements_module.TYPE_TO_TEXT_ELEMENT_MAP[category](text=text)
+                parsed_element.metadata.page_number = page_index + 1
+                parsed_element.metadata.category_depth = depth
+                elements.append(parsed_element)
+            if page_index < len(pages) - 1 or last_page_break:
+                elements.append(elements_module.PageBreak(text=""))
+        common.set_element_hierarchy(elements)
+        elements_module.assign_and_map_hash_ids(elements)
+
+        loaded = []
+        for parsed_element in elements:
+            metadata = {"source": None, **parsed_element.metadata.to_dict(), "category": parsed_element.category}
+            if metadata.get("page_number") is not None:
+                metadata["page_number"] += first_page
+            loaded.append((parsed_element.text, metadata))
+        return loaded
+
+    generator = random.Random(seed)
+    page_count = generator.randint(1, 8)
+    pages = create_page_contents(page_count, generator)
+    boundaries = [0, *sorted(generator.sample(range(1, page_count), generator.randint(0, page_count - 1))), page_count]
+    page_ranges = list(itertools.pairwise(boundaries))
+
+    merged = PdfUtils.merge_page_ranges(
+        [parse(pages[start:end], start) for start, end in page_ranges],
+        page_ranges,
+        include_metadata=True,
+        include_page_breaks=True,
+    )
+
+    assert list(merged) == parse(pages, 0)
@@ -0,0 +1,189 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import enum
+import importlib.util
+import logging
+import sys
+import types
+
+import pytest
+
+
+def install_nifiapi() -> None:
+    """
+    Installs modules with the parts of the NiFi Python API that the Processors use, as the nifiapi package is provided
+    by the NiFi framework rather than published to PyPI. Validators are not evaluated, as NiFi validates properties.
+    """
+    nifiapi = types.ModuleType("nifiapi")
+    documentation = types.ModuleType("nifiapi.documentation")
+    flowfiletransform = types.ModuleType("nifiapi.flowfiletransform")
+    properties = types.ModuleType("nifiapi.properties")
+
+    def use_case(**_kwargs):
+        return lambda cls: cls
+
+    class ProcessorConfiguration:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+    documentation.use_case = use_case
+    documentation.multi_processor_use_case = use_case
+    documentation.ProcessorConfiguration = ProcessorConfiguration
+
+    class FlowFileTransform:
+        def __init__(self, **kwargs):
+            pass
+
+    class FlowFileTransformResult:
+        def __init__(self, relationship, attributes=None, contents=None):
+            self.relationship = relationship
+            self.attributes = attributes
+            self.contents = contents
+
+    flowfiletransform.FlowFileTransform = FlowFileTransform
+    flowfiletransform.FlowFileTransformResult = FlowFileTransformResult
+
+    class ExpressionLanguageScope(enum.Enum):
+        NONE = 1
+        ENVIRONMENT = 2
+        FLOWFILE_ATTRIBUTES = 3
+
+    class TimeUnit(enum.Enum):
+        NANOSECONDS = 1
+        MICROSECONDS = 2
+        MILLISECONDS = 3
+        SECONDS = 4
+        MINUTES = 5
+        HOURS = 6
+        DAYS = 7
+
+    class DataUnit(enum.Enum):
+        B = 1
+        KB = 2
+        MB = 3
+        GB = 4
+        TB = 5
+
+    class Validators:
+        def __getattr__(self, name):
+            return lambda *_args: name
+
+    class StandardValidators:
+        _standard_validators = Validators()
+        NON_EMPTY_VALIDATOR = "NON_EMPTY_VALIDATOR"
+        POSITIVE_INTEGER_VALIDATOR = "POSITIVE_INTEGER_VALIDATOR"
+        NON_NEGATIVE_INTEGER_VALIDATOR = "NON_NEGATIVE_INTEGER_VALIDATOR"
+        BOOLEAN_VALIDATOR = "BOOLEAN_VALIDATOR"
+        DATA_SIZE_VALIDATOR = "DATA_SIZE_VALIDATOR"
+        TIME_PERIOD_VALIDATOR = "TIME_PERIOD_VALIDATOR"
+        PORT_VALIDATOR = "PORT_VALIDATOR"
+        URL_VALIDATOR = "URL_VALIDATOR"
+
+    class PropertyDependency:
+        def __init__(self, property_descriptor, *dependent_values):
+            self.property_descriptor = property_descriptor
+            self.dependent_values = dependent_values
+
+    class PropertyDescriptor:
+        def __init__(self, name, description, default_value=None, **kwargs):
+            self.name = name
+            self.description = description
+            self.defaultValue = None if default_value is None else str(default_value)
+            self.__dict__.update(kwargs)
+
+    properties.ExpressionLanguageScope = ExpressionLanguageScope
+    properties.TimeUnit = TimeUnit
+    properties.DataUnit = DataUnit
+    properties.StandardValidators = StandardValidators
+    properties.PropertyDependency = PropertyDependency
+    properties.PropertyDescriptor = PropertyDescriptor
+
+    for module in [documentation, flowfiletransform, properties]:
+        setattr(nifiapi, module.__name__.rpartition(".")[2], module)
+        sys.modules[module.__name__] = module
+    sys.modules["nifiapi"] = nifiapi
+
+
+if importlib.util.find_spec("nifiapi") is None:
+    install_nifiapi()
+
+
+class PropertyValue:
+    """
+    The value of a property of a Processor, as NiFi passes it to Python, for properties without Expression Language.
+    """
+
+    def __init__(self, value: str | None):
+        self.value = value
+
+    def getValue(self) -> str | None:
+        return self.value
+
+    def isSet(self) -> bool:
+        return self.value is not None
+
+    def asInteger(self) -> int | None:
+        return None if self.value is None else int(self.value)
+
+    def asFloat(self) -> float | None:
+        return None if self.value is None else float(self.value)
+
+    def asBoolean(self) -> bool | None:
+        return None if self.value is None else self.value.lower() == "true"
+
+    def evaluateAttributeExpressions(self, _flowFile=None):
+        return self
+
+
+class ProcessContext:
+    """
+    The properties of a Processor, which take the default value of their descriptor when they are not given.
+    """
+
+    def __init__(self, properties: dict[str, str]):
+        self.properties = properties
+
+    def getProperty(self, descriptor) -> PropertyValue:
+        return PropertyValue(self.properties.get(descriptor.name, descriptor.defaultValue))
+
+
+class FlowFile:
+    """
+    A FlowFile with the given contents, which are encoded as UTF-8 when given as the string contents of a
+    FlowFileTransformResult, as NiFi does when it writes the result.
+    """
+
+    def __init__(self, contents: bytes | str, attributes: dict[str, str] | None = None):
+        self.contents = contents.encode() if isinstance(contents, str) else contents
+        self.attributes = {"filename": "input.txt", "uuid": "0", **(attributes or {})}
+
+    def getContentsAsBytes(self) -> bytes:
+        return self.contents
+
+    def getSize(self) -> int:
+        return len(self.contents)
+
+    def getAttribute(self, name: str) -> str | None:
+        return self.attributes.get(name)
+
+    def getAttributes(self) -> dict[str, str]:
+        return self.attributes
+
+
+@pytest.fixture
+def run_processor():
+    """
+    Returns a function that schedules a Processor with the given properties, transforms a FlowFile with each of the
+    given contents, and stops the Processor, returning the result of each transform.
+    """
+
+    def run(processor, properties: dict[str, str], contents: list[bytes | str]) -> list:
+        processor.logger = logging.getLogger(type(processor).__name__)
+        context = ProcessContext(properties)
+        processor.onScheduled(context)
+        try:
+            return [processor.transform(context, FlowFile(flowfile_contents)) for flowfile_contents in contents]
+        finally:
+            processor.onStopped(context)
+
+    return run
@@ -0,0 +1,94 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import sqlite3
+import types
+from contextlib import closing
+
+import EmbeddingCache
+import pytest
+
+# The size of a vector of 4 floats with 32 bits
+VECTOR_SIZE = 16
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(EmbeddingCache, "time", types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def create_key(i: int) -> bytes:
+    return EmbeddingCache.EmbeddingCache.create_key("model", f"text {i}")
+
+
+def read_cache(path: str) -> tuple[set[bytes], int, int]:
+    with closing(sqlite3.connect(path)) as connection:
+        keys = {key for (key,) in connection.execute("SELECT key FROM embeddings")}
+        total_size = connection.execute("SELECT total FROM embeddings_size").fetchone()[0]
+        summed_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+    return keys, total_size, summed_size
+
+
+@pytest.mark.parametrize(("precision", "vector"), [("float32", [0.5, -1.25, 3.0, 0.0]), ("float16", [0.5, -1.25])])
+def test_vectors_are_returned_as_stored(tmp_path, precision, vector):
+    cache = EmbeddingCache.EmbeddingCache(str(tmp_path / "cache.db"), 1000, precision)
+    cache.put({create_key(0): vector})
+
+    assert cache.get([create_key(0), create_key(1)]) == {create_key(0): vector}
+
+
+def test_least_recently_used_vectors_are_evicted(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = EmbeddingCache.EmbeddingCache(path, 10 * VECTOR_SIZE, "float32")
+    for i in range(10):
+        clock.now += 1
+        cache.put({create_key(i): [float(i)] * 4})
+
+    clock.now += EmbeddingCache.ACCESS_TIME_RESOLUTION + 1
+    assert len(cache.get([create_key(0), create_key(1)])) == 2
+    clock.now += 1
+    cache.put({create_key(10): [1.0] * 4, create_key(11): [2.0] * 4, create_key(3): [3.0] * 4})
+
+    keys, total_size, summed_size = read_cache(path)
+    assert keys == {create_key(i) for i in [0, 1, 3, 5, 6, 7, 8, 9, 10, 11]}
+    assert total_size == summed_size == 10 * VECTOR_SIZE
+
+
+def test_recently_used_vectors_are_not_updated(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = EmbeddingCache.EmbeddingCache(path, 2 * VECTOR_SIZE, "float32")
+    cache.put({create_key(0): [0.0] * 4})
+    clock.now += 1
+    cache.put({create_key(1): [1.0] * 4})
+
+    # A lookup within the resolution does not make the first vector more recent than the second one
+    clock.now += 1
+    cache.get([create_key(0)])
+    cache.put({create_key(2): [2.0] * 4})
+
+    keys, _, _ = read_cache(path)
+    assert keys == {create_key(1), create_key(2)}
+
+
+def test_total_size_is_shared_by_caches_of_the_same_file(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    first_cache = EmbeddingCache.EmbeddingCache(path, 5 * VECTOR_SIZE, "float32")
+    second_cache = EmbeddingCache.EmbeddingCache(path, 5 * VECTOR_SIZE, "float32")
+    for i in range(20):
+        clock.now += 1
+        cache = first_cache if i % 2 == 0 else second_cache
+        # Vectors of different sizes are replaced and evicted
+        cache.put({create_key(i % 7): [float(i)] * (4 if i % 3 else 2)})
+
+        keys, total_size, summed_size = read_cache(path)
+        assert total_size == summed_size <= 5 * VECTOR_SIZE
+        assert create_key(i % 7) in keys
+
+
+def test_cache_uses_write_ahead_logging(tmp_path):
+    path = str(tmp_path / "cache.db")
+    EmbeddingCache.EmbeddingCache(path, 1000, "float32")
+
+    with closing(sqlite3.connect(path)) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"